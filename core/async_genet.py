@@ -0,0 +1,156 @@
+## Genet 主循环的 asyncio 版本：链路传输与控制器处理流水线化
+# genet_project/core/async_genet.py
+
+import asyncio
+
+from .genet import Genet
+from .utility import calculate_utility
+from utils import events
+from utils.telemetry import STAGE_VERIFY
+
+
+class AsyncGenet(Genet):
+    """
+    与 Genet 相同的三大阶段，运行在 AsyncNetworkEnvironment 之上。
+
+    发送哪个速率、何时发送，与同步版本逐RTT一致；只有控制器的处理工作与链路传输重叠：
+        - 评估阶段：下一个组件的探测先上路，再处理当前组件的反馈；
+        - 决策阶段：与同步版本相同 (需要推断时先完成真实验证)，执行速率总是在任期的第一个RTT发出之前确定；
+        - 执行阶段：下一个RTT先上路，再做效用值、危机监测、虚拟评估与遥测记录。
+    因此效用计算、模型推断和日志/遥测写入不会拉长RTT时隙 (见 AsyncNetworkEnvironment.link_idle_sec)。
+
+    处理某个RTT时只使用它自己的反馈快照与仿真时钟 (见 _consume)，不读取正在传输的下一个RTT的状态。
+    预算检查把在途的RTT计算在内，因此与同步版本在同一个RTT处停止。
+    """
+
+    def __init__(self, config, async_env):
+        """
+        Args:
+            config (dict): 配置。
+            async_env (AsyncNetworkEnvironment): 异步网络环境。
+        """
+        super().__init__(config, async_env.env)
+        self.async_env = async_env
+        self.eval_duration_sec = 0.5
+        # 最近一个已取走的RTT结束时的仿真时钟 (链路线程上读取)
+        self._link_time = None
+
+    def run(self, budget=None):
+        """在新的事件循环中运行 run_async，直到运行预算用完。"""
+        return asyncio.run(self.run_async(budget))
+
+    async def run_async(self, budget=None):
+        """
+        异步主循环 (语义与 Genet.run 相同)。
+
+        Returns:
+            RunSummary
+        """
+        # 运行开始时链路空闲，可以直接读取后端的时钟
+        self._link_time = super()._sim_time()
+        run_start = self._begin_run(budget)
+        stop_reason = None
+        while stop_reason is None:
+            performance_report, all_rates_info = await self._evaluation_stage_async()
+            primary_component, execution_rate, execution_duration = \
+                await self._decision_stage_async(performance_report, all_rates_info)
+            await self._execution_stage_async(primary_component, execution_rate, execution_duration)
+            stop_reason = self._budget_exhausted()
+        return self._finish_run(run_start, stop_reason)
+
+    def _send(self, rate, duration_sec=None, component=None, state=None):
+        """把一次发送排入链路线程 (component 给出时是评估探测，rate 是它对 state 的建议)。"""
+        if component is not None:
+            component.on_rate_sent(state)
+            events.emit(events.ENV_EVAL_RUN, component=component.name, rate=rate, duration=duration_sec)
+        else:
+            events.emit(events.ENV_EXEC_RTT, rate=rate)
+        return self.async_env.start_transmit(rate, duration_sec)
+
+    async def _consume(self, pending):
+        """取走一个RTT的结果：登记它的反馈与仿真时钟，返回它自己的反馈快照。"""
+        feedback, self._link_time = await pending
+        return self.async_env.commit_feedback(feedback)
+
+    def _sim_time(self):
+        """最近一个已取走的RTT结束时的仿真时钟 (不读取后端：链路上可能还有RTT在传输)。"""
+        return self._link_time
+
+    async def _evaluation_stage_async(self):
+        events.emit(events.EVAL_START)
+        self.triggered = False
+        performance_report = {}
+        all_rates_info = {}
+        # 上一个任期的RTT都已取走，此时链路空闲，当前状态就是最后一个RTT的反馈
+        state = self.async_env.get_current_state()
+        rates = self.registry.suggest_rates_batch(state).copy()
+        components = self.components
+
+        pending = self._send(rates[0], self.eval_duration_sec, components[0], state)
+        for i, component in enumerate(components):
+            feedback = await self._consume(pending)
+            if i + 1 < len(components):
+                pending = self._send(rates[i + 1], self.eval_duration_sec, components[i + 1], state)
+            self._process_probe(component, feedback, performance_report, all_rates_info)
+        if events.enabled(events.EVAL_REPORT):
+            events.emit(events.EVAL_REPORT, report={k: v[0] for k, v in performance_report.items()})
+        return performance_report, all_rates_info
+
+    async def _decision_stage_async(self, performance_report, all_rates_info):
+        events.emit(events.DECISION_START)
+
+        # a. 全局诊断：与同步版本一样，先确定执行速率 (需要时先完成真实验证)
+        needs_inference = self.trigger_engine.should_infer(performance_report, all_rates_info)
+        self.triggered = needs_inference
+        self.stats.trigger_count += needs_inference
+        primary_component = self._select_primary_component(performance_report)
+
+        if needs_inference:
+            r_candidate = self.inference_engine.propose_rate(performance_report, self.features.values)
+            if r_candidate is None:
+                execution_rate = self.inference_engine.fallback_rate(performance_report)
+            else:
+                # 真实验证：与同步版本一样先发出验证RTT，按它的结果裁决
+                events.emit(events.INFER_VERIFY_RUN)
+                feedback_candidate = await self._consume(self.async_env.start_transmit(r_candidate))
+                execution_rate = self.inference_engine.verdict(performance_report, r_candidate, feedback_candidate)
+                self._record(STAGE_VERIFY, None, None, *self.inference_engine.last_verification)
+        else:
+            execution_rate = primary_component.commit_suggested_rate({})  # 简化
+
+        # b. 绩效考核与授权任期
+        secondary_components = [c for c in self.components if c != primary_component]
+        self._update_secondary_confidence_scores(performance_report, secondary_components)
+        execution_duration = self._calculate_adaptive_tenure(primary_component)
+        self.cycle += 1
+        return primary_component, execution_rate, execution_duration
+
+    async def _execution_stage_async(self, primary_component, execution_rate, execution_duration):
+        events.emit(events.EXEC_START, component=primary_component.name, tenure=execution_duration)
+        tenure_utilities = []
+        last_feedback = None
+
+        pending = self._send(execution_rate) if execution_duration > 0 else None
+        sent = int(pending is not None)
+        while pending is not None:
+            feedback = await self._consume(pending)
+            pending = None
+            # 下一个RTT先上路 (本RTT尚未记录，按在途计入预算)，再处理本RTT的反馈
+            if sent < execution_duration and self._budget_exhausted(in_flight=1) is None:
+                pending = self._send(execution_rate)
+                sent += 1
+            utility = calculate_utility(feedback, self.config['utility_params'])
+            tenure_utilities.append(utility)
+            last_feedback = feedback
+            self._process_execution_rtt(primary_component, execution_rate, feedback, utility, execution_duration)
+
+        if tenure_utilities:
+            # 任期最后一个RTT的表现作为下一轮推断的“上一轮”特征
+            self.features.fill_from_feedback('prev', last_feedback, tenure_utilities[-1])
+        self._post_tenure_review(primary_component, tenure_utilities)
+        events.emit(events.EXEC_DONE)
+
+    def close(self):
+        """结束运行：写出遥测，并关闭链路线程与后端。"""
+        super().close()
+        self.async_env.close()
@@ -0,0 +1,78 @@
+## 单组件基线：只用一个组件持续控制速率 (与Genet对比用)
+# genet_project/core/baseline.py
+
+import time
+
+from .registry import COMPONENT_TYPES, component_names, create_component, component_specs
+from .utility import UtilityParams, calculate_utility
+from .run_summary import RunStats, RunSummary
+
+
+class SingleComponentBaseline:
+    """
+    单组件基线 (纯 CUBIC / 纯 Sage 等)：每个RTT都由同一个组件根据当前网络状态给出速率，
+    没有评估、切换、推断与扶持。运行接口与 Genet.run 相同 (接受 RunBudget，返回 RunSummary)，
+    两者的结果可以直接放进同一张表比较。
+    """
+
+    def __init__(self, config, network_env, component_name):
+        """
+        Args:
+            config (dict): 配置。
+            network_env (NetworkEnvironment): 网络环境。
+            component_name (str): 基线组件名：genet_params.components 中的组件名，或任一已注册的组件类型。
+        """
+        specs = {name: (type_name, feature_group, kwargs)
+                 for type_name, name, feature_group, kwargs in component_specs(config)}
+        if component_name in specs:
+            type_name, feature_group, kwargs = specs[component_name]
+            component = create_component(type_name, component_name, feature_group, **kwargs)
+        elif component_name in COMPONENT_TYPES:
+            component = create_component(component_name)
+        else:
+            raise ValueError(f"Unknown baseline component: {component_name}")
+        self.config = config
+        self.network_env = network_env
+        self.component = component
+        self.utility_params = UtilityParams.from_config(config['utility_params'])
+        # 组件占比的列与 Genet 的汇总保持一致
+        self.component_names = component_names(config)
+        if component_name not in self.component_names:
+            self.component_names.append(component_name)
+        self.rtt_index = 0
+
+    def _sim_time(self):
+        return getattr(self.network_env.backend, 'time_sec', None)
+
+    def run(self, budget=None):
+        """
+        逐RTT运行基线组件，直到预算用完 (每个RTT计为一个周期)。
+
+        Returns:
+            RunSummary
+        """
+        stats = RunStats(self.component_names)
+        bounded = budget is not None and budget.is_bounded()
+        wall_start, sim_start, rtt_start = time.perf_counter(), self._sim_time(), self.rtt_index
+        if bounded:
+            budget.start(sim_start, rtt_start, rtt_start)
+
+        stop_reason = None
+        while stop_reason is None:
+            rate = self.component.commit_suggested_rate(self.network_env.get_current_state())
+            feedback = self.network_env.run_rate_for_one_rtt(rate)
+            utility = calculate_utility(feedback, self.utility_params)
+            self.rtt_index += 1
+            stats.add_rtt(feedback)
+            stats.add_execution(self.component.name, utility, False)
+            if bounded:
+                stop_reason = budget.exhausted(self._sim_time(), self.rtt_index, self.rtt_index)
+
+        wall_sec = time.perf_counter() - wall_start
+        sim_end = self._sim_time()
+        rtts = self.rtt_index - rtt_start
+        return RunSummary(stats, wall_sec, wall_sec if sim_end is None else sim_end - sim_start,
+                          rtts, rtts, stop_reason)
+
+    def close(self):
+        pass
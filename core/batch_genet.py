@@ -0,0 +1,318 @@
+## 批量Genet驱动：用数组同时推进N个独立的Genet实例
+# genet_project/core/batch_genet.py
+
+import numpy as np
+
+from .registry import ComponentRegistry
+from engine.recovery_engine import DynamicSupportProtocol, predict_virtual_utility
+from engine.inference_engine import DEFAULT_C_EST, DEFAULT_R_EST
+from engine.trigger_engine import DualDimensionSmartTrigger
+
+
+class BatchGenet:
+    """
+    Genet 三大阶段 (评估 / 决策 / 执行) 的批量版本。
+
+    每个场景拥有自己的置信度、任期、危机历史和自适应标杆，全部以数组形式保存。
+    各场景按自己的节奏在阶段之间切换：每一次 step() 中，每个场景恰好完成一个动作
+    (处于评估阶段的场景探测下一个组件，处于执行阶段的场景执行一个RTT)，
+    所有场景的这一个动作由 BatchNetworkEnvironment 一次向量化完成。
+
+    决策逻辑与 core/genet.py 保持一致；批量模式下没有GBDT模型，
+    触发推断时与 LearnedInferenceEngine 在模型缺失时的降级行为相同 (采用本轮最高分组件)，
+    虚拟评估也使用模型缺失时的默认 C/R 估算值。
+    """
+
+    def __init__(self, config, batch_env, genet_params=None):
+        """
+        Args:
+            config (dict): 完整配置，所有场景共享的默认参数从这里读取。
+            batch_env (BatchNetworkEnvironment): 批量网络环境。
+            genet_params (dict, optional): 按场景覆盖的 genet_params，
+                例如 {'n_min': arr, 'n_max': arr, 'eta_update_alpha': arr}，每个值是标量或长度N的数组。
+        """
+        self.config = config
+        self.env = batch_env
+        self.n_flows = batch_env.n_flows
+        n = self.n_flows
+
+        self.registry = ComponentRegistry.from_config(config)
+        self.components = self.registry.components
+        self.n_components = len(self.components)
+        k = self.n_components
+
+        params = dict(config['genet_params'])
+        params.update(genet_params or {})
+
+        def column(value):
+            return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy()
+
+        self.N_min = column(params['n_min'])
+        self.N_max = column(params['n_max'])
+        self.alpha_ewma = column(params['eta_update_alpha'])
+        self.eta = np.repeat(column(params['eta_initial'])[:, None], k, axis=1)
+
+        # 引擎参数沿用标量实现的解析逻辑，保证两者读取同一组配置
+        support = DynamicSupportProtocol(config)
+        trigger = DualDimensionSmartTrigger(config)
+        self.crisis_avg_window = int(support.crisis_avg_window)
+        self.crisis_decline_theta = support.crisis_decline_theta
+        self.crisis_rule = support.crisis_rule
+        self.crisis_zscore = support.crisis_zscore
+        self.crisis_trend = support.crisis_trend
+        self.support_beta = support.support_beta
+        self.support_k_activation = support.support_k_activation
+        self.utility_params = support.utility_params
+        self.benchmark_alpha = trigger.benchmark_alpha
+        self.activation_k = trigger.activation_k
+        self.adaptive_benchmark = np.full(n, trigger.adaptive_benchmark)
+        self.stagnation_rates_std_dev = trigger.stagnation_rates_std_dev
+        self.stagnation_throughput_ratio = trigger.stagnation_throughput_ratio
+        self.stagnation_gradient_tol = trigger.stagnation_gradient_tol
+        self.peak_decay = trigger.peak_decay
+        self.historical_max_throughput = np.full(n, trigger.historical_max_throughput)
+
+        self.eval_duration_sec = 0.5
+        self._rows = np.arange(n)
+
+        # --- 每个场景的阶段状态 ---
+        # phase ∈ [0, K) 表示正在评估第phase个组件；phase == K 表示处于执行阶段
+        self.phase = np.zeros(n, dtype=np.int64)
+        self.eval_utility = np.zeros((n, k))
+        self.eval_rate = np.zeros((n, k))
+        self.eval_gradient = np.zeros((n, k))
+        self.primary = np.zeros(n, dtype=np.int64)
+        self.execution_rate = np.zeros(n)
+        self.remaining = np.zeros(n, dtype=np.int64)
+        self.tenure = np.zeros(n, dtype=np.int64)
+        self.tenure_utility_sum = np.zeros(n)
+
+        # --- 危机监测用的效用历史 (每个场景、每个组件一个环形窗口) ---
+        w = self.crisis_avg_window
+        self.history = np.zeros((n, k, w))
+        self.history_count = np.zeros((n, k), dtype=np.int64)
+        self.history_pos = np.zeros((n, k), dtype=np.int64)
+
+        # --- 性能高原探测用的梯度窗口 (每个场景一个，保存每个周期各组件梯度的最大值) ---
+        self.gradient_window = np.zeros((n, trigger.stagnation_window))
+        self.gradient_count = np.zeros(n, dtype=np.int64)
+
+        # --- 统计量 ---
+        self.cycles = np.zeros(n, dtype=np.int64)
+        self.trigger_count = np.zeros(n, dtype=np.int64)
+        self.crisis_count = np.zeros(n, dtype=np.int64)
+        self.primary_rtts = np.zeros((n, k), dtype=np.int64)
+        self.execution_rtts = np.zeros(n, dtype=np.int64)
+        self.execution_utility_sum = np.zeros(n)
+        self.delivered_mbit = np.zeros(n)
+
+    # --- 主循环 ---
+    def run(self, steps):
+        """推进 steps 次向量化步进，返回 summary()。"""
+        for _ in range(steps):
+            self.step()
+        return self.summary()
+
+    def step(self):
+        """每个场景完成一个动作：评估一个组件，或执行一个RTT。"""
+        k = self.n_components
+        evaluating = self.phase < k
+        executing = ~evaluating
+
+        # 1. 组装本步所有场景的发送速率与时长
+        rates = self.execution_rate.copy()
+        current_rates, current_rtt, current_rtt_min = self.env.current_rate, self.env.current_rtt, self.env.current_rtt_min
+        for idx, component in enumerate(self.components):
+            mask = self.phase == idx
+            if mask.any():
+                flows = self._rows[mask]
+                rates[mask] = component.get_suggested_rate_batch(current_rates[mask], current_rtt[mask],
+                                                                 current_rtt_min[mask], flows)
+                component.on_rate_sent_batch(flows)
+        durations = np.where(evaluating, self.eval_duration_sec, self.env.simulator.rtt_sec)
+
+        # 2. 所有场景同时发送
+        feedback, utility = self.env.transmit(rates, durations)
+        self.delivered_mbit += feedback['sending_rate'] * durations
+
+        # 3. 按阶段分别推进
+        if evaluating.any():
+            self._evaluation_step(evaluating, feedback, utility)
+        if executing.any():
+            self._execution_step(executing, utility)
+
+    # --- 阶段一：评估 ---
+    def _evaluation_step(self, mask, feedback, utility):
+        rows = self._rows[mask]
+        phase = self.phase[rows]
+        self.eval_utility[rows, phase] = utility[rows]
+        self.eval_rate[rows, phase] = feedback['sending_rate'][rows]
+        self.eval_gradient[rows, phase] = feedback['rtt_gradient'][rows]
+        self.phase[rows] += 1
+
+        finished = rows[self.phase[rows] == self.n_components]
+        if finished.size:
+            self._decision_stage(finished)
+
+    # --- 阶段二：决策 ---
+    def _decision_stage(self, rows):
+        report = self.eval_utility[rows]
+        U_max = report.max(axis=1)
+
+        # a. 触发器：更新自适应标杆，检查是否所有组件都低于 k * 标杆
+        self.adaptive_benchmark[rows] = (1 - self.benchmark_alpha) * self.adaptive_benchmark[rows] + \
+                                        self.benchmark_alpha * U_max
+        threshold = self.activation_k * self.adaptive_benchmark[rows]
+        underperforming = np.all(report < threshold[:, None], axis=1)
+        self.trigger_count[rows] += underperforming | self._check_stagnation(rows)
+
+        # b. 主组件加冕；执行速率与 Genet._decision_stage 一样取自空状态下的建议
+        primary = np.argmax(report, axis=1)
+        self.primary[rows] = primary
+        default_rates = np.full(rows.size, 50.0)
+        suggestions = self.registry.suggest_rates_for_flows(default_rates, flows=rows)
+        self.execution_rate[rows] = suggestions[np.arange(rows.size), primary]
+        for idx, component in enumerate(self.components):
+            component.on_rate_sent_batch(rows[primary == idx])
+
+        # c. 次组件绩效考核
+        safe_max = np.where(U_max > 0, U_max, 1.0)
+        score = np.where(U_max[:, None] > 0, report / safe_max[:, None], 0.0)
+        score = np.maximum(score, 0)
+        alpha = self.alpha_ewma[rows][:, None]
+        updated = (1 - alpha) * self.eta[rows] + alpha * score
+        secondary = np.ones_like(report, dtype=bool)
+        secondary[np.arange(rows.size), primary] = False
+        self.eta[rows] = np.where(secondary, updated, self.eta[rows])
+
+        # d. 授权任期
+        eta_primary = self.eta[rows, primary]
+        tenure = (self.N_min[rows] + eta_primary ** 2 * (self.N_max[rows] - self.N_min[rows])).astype(np.int64)
+        self.tenure[rows] = tenure
+        self.remaining[rows] = tenure
+        self.tenure_utility_sum[rows] = 0.0
+        self.cycles[rows] += 1
+
+        self.phase[rows] = self.n_components
+        # 任期为0时直接回到评估阶段 (与标量实现一样跳过任期后评估)
+        self.phase[rows[tenure <= 0]] = 0
+
+    def _check_stagnation(self, rows):
+        """DualDimensionSmartTrigger._check_stagnation 的向量化版本 (速率趋同、梯度稳定、吞吐远低于历史峰值)。"""
+        rates = self.eval_rate[rows]
+        w = self.gradient_window.shape[1]
+        self.gradient_window[rows, self.gradient_count[rows] % w] = self.eval_gradient[rows].max(axis=1)
+        self.gradient_count[rows] += 1
+
+        current_max = rates.max(axis=1)
+        peak = self.historical_max_throughput[rows]
+        self.historical_max_throughput[rows] = np.maximum(current_max, peak * self.peak_decay)
+
+        mean_rate = rates.mean(axis=1)
+        safe_mean = np.where(mean_rate > 0, mean_rate, 1.0)
+        rates_are_close = (mean_rate > 0) & (rates.std(axis=1) / safe_mean < self.stagnation_rates_std_dev)
+        gradients_are_stable = (self.gradient_count[rows] >= w) & \
+                               (self.gradient_window[rows].max(axis=1) <= self.stagnation_gradient_tol)
+        throughput_is_low = current_max < self.stagnation_throughput_ratio * peak
+        return rates_are_close & gradients_are_stable & throughput_is_low
+
+    # --- 阶段三：执行 ---
+    def _execution_step(self, mask, utility):
+        rows = self._rows[mask]
+        primary = self.primary[rows]
+        u = utility[rows]
+
+        self.execution_rtts[rows] += 1
+        self.execution_utility_sum[rows] += u
+        self.primary_rtts[rows, primary] += 1
+        self.tenure_utility_sum[rows] += u
+
+        # a. 危机监测：更新主组件的效用历史，窗口填满后按 crisis_rule 检查
+        pos = self.history_pos[rows, primary]
+        self.history[rows, primary, pos] = u
+        self.history_pos[rows, primary] = (pos + 1) % self.crisis_avg_window
+        count = np.minimum(self.history_count[rows, primary] + 1, self.crisis_avg_window)
+        self.history_count[rows, primary] = count
+        crisis = (count >= self.crisis_avg_window) & self._crisis_rule(rows, primary, u, pos + 1)
+        if crisis.any():
+            self._apply_support(rows[crisis], primary[crisis], u[crisis])
+
+        # b. 任期结束：任期后评估并回到评估阶段
+        self.remaining[rows] -= 1
+        done = rows[self.remaining[rows] <= 0]
+        if done.size:
+            self._post_tenure_review(done)
+
+    def _crisis_rule(self, rows, primary, u, next_pos):
+        """
+        DynamicSupportProtocol.check_crisis 三种判据的向量化版本 (只对窗口已满的场景有意义)。
+
+        Args:
+            next_pos (np.ndarray): 各场景环形窗口的下一个写入位置，即窗口中最旧值的位置。
+        """
+        w = self.crisis_avg_window
+        window = self.history[rows, primary]
+        avg_utility = window.mean(axis=1)
+        if self.crisis_rule == 'decline':
+            return u < self.crisis_decline_theta * avg_utility
+        if self.crisis_rule == 'zscore':
+            std = window.std(axis=1)
+            safe_std = np.where(std > 0, std, 1.0)
+            zscore = np.where(std > 0, (u - avg_utility) / safe_std, 0.0)
+            return zscore < -self.crisis_zscore
+        # trend：按写入先后排列窗口后，对写入序号做最小二乘斜率
+        if w < 2:
+            return np.zeros(rows.size, dtype=bool)
+        order = (np.arange(w)[None, :] - next_pos[:, None]) % w
+        k = order - (w - 1) / 2.0
+        slope = (k * window).sum(axis=1) / ((np.arange(w) - (w - 1) / 2.0) ** 2).sum()
+        return slope < -self.crisis_trend * np.abs(avg_utility)
+
+    def _apply_support(self, rows, primary, primary_utility):
+        """动态扶持：为危机中的场景的所有次组件进行虚拟评估并发放奖励。"""
+        self.crisis_count[rows] += 1
+        # 所有场景、所有组件的影子速率一次算出，再用流体模型预测虚拟效用值
+        rtt_current = self.env.current_rtt[rows]
+        rtt_min = self.env.current_rtt_min[rows]
+        shadow_rates = self.registry.suggest_rates_for_flows(self.env.current_rate[rows], rtt_current, rtt_min,
+                                                             flows=rows)
+        rtt_current, rtt_min = rtt_current[:, None], rtt_min[:, None]
+        virtual_utility = predict_virtual_utility(shadow_rates, DEFAULT_C_EST, DEFAULT_R_EST,
+                                                  rtt_current, rtt_min, self.utility_params)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rho = np.where(primary_utility[:, None] != 0, virtual_utility / primary_utility[:, None], np.inf)
+        reward = self.support_beta * np.maximum(0, rho - self.support_k_activation)
+        secondary = np.ones((rows.size, self.n_components), dtype=bool)
+        secondary[np.arange(rows.size), primary] = False
+        rewarded = secondary & (reward > 0)
+        self.eta[rows] = np.where(rewarded, np.minimum(1, self.eta[rows] + reward), self.eta[rows])
+
+    def _post_tenure_review(self, rows):
+        primary = self.primary[rows]
+        avg_tenure_utility = self.tenure_utility_sum[rows] / self.tenure[rows]
+        benchmark = self.adaptive_benchmark[rows]
+        safe_benchmark = np.where(benchmark > 0, benchmark, 1.0)
+        score = np.maximum(np.where(benchmark > 0, avg_tenure_utility / safe_benchmark, 0.0), 0)
+        alpha = self.alpha_ewma[rows]
+        self.eta[rows, primary] = (1 - alpha) * self.eta[rows, primary] + alpha * score
+        self.phase[rows] = 0
+
+    # --- 结果汇总 ---
+    def summary(self):
+        """
+        返回每个场景的统计结果，每个字段是长度N的数组
+        (component_share 为 N x K，列顺序与 self.components 一致)。
+        """
+        sim_time = self.env.simulator.time_sec
+        execution_rtts = np.maximum(self.execution_rtts, 1)
+        return {
+            'sim_time_sec': sim_time.copy(),
+            'avg_throughput_mbps': np.divide(self.delivered_mbit, sim_time,
+                                             out=np.zeros(self.n_flows), where=sim_time > 0),
+            'avg_execution_utility': self.execution_utility_sum / execution_rtts,
+            'cycles': self.cycles.copy(),
+            'trigger_count': self.trigger_count.copy(),
+            'crisis_count': self.crisis_count.copy(),
+            'component_share': self.primary_rtts / execution_rtts[:, None],
+            'eta': self.eta.copy(),
+        }
\ No newline at end of file
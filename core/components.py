@@ -2,70 +2,297 @@
 
 import numpy as np
 
+from model.sage_policy import load_sage_policy, N_OBSERVATIONS
+from utils import events
+from .rolling_window import RollingWindow
+
+# 未指定时效用历史窗口的默认长度
+DEFAULT_HISTORY_WINDOW = 10
+# 尚无反馈时的默认网络状态 (与 NetworkEnvironment._get_current_state 一致)
+DEFAULT_RATE, DEFAULT_RTT = 50.0, 40.0
+# 一个MTU大小的数据包 (1500字节) 折合的Mbit数，基于排队包数的组件使用
+PACKET_MBIT = 1500 * 8 / 1e6
+
+
+def _state_columns(current_rates, rtt, rtt_min):
+    """把批量接口的 (速率, RTT, 最小RTT) 整理成等长的float64数组；未给出的RTT取默认值。"""
+    rates = np.asarray(current_rates, dtype=np.float64)
+    rtt = np.broadcast_to(np.asarray(DEFAULT_RTT if rtt is None else rtt, dtype=np.float64), rates.shape)
+    if rtt_min is None:
+        rtt_min = rtt
+    else:
+        rtt_min = np.broadcast_to(np.asarray(rtt_min, dtype=np.float64), rates.shape)
+        # 还没有测到最小RTT (inf) 时以当前RTT代替
+        rtt_min = np.where(np.isfinite(rtt_min), rtt_min, rtt)
+    return rates, rtt, rtt_min
+
+
 class BaseComponent:
     """
     所有拥塞控制组件的基类 (Interface)。
     它定义了每个组件必须具备的属性和方法。
     """
-    def __init__(self, name):
+    def __init__(self, name, history_window=DEFAULT_HISTORY_WINDOW):
         self.name = name
         self.eta = 0.5  # 置信度分数 (eta)，初始为中立
-        self.utility_history = [] # 用于未来可能的危机监测
+        self.feature_group = None  # 推断引擎特征中的角色 ('cl' / 'rl')，由组件注册表设置
+        self.utility_window = RollingWindow(history_window)  # 近期效用值，用于危机监测
 
     def get_suggested_rate(self, network_state):
         """
         根据当前网络状态，返回一个建议的发送速率。
         这是一个抽象方法，每个子类都必须重写它。
+        查询本身不能改变组件的状态 (虚拟评估的影子决策也走这里)；见 on_rate_sent。
         """
         raise NotImplementedError
 
+    def on_rate_sent(self, network_state):
+        """
+        组件对 network_state 给出的建议速率被实际发送时由调用方调用，有状态的组件在这里推进内部状态。
+        默认什么也不做。
+        """
+
+    def commit_suggested_rate(self, network_state):
+        """给出建议速率并确认它会被实际发送 (get_suggested_rate + on_rate_sent)。"""
+        rate = self.get_suggested_rate(network_state)
+        self.on_rate_sent(network_state)
+        return rate
+
+    def get_suggested_rate_batch(self, current_rates, rtt=None, rtt_min=None, flows=None):
+        """
+        批量版本：对一组场景的当前状态同时给出建议速率 (供多流批量仿真使用)。
+        默认逐个调用 get_suggested_rate，子类可以用数组运算重写它。与单流接口一样不改变组件状态。
+
+        Args:
+            current_rates (np.ndarray): 各场景的当前速率。
+            rtt (np.ndarray, optional): 各场景的当前RTT (ms)；默认 DEFAULT_RTT。
+            rtt_min (np.ndarray, optional): 各场景的最小RTT (ms)；默认等于当前RTT。
+            flows (np.ndarray, optional): 各场景的流编号，有逐流状态的组件据此取各流自己的状态；
+                为None时使用组件的单流状态。
+
+        Returns:
+            np.ndarray: 各场景的建议速率。
+        """
+        rates, rtt, rtt_min = _state_columns(current_rates, rtt, rtt_min)
+        return np.array([self.get_suggested_rate({'current_rate': r, 'rtt': d, 'rtt_min': m})
+                         for r, d, m in zip(rates, rtt, rtt_min)], dtype=np.float64)
+
+    def on_rate_sent_batch(self, flows):
+        """批量版本的 on_rate_sent：这些流上本组件的建议速率被实际发送。默认什么也不做。"""
+
+    def set_history_window(self, window):
+        """修改效用历史窗口的长度 (由扶持协议按 crisis_avg_window 设置)；已有记录会被清空。"""
+        if window != self.utility_window.capacity:
+            self.utility_window = RollingWindow(window)
+
+    @property
+    def utility_history(self):
+        """近期效用值 (按时间顺序的数组)"""
+        return self.utility_window.values()
+
     def update_utility_history(self, utility):
         """记录最近的效用值，用于危机监测"""
-        self.utility_history.append(utility)
-        # 只保留最近的N个记录，例如10个
-        if len(self.utility_history) > 10:
-            self.utility_history.pop(0)
+        self.utility_window.push(utility)
+
+    def get_last_utility(self):
+        """返回最近一次记录的效用值"""
+        return self.utility_window.last
 
     def get_avg_utility(self):
         """计算近期的平均效用值"""
-        if not self.utility_history:
-            return 0
-        return np.mean(self.utility_history)
+        return self.utility_window.mean
 
 
 class CubicComponent(BaseComponent):
     """
     CUBIC组件的实现。
     """
-    def __init__(self):
-        super().__init__("CUBIC")
+    def __init__(self, name="CUBIC"):
+        super().__init__(name)
 
     def get_suggested_rate(self, network_state):
         # --- 待实现 ---
         # 在这里，我们将调用内核中的CUBIC逻辑，或者用一个简化的模型来模拟它。
         # 目前，我们先用一个占位符。
-        print(f"[{self.name}] 根据网络状态 {network_state} 计算速率...")
+        events.emit(events.COMPONENT_SUGGEST, component=self.name, state=network_state)
         # 简化模拟：假设CUBIC总是比当前速率高一点点
         suggested_rate = network_state.get('current_rate', 50) * 1.1
         return suggested_rate
 
+    def get_suggested_rate_batch(self, current_rates, rtt=None, rtt_min=None, flows=None):
+        return np.asarray(current_rates, dtype=np.float64) * 1.1
+
 
 class SageComponent(BaseComponent):
     """
     Sage组件的实现。
+
+    配置了 model_path 时，启动时加载一次预训练的策略网络 (.onnx 或 .npz，见 model/sage_policy.py)，
+    把当前网络状态整理成观测向量，策略网络输出速率增益 (建议速率 = 当前速率 * 增益)；
+    观测向量预先分配，单次决策除策略网络本身外不再分配内存；批量观测的缓冲区按见过的最大批量复用。
+    threads 只在策略网络推断期间生效 (ONNX 的 intra-op 线程 / NumPy 推断时的BLAS线程)。
+    没有模型时退化为占位规则 (当前速率 * 1.5)。
     """
-    def __init__(self):
-        super().__init__("Sage")
-        # 在这里加载Sage的预训练神经网络模型
-        # self.model = self.load_sage_model()
-        print(f"[{self.name}] 正在加载Sage模型...")
+    # 没有模型时的占位增益
+    PLACEHOLDER_GAIN = 1.5
 
+    def __init__(self, name="Sage", model_path=None, threads=1, min_gain=0.5, max_gain=2.0):
+        """
+        Args:
+            model_path (str, optional): 策略网络文件 (.onnx / .npz)。
+            threads (int): CPU推断线程数。
+            min_gain, max_gain (float): 策略输出增益的裁剪范围。
+        """
+        super().__init__(name)
+        self.min_gain = min_gain
+        self.max_gain = max_gain
+        self.policy = None
+        if model_path:
+            events.emit(events.COMPONENT_LOAD, component=self.name, path=model_path)
+            self.policy = load_sage_policy(model_path, threads=threads)
+            if self.policy.n_inputs != N_OBSERVATIONS:
+                raise ValueError(f"Sage policy {model_path} expects {self.policy.n_inputs} inputs, "
+                                 f"but the observation has {N_OBSERVATIONS}")
+        else:
+            events.emit(events.COMPONENT_NO_MODEL, component=self.name, gain=self.PLACEHOLDER_GAIN)
+        self._observation = np.zeros(N_OBSERVATIONS, dtype=np.float32)
+        self._observations = np.zeros((0, N_OBSERVATIONS), dtype=np.float32)
 
     def get_suggested_rate(self, network_state):
-        # --- 待实现 ---
-        # 将网络状态喂给神经网络，得到建议速率。
-        # 目前，我们先用一个占位符。
-        print(f"[{self.name}] 根据网络状态 {network_state} 进行模型预测...")
-        # 简化模拟：假设Sage总是比当前速率高很多
-        suggested_rate = network_state.get('current_rate', 50) * 1.5
-        return suggested_rate
\ No newline at end of file
+        events.emit(events.COMPONENT_SUGGEST, component=self.name, state=network_state)
+        rate = network_state.get('current_rate', DEFAULT_RATE)
+        if self.policy is None:
+            return rate * self.PLACEHOLDER_GAIN
+        rtt = network_state.get('rtt', DEFAULT_RTT)
+        rtt_min = network_state.get('rtt_min', rtt)
+        if not rtt_min > 0:
+            rtt_min = rtt
+        observation = self._observation
+        observation[0] = rate
+        observation[1] = rtt
+        observation[2] = rtt_min
+        observation[3] = rtt / rtt_min - 1.0
+        gain = float(self.policy.predict_one(observation)[0])
+        return rate * min(max(gain, self.min_gain), self.max_gain)
+
+    def get_suggested_rate_batch(self, current_rates, rtt=None, rtt_min=None, flows=None):
+        if self.policy is None:
+            return np.asarray(current_rates, dtype=np.float64) * self.PLACEHOLDER_GAIN
+        rates, rtt, rtt_min = _state_columns(current_rates, rtt, rtt_min)
+        n = len(rates)
+        if n > len(self._observations):
+            self._observations = np.zeros((n, N_OBSERVATIONS), dtype=np.float32)
+        observations = self._observations[:n]
+        observations[:, 0] = rates
+        observations[:, 1] = rtt
+        observations[:, 2] = rtt_min
+        np.divide(rtt, rtt_min, out=observations[:, 3], casting='unsafe')
+        observations[:, 3] -= 1.0
+        gain = np.asarray(self.policy.predict(observations), dtype=np.float64)[:, 0]
+        return rates * np.clip(gain, self.min_gain, self.max_gain)
+
+
+class BBRComponent(BaseComponent):
+    """
+    BBR组件的简化模型：瓶颈带宽估计取最近 bw_window 次观测到的交付速率的最大值，
+    按 ProbeBW 的增益周期 (1.25, 0.75, 1, 1, 1, 1, 1, 1) 给出速率。
+    只有建议速率被实际发送时 (on_rate_sent) 才把观测写入带宽滤波器并推进一个相位，
+    影子决策等查询不改变状态。
+    批量接口没有逐场景的带宽滤波器，以各场景的当前速率作为带宽估计；每个流有自己的相位。
+    """
+    PACING_GAINS = (1.25, 0.75, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+
+    def __init__(self, name="BBR", bw_window=10):
+        super().__init__(name)
+        self.phase = 0
+        self.bw_filter = RollingWindow(bw_window)
+        self.flow_phase = np.zeros(0, dtype=np.int64)  # 批量接口：每个流的相位 (按流编号按需扩展)
+        self._gains = np.array(self.PACING_GAINS)
+
+    def get_suggested_rate(self, network_state):
+        events.emit(events.COMPONENT_SUGGEST, component=self.name, state=network_state)
+        bandwidth = max(self.bw_filter.max, network_state.get('current_rate', DEFAULT_RATE))
+        return bandwidth * self.PACING_GAINS[self.phase]
+
+    def on_rate_sent(self, network_state):
+        self.bw_filter.push(network_state.get('current_rate', DEFAULT_RATE))
+        self.phase = (self.phase + 1) % len(self.PACING_GAINS)
+
+    def _flow_phases(self, flows):
+        flows = np.asarray(flows, dtype=np.int64)
+        if flows.size and flows.max() >= len(self.flow_phase):
+            grown = np.zeros(flows.max() + 1, dtype=np.int64)
+            grown[:len(self.flow_phase)] = self.flow_phase
+            self.flow_phase = grown
+        return flows
+
+    def get_suggested_rate_batch(self, current_rates, rtt=None, rtt_min=None, flows=None):
+        rates = np.asarray(current_rates, dtype=np.float64)
+        if flows is None:
+            return rates * self.PACING_GAINS[self.phase]
+        flows = self._flow_phases(flows)
+        return rates * self._gains[self.flow_phase[flows]]
+
+    def on_rate_sent_batch(self, flows):
+        flows = self._flow_phases(flows)
+        self.flow_phase[flows] = (self.flow_phase[flows] + 1) % len(self.PACING_GAINS)
+
+
+class VegasComponent(BaseComponent):
+    """
+    TCP Vegas组件的简化模型：由 速率 * 排队时延 估算瓶颈队列中本流的包数，
+    少于 alpha 个包时加速，多于 beta 个包时减速，其间保持不变。
+    """
+
+    def __init__(self, name="Vegas", alpha=2.0, beta=4.0, step=0.05):
+        super().__init__(name)
+        self.alpha = alpha
+        self.beta = beta
+        self.step = step
+
+    def get_suggested_rate(self, network_state):
+        events.emit(events.COMPONENT_SUGGEST, component=self.name, state=network_state)
+        rate = network_state.get('current_rate', DEFAULT_RATE)
+        rtt = network_state.get('rtt', DEFAULT_RTT)
+        queued_packets = rate * max(rtt - network_state.get('rtt_min', rtt), 0.0) / 1000.0 / PACKET_MBIT
+        if queued_packets < self.alpha:
+            return rate * (1 + self.step)
+        if queued_packets > self.beta:
+            return rate * (1 - self.step)
+        return rate
+
+    def get_suggested_rate_batch(self, current_rates, rtt=None, rtt_min=None, flows=None):
+        rates, rtt, rtt_min = _state_columns(current_rates, rtt, rtt_min)
+        queued_packets = rates * np.maximum(rtt - rtt_min, 0.0) / 1000.0 / PACKET_MBIT
+        gain = np.where(queued_packets < self.alpha, 1 + self.step,
+                        np.where(queued_packets > self.beta, 1 - self.step, 1.0))
+        return rates * gain
+
+
+class CopaComponent(BaseComponent):
+    """
+    Copa组件的简化模型：目标速率为 1 / (delta * 排队时延) 个包每秒，
+    当前速率低于目标时加速，否则减速 (不含Copa的速度翻倍机制)。
+    """
+
+    def __init__(self, name="Copa", delta=0.5, step=0.05):
+        super().__init__(name)
+        self.delta = delta
+        self.step = step
+
+    def get_suggested_rate(self, network_state):
+        events.emit(events.COMPONENT_SUGGEST, component=self.name, state=network_state)
+        rate = network_state.get('current_rate', DEFAULT_RATE)
+        rtt = network_state.get('rtt', DEFAULT_RTT)
+        queue_delay_sec = max(rtt - network_state.get('rtt_min', rtt), 0.0) / 1000.0
+        # 没有排队时目标速率为无穷大
+        if queue_delay_sec == 0 or rate < PACKET_MBIT / (self.delta * queue_delay_sec):
+            return rate * (1 + self.step)
+        return rate * (1 - self.step)
+
+    def get_suggested_rate_batch(self, current_rates, rtt=None, rtt_min=None, flows=None):
+        rates, rtt, rtt_min = _state_columns(current_rates, rtt, rtt_min)
+        queue_delay_sec = np.maximum(rtt - rtt_min, 0.0) / 1000.0
+        with np.errstate(divide='ignore'):
+            target = PACKET_MBIT / (self.delta * queue_delay_sec)
+        return rates * np.where(rates < target, 1 + self.step, 1 - self.step)
@@ -0,0 +1,56 @@
+## 推断引擎输入特征的统一定义 (训练与线上共用)
+# genet_project/core/features.py
+
+import numpy as np
+
+# 9维输入由三组 (速率, 效用值, 延迟梯度) 组成：
+#   cl   —— 经典算法组件 (CUBIC) 在评估阶段的表现
+#   rl   —— 学习型组件 (Sage) 在评估阶段的表现
+#   prev —— 上一个执行阶段最后一个RTT的表现
+FEATURE_GROUPS = ('cl', 'rl', 'prev')
+# (列名前缀, 反馈字典中的键)
+FEATURE_FIELDS = (('r', 'sending_rate'), ('U', 'utility'), ('dD', 'rtt_gradient'))
+
+FEATURE_COLUMNS = [f'{prefix}_{group}' for group in FEATURE_GROUPS for prefix, _ in FEATURE_FIELDS]
+LABEL_COLUMNS = ['r_opt_label', 'C_label', 'R_label']
+
+# 组件名 -> 特征组
+COMPONENT_FEATURE_GROUPS = {'CUBIC': 'cl', 'Sage': 'rl'}
+
+
+def feature_row(feedbacks):
+    """
+    按统一的列顺序拼出一行特征 (离线生成数据时使用，保留float64精度)。
+
+    Args:
+        feedbacks (dict): 特征组 -> 反馈字典 (需包含 sending_rate、utility、rtt_gradient)。
+
+    Returns:
+        list: 与 FEATURE_COLUMNS 顺序一致的特征值。
+    """
+    return [feedbacks[group][key] for group in FEATURE_GROUPS for _, key in FEATURE_FIELDS]
+
+
+class FeatureVector:
+    """
+    推断引擎的9维输入缓冲区：一个预先分配的 float32 数组，在评估/执行阶段就地填写。
+
+    热路径上不再为每次决策构造 list / dict / DataFrame；
+    values 可以直接交给 FlatTreeEnsemble.predict_one。
+    """
+    _OFFSETS = {group: i * len(FEATURE_FIELDS) for i, group in enumerate(FEATURE_GROUPS)}
+
+    def __init__(self):
+        self.values = np.zeros(len(FEATURE_COLUMNS), dtype=np.float32)
+
+    def fill(self, group, rate, utility, gradient):
+        """就地写入一组特征。"""
+        offset = self._OFFSETS[group]
+        values = self.values
+        values[offset] = rate
+        values[offset + 1] = utility
+        values[offset + 2] = gradient
+
+    def fill_from_feedback(self, group, feedback, utility):
+        """用一条反馈字典及其效用值写入一组特征。"""
+        self.fill(group, feedback.get('sending_rate', 0), utility, feedback.get('rtt_gradient', 0))
\ No newline at end of file
@@ -1,13 +1,19 @@
 ## 模型核心
 # genet_project/core/genet.py
+import time
+
 import numpy as np
 
-from .components import CubicComponent, SageComponent
+from .registry import ComponentRegistry
 from .utility import calculate_utility
+from .features import FeatureVector
+from .run_summary import RunStats, RunSummary
 # --- 导入我们真正的智能引擎模块 ---
 from engine.recovery_engine import DynamicSupportProtocol
 from engine.inference_engine import LearnedInferenceEngine
 from engine.trigger_engine import DualDimensionSmartTrigger
+from utils import events
+from utils.telemetry import TelemetryRecorder, STAGE_EVAL, STAGE_EXEC, STAGE_VERIFY
 
 class Genet:
     """
@@ -15,16 +21,15 @@ class Genet:
     """
 
     def __init__(self, config, network_env):
-        print("Initializing Genet Framework...")
+        events.emit(events.GENET_INIT)
 
         # 1. 保存配置和网络环境的引用
         self.config = config
         self.network_env = network_env
 
-        # 2. 初始化两个备选算法组件 (永远活跃)
-        self.cubic = CubicComponent() #暂用cubic
-        self.sage = SageComponent() #暂用sage
-        self.components = [self.cubic, self.sage]
+        # 2. 按 genet_params.components 初始化候选组件池 (永远活跃)
+        self.registry = ComponentRegistry.from_config(self.config)
+        self.components = self.registry.components
 
         # 3. 初始化置信度分数 (eta) - 每个组件的“历史绩效档案”
         self.eta_initial = self.config['genet_params']['eta_initial']
@@ -40,15 +45,38 @@ class Genet:
 
         # 6. --- 实例化三大智能引擎模块 ---
         self.support_protocol = DynamicSupportProtocol(self.config)
+        self.support_protocol.register_components(self.components)
         self.inference_engine = LearnedInferenceEngine(self.config, self.network_env)
         self.trigger_engine = DualDimensionSmartTrigger(self.config)
 
-    def run(self):
+        # 7. 推断引擎的9维输入缓冲区，在评估/执行阶段就地填写
+        self.features = FeatureVector()
+
+        # 8. 每个RTT的遥测记录 (telemetry_params.enabled 为 false 时为 None)
+        self.telemetry = TelemetryRecorder.from_config(self.config, [c.name for c in self.components])
+        self.cycle = 0
+        self.rtt_index = 0
+        self.triggered = False
+
+        # 9. 有界运行的预算与统计 (见 run())
+        self.budget = None
+        self.stats = RunStats([c.name for c in self.components])
+
+    def run(self, budget=None):
         """
-        这是Genet的宏观主循环，它会周而复始地运行。
+        这是Genet的宏观主循环，它会周而复始地运行，直到运行预算用完。
+
+        Args:
+            budget (RunBudget, optional): 墙钟时间 / 仿真时间 / RTT数 / 周期数预算；
+                None 表示不设上限 (一直运行)。
+
+        Returns:
+            RunSummary: 本次运行的吞吐/时延分位数、组件占比、触发与危机次数等。
         """
-        print("Genet main loop started.")
-        while True:
+        run_start = self._begin_run(budget)
+
+        stop_reason = None
+        while stop_reason is None:
             # --- 阶段一：评估 ---
             performance_report, all_rates_info = self._evaluation_stage()
 
@@ -59,43 +87,84 @@ class Genet:
             # --- 阶段三：执行 ---
             self._execution_stage(primary_component, execution_rate, execution_duration)
 
+            stop_reason = self._budget_exhausted()
+
+        return self._finish_run(run_start, stop_reason)
+
+    def _begin_run(self, budget):
+        """开始一次有界运行：设置预算、清空统计，返回运行起点 (交给 _finish_run)。"""
+        events.emit(events.GENET_LOOP_START)
+        self.budget = budget if budget is not None and budget.is_bounded() else None
+        self.stats = RunStats([c.name for c in self.components])
+        run_start = (time.perf_counter(), self._sim_time(), self.rtt_index, self.cycle)
+        if self.budget is not None:
+            self.budget.start(*run_start[1:])
+        return run_start
+
+    def _finish_run(self, run_start, stop_reason):
+        """结束一次有界运行并返回 RunSummary。"""
+        wall_start, sim_start, rtt_start, cycle_start = run_start
+        wall_sec = time.perf_counter() - wall_start
+        sim_end = self._sim_time()
+        summary = RunSummary(self.stats, wall_sec, wall_sec if sim_end is None else sim_end - sim_start,
+                             self.rtt_index - rtt_start, self.cycle - cycle_start, stop_reason)
+        events.emit(events.RUN_FINISHED, summary=summary)
+        return summary
+
     def _evaluation_stage(self):
         """
-        在2个RTT内，真实地、交替地运行每个活跃算法，并计算其真实效用值。
+        真实地、交替地运行每个活跃算法 (每个组件一次探测)，并计算其真实效用值。
+        所有组件的建议速率在评估开始时基于同一个网络状态一次给出。
         """
-        print("\n--- [评估阶段] 开始 ---")
+        events.emit(events.EVAL_START)
+        self.triggered = False
         performance_report = {}
         # 触发器
         all_rates_info = {}
-        for component in self.components:
+        state = self.network_env.get_current_state()
+        rates = self.registry.suggest_rates_batch(state)
+        for component, rate in zip(self.components, rates):
+            component.on_rate_sent(state)
             # 假设 network_env.run_and_get_feedback() 返回了包含测量值的字典
-            feedback = self.network_env.run_and_get_feedback(component)
-
-            # 调用utility函数时，传入超参数配置
-            utility = calculate_utility(feedback, self.config['utility_params'])
-            performance_report[component.name] = (utility, component)
-            # 收集速率和梯度信息，用于后续的“高原探测”
-            all_rates_info[component.name] = {
-                'rate': feedback.get('sending_rate'),
-                'gradient': feedback.get('rtt_gradient')
-            }
-        print(f"评估报告: { {k: v[0] for k, v in performance_report.items()} }")
+            feedback = self.network_env.run_and_get_feedback(component, rate=rate)
+            self._process_probe(component, feedback, performance_report, all_rates_info)
+        if events.enabled(events.EVAL_REPORT):
+            events.emit(events.EVAL_REPORT, report={k: v[0] for k, v in performance_report.items()})
         return performance_report, all_rates_info
 
+    def _process_probe(self, component, feedback, performance_report, all_rates_info):
+        """处理一个组件的评估反馈：计算效用值，写入评估报告、遥测与推断特征。"""
+        # 调用utility函数时，传入超参数配置
+        utility = calculate_utility(feedback, self.config['utility_params'])
+        performance_report[component.name] = (utility, component)
+        self._record(STAGE_EVAL, component, None, feedback.get('sending_rate', 0), feedback, utility)
+        if component.feature_group is not None:
+            self.features.fill_from_feedback(component.feature_group, feedback, utility)
+        # 收集速率和梯度信息，用于后续的“高原探测”
+        all_rates_info[component.name] = {
+            'rate': feedback.get('sending_rate'),
+            'gradient': feedback.get('rtt_gradient')
+        }
+
     def _decision_stage(self, performance_report, all_rates_info):
-        print("--- [决策阶段] 开始 ---")
+        events.emit(events.DECISION_START)
 
         # a. 全局诊断：调用“双维智能触发器”
         needs_inference = self.trigger_engine.should_infer(performance_report, all_rates_info)
+        self.triggered = needs_inference
+        self.stats.trigger_count += needs_inference
 
         if needs_inference:
             # e.1 如果需要推断，则调用推断引擎 (含推断后验证)
-            execution_rate = self.inference_engine.infer_and_confirm(performance_report)
+            execution_rate = self.inference_engine.infer_and_confirm(performance_report, self.features.values)
             primary_component = self._select_primary_component(performance_report)
+            verification = self.inference_engine.last_verification
+            if verification is not None:
+                self._record(STAGE_VERIFY, None, None, *verification)
         else:
             # b. 主组件加冕：选出本轮表现最好的组件
             primary_component = self._select_primary_component(performance_report)
-            execution_rate = primary_component.get_suggested_rate({})  # 简化
+            execution_rate = primary_component.commit_suggested_rate({})  # 简化
 
         # c. 绩效考核：更新所有组件的置信度
         secondary_components = [c for c in self.components if c != primary_component]
@@ -103,29 +172,74 @@ class Genet:
 
         # d. 授权任期：根据胜出者的最新置信度，计算其任期
         execution_duration = self._calculate_adaptive_tenure(primary_component)
+        self.cycle += 1
 
         return primary_component, execution_rate, execution_duration
 
     def _execution_stage(self, primary_component, execution_rate, execution_duration):
-        print(f"--- [执行阶段] 开始，主组件: {primary_component.name}, 任期: {execution_duration} RTTs ---")
+        events.emit(events.EXEC_START, component=primary_component.name, tenure=execution_duration)
 
         tenure_utilities = [] # <--- 新增：用于记录整个任期的表现
 
         for rtt_count in range(execution_duration):
             current_utility = self.network_env.execute_rate_for_one_rtt(execution_rate, primary_component)
             tenure_utilities.append(current_utility) # <--- 新增：记录每个RTT的表现
+            self._process_execution_rtt(primary_component, execution_rate, self.network_env.last_feedback,
+                                        current_utility, execution_duration)
+            if self.budget is not None and self._budget_exhausted():
+                break
+        if tenure_utilities:
+            # 任期最后一个RTT的表现作为下一轮推断的“上一轮”特征
+            self.features.fill_from_feedback('prev', self.network_env.last_feedback, tenure_utilities[-1])
+        self._post_tenure_review(primary_component, tenure_utilities)
+        events.emit(events.EXEC_DONE)
 
-            is_in_crisis = self.support_protocol.check_crisis(primary_component, current_utility)
 
-            if is_in_crisis:
-                secondary_components = [c for c in self.components if c != primary_component]
-                # 注意：将推断引擎作为参数传入，以支持虚拟评估
-                self.support_protocol.apply_support(primary_component, secondary_components, self.inference_engine)
-        self._post_tenure_review(primary_component, tenure_utilities)
-        print(f"执行阶段完成。")
+    def _process_execution_rtt(self, primary_component, execution_rate, feedback, utility, execution_duration):
+        """处理执行阶段一个RTT的反馈：危机监测、遥测记录，危机时启动动态扶持。"""
+        is_in_crisis = self.support_protocol.check_crisis(primary_component, utility)
+        self._record(STAGE_EXEC, primary_component, primary_component, execution_rate,
+                     feedback, utility, execution_duration, is_in_crisis)
+
+        if is_in_crisis:
+            secondary_components = [c for c in self.components if c != primary_component]
+            # 注意：将推断引擎作为参数传入，以支持虚拟评估
+            self.support_protocol.apply_support(primary_component, secondary_components, self.inference_engine,
+                                                self.features.values, feedback)
 
+    def close(self):
+        """结束运行：把遥测缓冲区中剩余的记录写入文件。"""
+        if self.telemetry is not None:
+            self.telemetry.close()
 
     # --- 辅助函数 ---
+    def _sim_time(self):
+        """链路后端的仿真时钟 (秒)；没有仿真时钟的后端返回None。"""
+        return getattr(self.network_env.backend, 'time_sec', None)
+
+    def _budget_exhausted(self, in_flight=0):
+        """检查运行预算；in_flight 为已经发出但尚未记录的RTT数 (异步主循环使用)。"""
+        if self.budget is None:
+            return None
+        return self.budget.exhausted(self._sim_time(), self.rtt_index + in_flight, self.cycle)
+
+    def _record(self, stage, component, primary, rate, feedback, utility, tenure=0, crisis=False):
+        """更新运行统计、写一条遥测记录并推进RTT计数 (component/primary 为 None 表示推断速率 / 尚无主组件)。"""
+        self.rtt_index += 1
+        self.stats.add_rtt(feedback)
+        if stage == STAGE_EXEC:
+            self.stats.add_execution(primary.name, utility, crisis)
+        telemetry = self.telemetry
+        if telemetry is None:
+            return
+        index = telemetry.component_index
+        sim_time = self._sim_time()
+        telemetry.record(stage, index[component.name] if component is not None else -1,
+                         index[primary.name] if primary is not None else -1,
+                         rate, feedback, utility, [c.eta for c in self.components], self.cycle, self.rtt_index,
+                         tenure=tenure, triggered=self.triggered, crisis=crisis,
+                         sim_time=np.nan if sim_time is None else sim_time)
+
     def _select_primary_component(self, performance_report):
         primary_component_name = max(performance_report, key=lambda k: performance_report[k][0])
         return performance_report[primary_component_name][1]
@@ -139,12 +253,13 @@ class Genet:
             score = max(0, score)
             component.eta = (1 - self.alpha_ewma) * component.eta + self.alpha_ewma * score
 
-        print(f"置信度更新: CUBIC η={self.cubic.eta:.3f}, Sage η={self.sage.eta:.3f}")
+        if events.enabled(events.ETA_ALL_UPDATED):
+            events.emit(events.ETA_ALL_UPDATED, etas=', '.join(f"{c.name} η={c.eta:.3f}" for c in self.components))
 
     def _calculate_adaptive_tenure(self, primary_component):
         eta_primary = primary_component.eta
         duration_N = self.N_min + (eta_primary ** 2) * (self.N_max - self.N_min)
-        print(f"主组件信誉为 {eta_primary:.3f}, 获得任期: {int(duration_N)} RTTs")
+        events.emit(events.TENURE_GRANTED, eta=eta_primary, tenure=int(duration_N))
         return int(duration_N)
 
     def _update_secondary_confidence_scores(self, performance_report, secondary_components):
@@ -160,7 +275,7 @@ class Genet:
 
             # 使用EWMA公式更新
             component.eta = (1 - self.alpha_ewma) * component.eta + self.alpha_ewma * score
-            print(f"  [绩效考核-次组件] {component.name} η 更新为: {component.eta:.3f}")
+            events.emit(events.ETA_SECONDARY_UPDATED, component=component.name, eta=component.eta)
 
 
     def _post_tenure_review(self, component, tenure_utilities):
@@ -172,7 +287,7 @@ class Genet:
 
         # 1. 计算“任期总评”：整个任期内的平均效用值
         avg_tenure_utility = np.mean(tenure_utilities)
-        print(f"--- [任期后评估] {component.name} 的任期平均效用为: {avg_tenure_utility:.2f} ---")
+        events.emit(events.TENURE_REVIEW, component=component.name, utility=avg_tenure_utility)
 
         # 2. 计算归一化的表现分 (与自适应历史标杆比较)
         #    这里的 trigger_engine.adaptive_benchmark 就是我们需要的 U_adaptive_benchmark
@@ -182,4 +297,4 @@ class Genet:
 
         # 3. 更新该组件的置信度分数
         component.eta = (1 - self.alpha_ewma) * component.eta + self.alpha_ewma * score
-        print(f"  [绩效考核-主组件] {component.name} η 更新为: {component.eta:.3f}")
+        events.emit(events.ETA_PRIMARY_UPDATED, component=component.name, eta=component.eta)
@@ -0,0 +1,152 @@
+## 组件注册表：按配置构建候选组件池
+# genet_project/core/registry.py
+
+import importlib
+
+import numpy as np
+
+from .components import BaseComponent, CubicComponent, SageComponent, BBRComponent, VegasComponent, CopaComponent
+from .features import FEATURE_GROUPS, COMPONENT_FEATURE_GROUPS
+
+# 组件类型名 -> 组件类；第三方组件可以用 register_component_type 加入，
+# 也可以在配置中直接写 "模块路径:类名"
+COMPONENT_TYPES = {
+    'CUBIC': CubicComponent,
+    'Sage': SageComponent,
+    'BBR': BBRComponent,
+    'Vegas': VegasComponent,
+    'Copa': CopaComponent,
+}
+# 未配置 genet_params.components 时的候选组件池
+DEFAULT_COMPONENTS = ['CUBIC', 'Sage']
+
+
+def register_component_type(type_name, component_class):
+    """注册一个组件类型，之后即可在 genet_params.components 中按名字使用。"""
+    if not issubclass(component_class, BaseComponent):
+        raise TypeError(f"{component_class!r} is not a BaseComponent subclass")
+    COMPONENT_TYPES[type_name] = component_class
+
+
+def _resolve_type(type_name):
+    if type_name in COMPONENT_TYPES:
+        return COMPONENT_TYPES[type_name]
+    if ':' in type_name:
+        module_name, class_name = type_name.split(':', 1)
+        return getattr(importlib.import_module(module_name), class_name)
+    raise ValueError(f"Unknown component type: {type_name} (known: {', '.join(COMPONENT_TYPES)})")
+
+
+def component_specs(config):
+    """
+    把 genet_params.components 规范成 (类型名, 组件名, 特征角色, 构造参数) 列表。
+
+    每一项可以是类型名字符串，也可以是字典：
+        {type: BBR, name: BBR-fast, feature_group: cl, <其余键作为构造参数>}
+    """
+    entries = (config or {}).get('genet_params', {}).get('components') or DEFAULT_COMPONENTS
+    specs = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {'type': entry}
+        kwargs = dict(entry)
+        type_name = kwargs.pop('type')
+        name = kwargs.pop('name', None) or type_name
+        feature_group = kwargs.pop('feature_group', COMPONENT_FEATURE_GROUPS.get(type_name))
+        specs.append((type_name, name, feature_group, kwargs))
+    return specs
+
+
+def component_names(config):
+    """配置中候选组件的名字 (按顺序)，不实例化组件 (汇总表的列名等场合使用)。"""
+    return [name for _, name, _, _ in component_specs(config)]
+
+
+def create_component(type_name, name=None, feature_group=None, **kwargs):
+    """按类型名创建一个组件。"""
+    component_class = _resolve_type(type_name)
+    component = component_class(name=name, **kwargs) if name is not None else component_class(**kwargs)
+    component.feature_group = feature_group
+    return component
+
+
+class ComponentRegistry:
+    """
+    Genet 的候选组件池。
+
+    组件的顺序即置信度、遥测 eta 字段与批量数组的列顺序；
+    上层代码只通过本类遍历组件，不再按组件名分支，加入新组件只需修改配置。
+    """
+
+    def __init__(self, components):
+        """
+        Args:
+            components (list[BaseComponent]): 候选组件 (名字必须唯一)。
+        """
+        self.components = list(components)
+        self.names = [c.name for c in self.components]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Duplicate component names: {self.names}")
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+        # 推断引擎的每个特征角色 (cl / rl) 只能对应一个组件
+        self.feature_components = {}
+        for component in self.components:
+            group = component.feature_group
+            if group is None:
+                continue
+            if group not in FEATURE_GROUPS or group == 'prev':
+                raise ValueError(f"Invalid feature_group for {component.name}: {group}")
+            if group in self.feature_components:
+                raise ValueError(f"Feature group '{group}' is assigned to both "
+                                 f"{self.feature_components[group].name} and {component.name}")
+            self.feature_components[group] = component
+
+        # suggest_rates_batch 的输出缓冲区
+        self._rates = np.zeros(len(self.components))
+
+    @classmethod
+    def from_config(cls, config):
+        """按 genet_params.components 构建组件池 (未配置时为 CUBIC + Sage)。"""
+        return cls([create_component(type_name, name, feature_group, **kwargs)
+                    for type_name, name, feature_group, kwargs in component_specs(config)])
+
+    def __len__(self):
+        return len(self.components)
+
+    def __iter__(self):
+        return iter(self.components)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __getitem__(self, name):
+        return self.components[self.index[name]]
+
+    def suggest_rates_batch(self, state):
+        """
+        所有候选组件对同一个网络状态的建议速率 (不改变组件状态；实际发送时由调用方调用 on_rate_sent)。
+
+        Args:
+            state (dict): 网络状态 (current_rate / rtt / rtt_min)。
+
+        Returns:
+            np.ndarray: 与 components 顺序一致的建议速率 (内部缓冲区，下次调用时会被覆盖)。
+        """
+        rates = self._rates
+        for i, component in enumerate(self.components):
+            rates[i] = component.get_suggested_rate(state)
+        return rates
+
+    def suggest_rates_for_flows(self, current_rates, rtt=None, rtt_min=None, flows=None):
+        """
+        批量仿真使用：所有候选组件对N个场景状态的建议速率 (不改变组件状态)。
+
+        Args:
+            flows (np.ndarray, optional): 各场景的流编号 (见 BaseComponent.get_suggested_rate_batch)。
+
+        Returns:
+            np.ndarray: 形状为 (N, K) 的建议速率，列顺序与 components 一致。
+        """
+        return np.stack([c.get_suggested_rate_batch(current_rates, rtt, rtt_min, flows) for c in self.components],
+                        axis=1)
@@ -0,0 +1,146 @@
+## 定长滑动窗口的增量统计 (危机监测使用)
+# genet_project/core/rolling_window.py
+
+import numpy as np
+
+
+class RollingWindow:
+    """
+    固定容量的环形缓冲区，增量维护窗口内的 和 / 平方和 / 最小值 / 最大值。
+
+    push() 是 O(1) 的 (最小/最大值用单调队列维护，均摊 O(1))，
+    所有存储在构造时一次分配，之后不再分配；均值、方差、z-score 都是 O(1) 查询，
+    只有 trend() 与 values() 需要遍历窗口。
+    """
+    __slots__ = ('capacity', '_buf', '_n', '_sum', '_sumsq',
+                 '_maxq', '_max_head', '_max_len', '_minq', '_min_head', '_min_len')
+
+    # 每写入 capacity * _RESUM_PERIOD 个值就精确重算一次和与平方和，抑制浮点误差累积
+    _RESUM_PERIOD = 64
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity (int): 窗口长度 (最近多少个值)。
+        """
+        if capacity < 1:
+            raise ValueError(f"RollingWindow capacity must be >= 1, got {capacity}")
+        self.capacity = int(capacity)
+        self._buf = [0.0] * self.capacity
+        # 单调队列保存的是写入序号，值通过 _buf[序号 % capacity] 取得
+        self._maxq = [0] * self.capacity
+        self._minq = [0] * self.capacity
+        self.clear()
+
+    def clear(self):
+        self._n = 0           # 累计写入的个数 (也是下一个值的序号)
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._max_head = self._max_len = 0
+        self._min_head = self._min_len = 0
+
+    def push(self, x):
+        """写入一个新值；窗口已满时最旧的值被挤出。"""
+        x = float(x)
+        cap = self.capacity
+        buf = self._buf
+        seq = self._n
+        slot = seq % cap
+        if seq >= cap:
+            old = buf[slot]
+            self._sum -= old
+            self._sumsq -= old * old
+        buf[slot] = x
+        self._sum += x
+        self._sumsq += x * x
+        self._n = seq + 1
+        expired = seq - cap
+
+        # 最大值：队首过期则出队，队尾不大于 x 的都出队，x 入队
+        q, head, length = self._maxq, self._max_head, self._max_len
+        if length and q[head] <= expired:
+            head = (head + 1) % cap
+            length -= 1
+        while length and buf[q[(head + length - 1) % cap] % cap] <= x:
+            length -= 1
+        q[(head + length) % cap] = seq
+        self._max_head, self._max_len = head, length + 1
+
+        # 最小值：对称处理
+        q, head, length = self._minq, self._min_head, self._min_len
+        if length and q[head] <= expired:
+            head = (head + 1) % cap
+            length -= 1
+        while length and buf[q[(head + length - 1) % cap] % cap] >= x:
+            length -= 1
+        q[(head + length) % cap] = seq
+        self._min_head, self._min_len = head, length + 1
+
+        if self._n % (cap * self._RESUM_PERIOD) == 0:
+            values = buf if self._n >= cap else buf[:self._n]
+            self._sum = sum(values)
+            self._sumsq = sum(v * v for v in values)
+
+    def __len__(self):
+        return min(self._n, self.capacity)
+
+    @property
+    def full(self):
+        return self._n >= self.capacity
+
+    @property
+    def last(self):
+        """最近写入的值；窗口为空时为0。"""
+        if not self._n:
+            return 0.0
+        return self._buf[(self._n - 1) % self.capacity]
+
+    @property
+    def mean(self):
+        n = len(self)
+        return self._sum / n if n else 0.0
+
+    @property
+    def variance(self):
+        """窗口内的总体方差。"""
+        n = len(self)
+        if not n:
+            return 0.0
+        mean = self._sum / n
+        return max(self._sumsq / n - mean * mean, 0.0)
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    @property
+    def min(self):
+        if not self._n:
+            return 0.0
+        return self._buf[self._minq[self._min_head] % self.capacity]
+
+    @property
+    def max(self):
+        if not self._n:
+            return 0.0
+        return self._buf[self._maxq[self._max_head] % self.capacity]
+
+    def zscore(self, x):
+        """x 相对窗口均值的标准分数；窗口内没有波动时返回0。"""
+        std = self.std
+        return (x - self.mean) / std if std > 0 else 0.0
+
+    def values(self):
+        """按写入顺序返回窗口内的值 (新数组)。"""
+        n = len(self)
+        start = self._n - n
+        return np.array([self._buf[(start + k) % self.capacity] for k in range(n)])
+
+    def trend(self):
+        """窗口内数值对写入序号的最小二乘斜率 (每个值的变化量)；少于2个值时为0。"""
+        n = len(self)
+        if n < 2:
+            return 0.0
+        values = self.values()
+        k = np.arange(n) - (n - 1) / 2.0
+        return float(k @ values / (k @ k))
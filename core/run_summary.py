@@ -0,0 +1,159 @@
+## 有界运行：运行预算与运行结果汇总
+# genet_project/core/run_summary.py
+
+import time
+
+import numpy as np
+
+
+class RunBudget:
+    """
+    Genet.run 的运行预算。任意一项用完即停止；全部为 None 时不设上限。
+
+    sim_sec 以链路后端的仿真时钟计时；后端没有仿真时钟 (真实链路) 时改用墙钟时间。
+    """
+
+    def __init__(self, wall_sec=None, sim_sec=None, rtts=None, cycles=None):
+        """
+        Args:
+            wall_sec (float, optional): 墙钟时间上限 (秒)。
+            sim_sec (float, optional): 仿真时间上限 (秒)。
+            rtts (int, optional): 发送的RTT/探测总数上限 (评估、验证、执行都计入)。
+            cycles (int, optional): 决策周期数上限。
+        """
+        self.wall_sec = wall_sec
+        self.sim_sec = sim_sec
+        self.rtts = rtts
+        self.cycles = cycles
+        self._wall_start = None
+        self._sim_start = 0.0
+        self._rtt_start = 0
+        self._cycle_start = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """单次实验的预算：simulation_params.duration_sec 作为仿真时长。"""
+        params = (config or {}).get('simulation_params', {}) or {}
+        return cls(sim_sec=params.get('duration_sec'))
+
+    def is_bounded(self):
+        return any(v is not None for v in (self.wall_sec, self.sim_sec, self.rtts, self.cycles))
+
+    def start(self, sim_time, rtt_index, cycle):
+        """在运行开始时记录起点 (预算都是相对本次运行计算的)。"""
+        self._wall_start = time.perf_counter()
+        self._sim_start = sim_time
+        self._rtt_start = rtt_index
+        self._cycle_start = cycle
+
+    def exhausted(self, sim_time, rtt_index, cycle):
+        """
+        检查预算是否用完。
+
+        Args:
+            sim_time (float | None): 后端的仿真时钟；None 表示没有仿真时钟。
+
+        Returns:
+            str | None: 用完的预算名 ('wall_sec' / 'sim_sec' / 'rtts' / 'cycles')，未用完时为 None。
+        """
+        if self.rtts is not None and rtt_index - self._rtt_start >= self.rtts:
+            return 'rtts'
+        if self.cycles is not None and cycle - self._cycle_start >= self.cycles:
+            return 'cycles'
+        wall_elapsed = time.perf_counter() - self._wall_start
+        if self.sim_sec is not None:
+            elapsed = wall_elapsed if sim_time is None else sim_time - self._sim_start
+            if elapsed >= self.sim_sec:
+                return 'sim_sec'
+        if self.wall_sec is not None and wall_elapsed >= self.wall_sec:
+            return 'wall_sec'
+        return None
+
+    def __repr__(self):
+        return (f"RunBudget(wall_sec={self.wall_sec}, sim_sec={self.sim_sec}, "
+                f"rtts={self.rtts}, cycles={self.cycles})")
+
+
+class RunStats:
+    """
+    运行期间的轻量统计：每个RTT只追加几项数值，运行结束后再一次性汇总。
+    """
+
+    def __init__(self, component_names):
+        self.component_names = list(component_names)
+        self.throughput = []     # 每个RTT的实际吞吐 (Mbps)，评估/验证/执行都计入
+        self.rtt_ms = []         # 每个RTT的RTT (ms)
+        self.exec_utility = []   # 执行阶段每个RTT的效用值
+        self.primary_rtts = dict.fromkeys(self.component_names, 0)
+        self.trigger_count = 0
+        self.crisis_count = 0
+
+    def add_rtt(self, feedback):
+        self.throughput.append(feedback.get('sending_rate', np.nan))
+        self.rtt_ms.append(feedback.get('rtt_current', np.nan))
+
+    def add_execution(self, primary_name, utility, crisis):
+        self.exec_utility.append(utility)
+        self.primary_rtts[primary_name] += 1
+        self.crisis_count += bool(crisis)
+
+
+class RunSummary:
+    """一次有界运行的结果汇总。"""
+
+    PERCENTILES = (5, 50, 95, 99)
+
+    def __init__(self, stats, wall_sec, sim_sec, rtts, cycles, stop_reason):
+        throughput = np.asarray(stats.throughput, dtype=np.float64)
+        rtt_ms = np.asarray(stats.rtt_ms, dtype=np.float64)
+        exec_rtts = sum(stats.primary_rtts.values())
+
+        self.wall_sec = wall_sec
+        self.sim_sec = sim_sec
+        self.rtts = rtts
+        self.cycles = cycles
+        self.stop_reason = stop_reason
+        self.avg_throughput = float(np.nanmean(throughput)) if throughput.size else 0.0
+        self.throughput_percentiles = self._percentiles(throughput)
+        self.avg_delay = float(np.nanmean(rtt_ms)) if rtt_ms.size else 0.0
+        self.delay_percentiles = self._percentiles(rtt_ms)
+        self.mean_utility = float(np.mean(stats.exec_utility)) if stats.exec_utility else 0.0
+        self.component_share = {name: (count / exec_rtts if exec_rtts else 0.0)
+                                for name, count in stats.primary_rtts.items()}
+        self.trigger_count = stats.trigger_count
+        self.crisis_count = stats.crisis_count
+
+    @classmethod
+    def _percentiles(cls, values):
+        if not values.size:
+            return {p: 0.0 for p in cls.PERCENTILES}
+        return dict(zip(cls.PERCENTILES, np.nanpercentile(values, cls.PERCENTILES).tolist()))
+
+    def as_dict(self):
+        """展开成一层的字典 (便于写入CSV / DataFrame)。"""
+        row = {
+            'wall_sec': self.wall_sec,
+            'sim_sec': self.sim_sec,
+            'rtts': self.rtts,
+            'cycles': self.cycles,
+            'stop_reason': self.stop_reason,
+            'avg_throughput': self.avg_throughput,
+            'avg_delay': self.avg_delay,
+            'mean_utility': self.mean_utility,
+            'trigger_count': self.trigger_count,
+            'crisis_count': self.crisis_count,
+        }
+        for p, v in self.throughput_percentiles.items():
+            row[f'throughput_p{p}'] = v
+        for p, v in self.delay_percentiles.items():
+            row[f'delay_p{p}'] = v
+        for name, share in self.component_share.items():
+            row[f'share_{name}'] = share
+        return row
+
+    def __str__(self):
+        share = ', '.join(f"{name} {100 * s:.1f}%" for name, s in self.component_share.items())
+        return (f"{self.cycles} cycles / {self.rtts} RTTs in {self.sim_sec:.1f}s sim ({self.wall_sec:.2f}s wall, "
+                f"stopped by {self.stop_reason}) | throughput avg {self.avg_throughput:.2f} Mbps, "
+                f"p95 delay {self.delay_percentiles[95]:.1f} ms | mean utility {self.mean_utility:.2f} | "
+                f"share: {share} | triggers {self.trigger_count}, crises {self.crisis_count}")
@@ -4,6 +4,39 @@
 import numpy as np
 
 
+class UtilityParams:
+    """
+    预先解析好的效用函数超参数。
+
+    标量版本每次调用都要从配置字典里读取五个超参数；在批量计算或热路径中，
+    只需解析一次，然后把这个对象传给 calculate_utility / calculate_utility_batch。
+    """
+    __slots__ = ('alpha', 'tau', 'beta', 'lambda_', 'mu')
+
+    def __init__(self, alpha=1.0, tau=0.9, beta=900, lambda_=11, mu=0.2):
+        self.alpha = alpha
+        self.tau = tau
+        self.beta = beta
+        self.lambda_ = lambda_
+        self.mu = mu
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        从 config['utility_params'] 形式的字典构建参数对象 (默认值与标量版本一致)。
+        如果传入的已经是 UtilityParams，则原样返回。
+        """
+        if isinstance(config, cls):
+            return config
+        return cls(
+            alpha=config.get('alpha', 1.0),
+            tau=config.get('tau', 0.9),
+            beta=config.get('beta', 900),
+            lambda_=config.get('lambda', 11),
+            mu=config.get('mu', 0.2),
+        )
+
+
 def calculate_utility(feedback, config):
     """
     根据真实的网络反馈，计算一个发送速率的最终效用值。
@@ -12,7 +45,8 @@ def calculate_utility(feedback, config):
         feedback (dict): 包含网络测量值的字典。
                          例如: {'sending_rate': 80.0, 'rtt_gradient': 50.0,
                                'rtt_current': 35.0, 'rtt_min': 20.0}
-        config (dict): 包含效用函数超参数的字典。
+        config (dict | UtilityParams): 包含效用函数超参数的字典，
+                                       或预先解析好的 UtilityParams。
 
     Returns:
         float: 计算出的最终效用值。
@@ -23,11 +57,14 @@ def calculate_utility(feedback, config):
     rtt_current = feedback.get('rtt_current', 0)
     rtt_min = feedback.get('rtt_min', 1)  # 避免除以零
 
-    alpha = config.get('alpha', 1.0)
-    tau = config.get('tau', 0.9)
-    beta = config.get('beta', 900)
-    lambda_ = config.get('lambda', 11)
-    mu = config.get('mu', 0.2)
+    if isinstance(config, UtilityParams):
+        alpha, tau, beta, lambda_, mu = config.alpha, config.tau, config.beta, config.lambda_, config.mu
+    else:
+        alpha = config.get('alpha', 1.0)
+        tau = config.get('tau', 0.9)
+        beta = config.get('beta', 900)
+        lambda_ = config.get('lambda', 11)
+        mu = config.get('mu', 0.2)
 
     # 1. 计算收益项：吞吐量项
     throughput_benefit = alpha * (x ** tau)
@@ -46,4 +83,75 @@ def calculate_utility(feedback, config):
     # 4. 计算最终效用值：收益 - 成本
     utility_score = throughput_benefit - latency_growth_penalty - queuing_length_penalty
 
-    return utility_score
\ No newline at end of file
+    return utility_score
+
+
+def _column(feedback, field, default):
+    """从结构化数组 / 列字典 / DataFrame 中取出一列，缺失时用标量默认值代替。"""
+    names = getattr(getattr(feedback, 'dtype', None), 'names', None)
+    if names is not None:
+        present = field in names
+    else:
+        present = field in feedback
+    if not present:
+        return default
+    return np.asarray(feedback[field], dtype=np.float64)
+
+
+def calculate_utility_batch(feedback, params):
+    """
+    calculate_utility 的向量化版本，一次计算一整批反馈的效用值。
+
+    对每个元素给出与标量版本相同的结果，用于离线回放和数据集生成等
+    需要处理大量样本的场景。
+
+    Args:
+        feedback: 带有 'sending_rate'、'rtt_gradient'、'rtt_current'、'rtt_min' 字段的
+                  NumPy 结构化数组，或以这些键映射到一维数组的字典 (DataFrame 亦可)。
+                  缺失的字段按标量版本的默认值处理 (rtt_min 默认为1)。
+        params (UtilityParams | dict): 预先解析好的超参数；传入字典时会先解析一次。
+
+    Returns:
+        np.ndarray: float64 效用值数组，形状与输入列广播后的形状一致。
+    """
+    params = UtilityParams.from_config(params)
+
+    x = _column(feedback, 'sending_rate', 0.0)
+    rtt_gradient = _column(feedback, 'rtt_gradient', 0.0)
+    rtt_current = _column(feedback, 'rtt_current', 0.0)
+    rtt_min = _column(feedback, 'rtt_min', 1.0)
+
+    return utility_from_columns(x, rtt_gradient, rtt_current, rtt_min, params)
+
+
+def utility_from_columns(x, rtt_gradient, rtt_current, rtt_min, params):
+    """
+    直接基于四个列数组计算效用值 (calculate_utility_batch 的底层实现)。
+
+    Args:
+        x, rtt_gradient, rtt_current, rtt_min (array_like): 可相互广播的数组或标量。
+        params (UtilityParams): 预先解析好的超参数。
+
+    Returns:
+        np.ndarray: float64 效用值数组。
+    """
+    x = np.asarray(x, dtype=np.float64)
+    rtt_gradient = np.asarray(rtt_gradient, dtype=np.float64)
+    rtt_current = np.asarray(rtt_current, dtype=np.float64)
+    rtt_min = np.asarray(rtt_min, dtype=np.float64)
+    shape = np.broadcast_shapes(x.shape, rtt_gradient.shape, rtt_current.shape, rtt_min.shape)
+
+    # 1. 收益项 (float_power 与标量版本的 ** 逐位一致，np.power 的SIMD实现在末位上可能不同)
+    utility = params.alpha * np.float_power(x, params.tau)
+
+    # 2. 延迟增长惩罚
+    utility = utility - params.beta * x * np.maximum(rtt_gradient, 0)
+
+    # 3. 排队长度惩罚 (rtt_min <= 0 时比值按1处理)
+    valid = rtt_min > 0
+    rtt_ratio = np.divide(rtt_current, rtt_min,
+                          out=np.ones(shape, dtype=np.float64),
+                          where=np.broadcast_to(valid, shape))
+    queuing_length_penalty = np.where(rtt_ratio > (1 + params.mu), params.lambda_ * x * rtt_ratio, 0.0)
+
+    return utility - queuing_length_penalty
\ No newline at end of file
@@ -1,8 +1,22 @@
 # 学习式速率推断引擎（GBDT模型加载与调用）
 # genet_project/engine/inference_engine.py
 
-import joblib  # 用于加载/保存Scikit-learn模型 (GBDT)
+import os
+
+import numpy as np
+from core.features import FEATURE_COLUMNS, LABEL_COLUMNS
 from core.utility import calculate_utility
+from model.inference_model import FlatTreeEnsemble
+from engine.prediction_cache import PredictionCache
+from utils import events
+
+# 模型输出列的顺序，与 core.features.LABEL_COLUMNS 一致
+R_OPT_INDEX, C_EST_INDEX, R_EST_INDEX = 0, 1, 2
+# 模型不存在时返回的默认估算值
+DEFAULT_C_EST, DEFAULT_R_EST = 100, 10
+# 默认模型路径：train_model.py 写出的扁平模型工件目录；不存在时退回旧的 joblib pickle
+DEFAULT_MODEL_PATH = 'models/inference_engine.flat'
+LEGACY_MODEL_PATH = 'models/inference_engine.gbdt'
 
 
 class LearnedInferenceEngine:
@@ -11,77 +25,174 @@ class LearnedInferenceEngine:
     该模块负责加载预训练的GBDT模型，并提供两种核心服务：
     1. 估算网络状态 (C_est, R_est) 以支持虚拟评估。
     2. 在“两者皆差”时，推断并验证最优发送速率。
+
+    模型在第一次需要推断时才加载 (engine_params.inference_engine.lazy_load)，从不触发推断的运行
+    不付出加载代价；扁平模型工件以内存映射方式打开，只有旧的 pickle 格式才会导入 joblib/xgboost。
     """
 
     def __init__(self, config, network_env):
         """
-        初始化推断引擎，加载模型。
+        初始化推断引擎 (只检查模型是否存在，加载推迟到第一次使用)。
         """
         self.config = config
         self.network_env = network_env  # 用于推断后验证
 
         # 从配置文件中获取模型路径
-        model_path = config.get('models', {}).get('inference_engine_path', 'models/inference_engine.gbdt')
+        model_path = config.get('models', {}).get('inference_engine_path')
+        if model_path is None:
+            use_legacy = not os.path.exists(DEFAULT_MODEL_PATH) and os.path.exists(LEGACY_MODEL_PATH)
+            model_path = LEGACY_MODEL_PATH if use_legacy else DEFAULT_MODEL_PATH
+        self.model_path = model_path
+
+        engine_config = config.get('engine_params', {}).get('inference_engine', {})
+        self.predictor_kind = engine_config.get('predictor', 'flat')
+        self._model = None
+        self._predictor = None
+        self._loaded = False
+        if not os.path.exists(model_path):
+            events.emit(events.MODEL_MISSING, path=model_path)
+            self._loaded = True
+        elif not engine_config.get('lazy_load', True):
+            self._load_model()
+
+        # 最近一次真实验证的 (速率, 反馈, 效用值)，供遥测记录使用
+        self.last_verification = None
+
+        # 可选的预测缓存：相近的状态直接复用上一次的预测 (默认关闭)
+        self.cache = PredictionCache.from_config(engine_config.get('cache'))
+
+    @property
+    def model(self):
+        """GBDT模型 (扁平模型工件或旧的 XGBoost 模型)；第一次访问时加载，不存在时为None。"""
+        if not self._loaded:
+            self._load_model()
+        return self._model
+
+    @property
+    def predictor(self):
+        """单行决策使用的扁平预测器；无法导出时为None (退回 model.predict)。"""
+        if not self._loaded:
+            self._load_model()
+        return self._predictor
+
+    def _load_model(self):
+        """加载模型：目录按扁平模型工件 (内存映射) 加载，文件按旧的 joblib pickle 加载。"""
+        self._loaded = True
+        path = self.model_path
+        if os.path.isdir(path):
+            artifact = FlatTreeEnsemble.load(path)
+            if artifact.feature_names is not None and artifact.feature_names != FEATURE_COLUMNS:
+                raise ValueError(f"Model artifact {path} expects features {artifact.feature_names}, "
+                                 f"but the engine provides {FEATURE_COLUMNS}")
+            if artifact.target_names is not None and artifact.target_names != LABEL_COLUMNS:
+                raise ValueError(f"Model artifact {path} predicts {artifact.target_names}, expected {LABEL_COLUMNS}")
+            self._model = self._predictor = artifact
+        else:
+            import joblib  # 旧格式才需要 (反序列化时还会导入 xgboost / sklearn)
+            self._model = joblib.load(path)
+            # 加载时把树导出成扁平数组，单行决策走紧凑遍历而不是sklearn包装层的predict
+            if self.predictor_kind == 'flat':
+                try:
+                    self._predictor = FlatTreeEnsemble.from_xgboost(self._model)
+                except (AttributeError, ValueError) as e:
+                    events.emit(events.MODEL_FLAT_FALLBACK, error=e)
+        events.emit(events.MODEL_LOADED, path=path)
+
+    def _predict(self, network_state):
+        """
+        对单个网络状态 (9维特征向量) 运行GBDT，返回 [r_opt, C_est, R_est]。
+        启用缓存时，先按量化后的状态查缓存。
+        """
+        if self.cache is not None:
+            key = self.cache.key(network_state)
+            predictions = self.cache.get(key)
+            if predictions is None:
+                predictions = self._run_model(network_state)
+                self.cache.put(key, predictions)
+            return predictions
+        return self._run_model(network_state)
 
-        try:
-            self.model = joblib.load(model_path)
-            print(f"GBDT model loaded successfully from {model_path}")
-        except FileNotFoundError:
-            print(f"Warning: GBDT model not found at {model_path}. Inference will not work.")
-            self.model = None
+    def _run_model(self, network_state):
+        if self.predictor is not None:
+            return self.predictor.predict_one(network_state)
+        return np.asarray(self.model.predict([network_state]))[0]  # 模型输入需要是2D数组
+
+    def cache_stats(self):
+        """预测缓存的命中/未命中计数；未启用缓存时返回None。"""
+        return self.cache.stats() if self.cache is not None else None
+
+    def predict_batch(self, network_states):
+        """
+        批量版本：对多行网络状态同时预测，返回形状为 (n, 3) 的数组。
+        扁平预测器只在单行决策上更快；加载了 XGBoost 模型时，多行输入交给它的 predict，
+        只有扁平模型工件 (没有 XGBoost 模型) 时才用扁平预测器的批量遍历。
+        """
+        return np.asarray(self.model.predict(np.asarray(network_states)))
 
     def estimate_network_conditions(self, network_state):
         """
         职责一：作为“危机评估顾问”，估算C和R。
         """
-        if not self.model:
-            # 如果模型不存在，返回默认值
-            return {'C_est': 100, 'R_est': 10}  # 返回默认的估算值
+        if not self.model or network_state is None:
+            # 如果模型不存在 (或尚无可用的特征)，返回默认值
+            return {'C_est': DEFAULT_C_EST, 'R_est': DEFAULT_R_EST}  # 返回默认的估算值
 
         # GBDT模型被设计为多输出，可以同时预测C和R
-        # 假设模型的predict方法返回一个包含所有预测值的字典
-        predictions = self.model.predict([network_state])  # 模型输入需要是2D数组
+        predictions = self._predict(network_state)
 
         estimated_conditions = {
-            'C_est': predictions['C_est'][0],
-            'R_est': predictions['R_est'][0]
+            'C_est': predictions[C_EST_INDEX],
+            'R_est': predictions[R_EST_INDEX]
         }
         return estimated_conditions
 
-    def infer_and_confirm(self, performance_report):
+    def infer_and_confirm(self, performance_report, network_state):
         """
         职责二：作为“最终决策仲裁者”，实现完整的“推断确认协议”。
+
+        Args:
+            performance_report (dict): 本轮评估报告 {组件名: (效用值, 组件)}。
+            network_state (np.ndarray): 评估阶段填好的9维特征 (见 core.features.FeatureVector)。
         """
-        print("--- [推断引擎] 启动推断确认协议 ---")
-        if not self.model:
-            print("模型不存在，无法推断。将返回本轮最高分速率。")
-            # 降级处理：返回本轮表现最好的算法的建议速率
-            best_component_name = max(performance_report, key=lambda k: performance_report[k][0])
-            best_component = performance_report[best_component_name][1]
-            return best_component.get_suggested_rate({})
-
-        # 1. 初步推断：从GBDT获取建议速率
-        current_network_state = self.network_env.get_current_state()
-        predictions = self.model.predict([current_network_state])
-        r_candidate = predictions['r_opt'][0]
-        print(f"初步推断建议速率: {r_candidate:.2f} Mbps")
+        r_candidate = self.propose_rate(performance_report, network_state)
+        if r_candidate is None:
+            return self.fallback_rate(performance_report)
 
         # 2. 真实验证：占用1个RTT，真实地运行r_candidate
-        print("进行1 RTT真实验证...")
+        events.emit(events.INFER_VERIFY_RUN)
         feedback_candidate = self.network_env.run_rate_for_one_rtt(r_candidate)
+        return self.verdict(performance_report, r_candidate, feedback_candidate)
+
+    # 推断确认协议的三个步骤也单独提供，异步主循环 (core/async_genet.py) 在步骤之间自行调度真实验证
+
+    def propose_rate(self, performance_report, network_state):
+        """第1步 (初步推断)：从GBDT获取候选速率；没有模型时返回None。"""
+        events.emit(events.INFER_START)
+        self.last_verification = None
+        if not self.model:
+            events.emit(events.INFER_NO_MODEL)
+            return None
+        r_candidate = self._predict(network_state)[R_OPT_INDEX]
+        events.emit(events.INFER_CANDIDATE, rate=r_candidate)
+        return r_candidate
+
+    def fallback_rate(self, performance_report):
+        """没有模型时的降级处理：返回本轮表现最好的算法的建议速率。"""
+        best_component_name = max(performance_report, key=lambda k: performance_report[k][0])
+        return performance_report[best_component_name][1].commit_suggested_rate({})
+
+    def verdict(self, performance_report, r_candidate, feedback_candidate):
+        """第3步 (最终裁决)：推断速率的验证结果与本轮表现最好的组件比较，返回最终执行速率。"""
         U_candidate = calculate_utility(feedback_candidate, self.config['utility_params'])
-        print(f"验证效用值 U_candidate: {U_candidate:.2f}")
+        events.emit(events.INFER_VERIFY, utility=U_candidate)
+        self.last_verification = (r_candidate, feedback_candidate, U_candidate)
 
-        # 3. 最终裁决：比较三者，选择最高分
-        U_cubic = performance_report['CUBIC'][0]
-        U_sage = performance_report['Sage'][0]
+        best_component_name = max(performance_report, key=lambda k: performance_report[k][0])
+        U_best, best_component = performance_report[best_component_name]
 
-        if U_candidate >= U_cubic and U_candidate >= U_sage:
-            print("裁决结果: 推断速率胜出！")
+        if U_candidate >= U_best:
+            events.emit(events.INFER_VERDICT, winner='推断速率')
             return r_candidate
-        elif U_cubic >= U_sage:
-            print("裁决结果: CUBIC胜出！")
-            return self.network_env.get_component_by_name('CUBIC').get_suggested_rate(current_network_state)
-        else:
-            print("裁决结果: Sage胜出！")
-            return self.network_env.get_component_by_name('Sage').get_suggested_rate(current_network_state)
\ No newline at end of file
+        events.emit(events.INFER_VERDICT, winner=best_component_name)
+        # 以验证RTT自己的反馈作为网络状态 (异步主循环中它之后可能已有RTT在传输)
+        return best_component.commit_suggested_rate(self.network_env.state_from_feedback(feedback_candidate))
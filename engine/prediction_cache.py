@@ -0,0 +1,88 @@
+# 推断结果缓存 (量化状态键 + LRU/TTL 淘汰)
+# genet_project/engine/prediction_cache.py
+
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class PredictionCache:
+    """
+    GBDT 预测结果的记忆层。
+
+    相邻RTT之间的网络状态往往几乎相同，把9维特征按 quantum 量化到桶里作为键，
+    同一个桶内的状态复用上一次的 (r_opt, C_est, R_est)。
+    缓存容量有上限 (LRU淘汰)，每条记录还有最长存活时间 (TTL)，
+    避免网络条件变化后仍然使用过时的预测。
+    """
+
+    def __init__(self, quantum, max_size=1024, ttl_sec=1.0, clock=time.monotonic):
+        """
+        Args:
+            quantum (float | array_like): 量化步长，标量或与特征等长的数组。
+            max_size (int): 最多缓存的条目数。
+            ttl_sec (float): 每条记录的最长存活时间 (秒)；<= 0 表示不过期。
+            clock (callable): 返回当前时间 (秒) 的函数，默认 time.monotonic。
+        """
+        self.quantum = np.asarray(quantum, dtype=np.float64)
+        self.max_size = int(max_size)
+        self.ttl_sec = ttl_sec
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (存入时间, 预测值)
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, cache_params):
+        """根据 engine_params.inference_engine.cache 构建缓存；未启用时返回None。"""
+        if not cache_params or not cache_params.get('enabled', False):
+            return None
+        return cls(cache_params.get('quantum', 1.0),
+                   max_size=cache_params.get('max_size', 1024),
+                   ttl_sec=cache_params.get('ttl_sec', 1.0))
+
+    def key(self, x):
+        """把特征向量量化成可哈希的桶编号。"""
+        return np.floor(np.asarray(x, dtype=np.float64) / self.quantum).astype(np.int64).tobytes()
+
+    def get(self, key):
+        """命中时返回缓存的预测值，否则返回None (过期记录在这里被删除)。"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            if self.ttl_sec <= 0 or self.clock() - stored_at <= self.ttl_sec:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.evictions += 1
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """写入一条预测值，超出容量时淘汰最久未使用的记录。"""
+        self._entries[key] = (self.clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """命中/未命中计数与命中率。"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
\ No newline at end of file
@@ -4,6 +4,40 @@
 
 import numpy as np
 
+from core.utility import UtilityParams, utility_from_columns
+from utils import events
+
+
+def predict_virtual_utility(shadow_rates, C_est, R_est, rtt_current, rtt_min, utility_params):
+    """
+    用流体模型预测一组“影子速率”的虚拟效用值 (全部参数可相互广播)。
+
+    瓶颈容量为 C_est，其中 R_est 被背景流量占用：
+        - 队列增长速度 (即预测的延迟梯度) dD = (r + R - C) / C，为负时表示队列在排空；
+        - 一个RTT之后的预测RTT = max(rtt_min, rtt_current * (1 + dD))；
+        - 链路过载时，本流量按到达比例分得容量 C * r / (r + R)。
+    最后用与真实反馈相同的效用函数计算 U_virtual。
+
+    Args:
+        shadow_rates (array_like): 各组件的影子决策速率 (Mbps)。
+        C_est, R_est (array_like): 推断引擎估算的链路容量与背景流量。
+        rtt_current, rtt_min (array_like): 当前RTT与最小RTT (ms)。
+        utility_params (UtilityParams): 效用函数超参数。
+
+    Returns:
+        np.ndarray: 各影子速率的虚拟效用值。
+    """
+    r = np.maximum(np.asarray(shadow_rates, dtype=np.float64), 0.0)
+    C = np.maximum(np.asarray(C_est, dtype=np.float64), 1e-6)
+    R = np.maximum(np.asarray(R_est, dtype=np.float64), 0.0)
+
+    arrival = r + R
+    dD_predicted = (arrival - C) / C
+    rtt_predicted = np.maximum(rtt_min, rtt_current * (1.0 + dD_predicted))
+    throughput = np.where(arrival > C, C * np.divide(r, arrival, out=np.zeros_like(arrival), where=arrival > 0), r)
+
+    return utility_from_columns(throughput, dD_predicted, rtt_predicted, rtt_min, utility_params)
+
 
 class DynamicSupportProtocol:
     """
@@ -15,12 +49,26 @@ class DynamicSupportProtocol:
     def __init__(self, config):
         """
         初始化扶持协议所需的所有参数。
+
+        参数位于 engine_params.support_protocol (旧配置中的 recovery_params 仍然兼容)。
         """
-        recovery_params = config.get('recovery_params', {})
-        self.crisis_avg_window = recovery_params.get('crisis_avg_window', 10)
-        self.crisis_decline_theta = recovery_params.get('crisis_decline_theta', 0.5)
-        self.support_beta = recovery_params.get('support_beta', 0.2)
-        self.support_k_activation = recovery_params.get('support_k_activation', 0.8)
+        params = config.get('engine_params', {}).get('support_protocol') or config.get('recovery_params', {})
+        self.crisis_avg_window = int(params.get('crisis_avg_window', 10))
+        self.crisis_decline_theta = params.get('crisis_decline_theta', 0.5)
+        self.support_beta = params.get('support_bonus_beta', params.get('support_beta', 0.2))
+        self.support_k_activation = params.get('support_activation_k', params.get('support_k_activation', 0.8))
+        # 危机判据：decline (相对均值衰退) | zscore (低于均值若干个标准差) | trend (窗口内持续下滑)
+        self.crisis_rule = params.get('crisis_rule', 'decline')
+        if self.crisis_rule not in ('decline', 'zscore', 'trend'):
+            raise ValueError(f"Unknown crisis_rule: {self.crisis_rule}")
+        self.crisis_zscore = params.get('crisis_zscore', 2.0)
+        self.crisis_trend = params.get('crisis_trend', 0.05)
+        self.utility_params = UtilityParams.from_config(config.get('utility_params', {}))
+
+    def register_components(self, components):
+        """把各组件的效用历史窗口设置为 crisis_avg_window。"""
+        for component in components:
+            component.set_history_window(self.crisis_avg_window)
 
     def check_crisis(self, primary_component, current_utility):
         """
@@ -34,26 +82,34 @@ class DynamicSupportProtocol:
             bool: 如果触发危机则返回True，否则返回False。
         """
         # 首先，更新主组件的效用值历史记录
-        primary_component.update_utility_history(current_utility)
+        window = primary_component.utility_window
+        window.push(current_utility)
 
         # 如果历史记录还不够长，则不进行危机判断
-        if len(primary_component.utility_history) < self.crisis_avg_window:
+        if len(window) < self.crisis_avg_window:
             return False
 
         # 计算近期平均表现水平
-        avg_utility = primary_component.get_avg_utility()
+        avg_utility = window.mean
 
         # --- 核心危机触发逻辑 ---
-        # 暂时简化，只使用“相对性能衰退”条件
-        if current_utility < self.crisis_decline_theta * avg_utility:
-            print(f"[危机监测] {primary_component.name} 触发危机! "
-                  f"当前效用值({current_utility:.2f}) < "
-                  f"{self.crisis_decline_theta} * 平均效用值({avg_utility:.2f})")
-            return True
-
-        return False
-
-    def apply_support(self, primary_component, secondary_components, inference_engine):
+        if self.crisis_rule == 'decline':
+            # 相对性能衰退：当前表现 < θ * 平均表现
+            in_crisis = current_utility < self.crisis_decline_theta * avg_utility
+        elif self.crisis_rule == 'zscore':
+            # 当前表现比窗口均值低 crisis_zscore 个标准差以上
+            in_crisis = window.zscore(current_utility) < -self.crisis_zscore
+        else:
+            # 窗口内的下滑斜率 (每RTT) 超过平均表现的 crisis_trend 倍
+            in_crisis = window.trend() < -self.crisis_trend * abs(avg_utility)
+
+        if in_crisis:
+            events.emit(events.CRISIS_DETECTED, component=primary_component.name, rule=self.crisis_rule,
+                        utility=current_utility, average=avg_utility)
+        return in_crisis
+
+    def apply_support(self, primary_component, secondary_components, inference_engine, network_state=None,
+                      feedback=None):
         """
         为所有“次组件”进行虚拟评估，并给予扶持性奖励。
 
@@ -61,41 +117,54 @@ class DynamicSupportProtocol:
             primary_component (BaseComponent): 陷入危机的主组件。
             secondary_components (list): 所有其他的次组件。
             inference_engine (LearnedInferenceEngine): 推断引擎，用于提供C和R估算。
+            network_state (np.ndarray, optional): 推断引擎的9维输入特征。
+            feedback (dict, optional): 触发危机的那个RTT的反馈；默认取网络环境最近一次的反馈。
         """
-        print(f"--- [动态扶持协议] 启动 ---")
+        events.emit(events.SUPPORT_START)
+        if not secondary_components:
+            return
 
         # 获取主组件当前的糟糕表现，作为比较基准
         primary_utility_active = primary_component.get_last_utility()
 
-        for secondary in secondary_components:
-            print(f"为次组件 {secondary.name} 进行虚拟评估...")
-            # 1. 为次组件进行一次安全的虚拟评估
-            #    这需要调用推断引擎来获取C和R的估算
-            virtual_utility = self._virtual_evaluate(secondary, inference_engine)
+        # 1. 一次性为所有次组件进行安全的虚拟评估
+        virtual_utilities = self._virtual_evaluate(secondary_components, inference_engine, network_state, feedback)
 
-            # 2. 计算扶持性奖励 (Supportive Bonus)
-            #    基于相对表现
-            rho = virtual_utility / primary_utility_active if primary_utility_active != 0 else float('inf')
-
-            # 奖励公式
-            reward = self.support_beta * max(0, rho - self.support_k_activation)
+        # 2. 计算扶持性奖励 (Supportive Bonus)，基于相对表现
+        if primary_utility_active != 0:
+            rho = virtual_utilities / primary_utility_active
+        else:
+            rho = np.full(len(secondary_components), float('inf'))
+        rewards = self.support_beta * np.maximum(0, rho - self.support_k_activation)
 
+        for secondary, rho_i, reward in zip(secondary_components, rho, rewards):
             if reward > 0:
-                print(f"{secondary.name} 表现出潜力(ρ={rho:.2f})，获得扶持性奖励: +{reward:.3f} η")
                 # 3. 将奖励加到次组件的置信度上
                 secondary.eta = min(1, secondary.eta + reward)
-                print(f"更新后 {secondary.name} 的置信度 η = {secondary.eta:.3f}")
+                events.emit(events.SUPPORT_REWARD, component=secondary.name, rho=rho_i, reward=reward,
+                            eta=secondary.eta)
 
-    def _virtual_evaluate(self, component, inference_engine):
+    def _virtual_evaluate(self, components, inference_engine, network_state=None, feedback=None):
         """
-        执行虚拟评估的核心逻辑。
-        (这是我们下一个要详细实现的模块)
+        执行虚拟评估的核心逻辑 (对所有次组件一次完成)：
+        1. 让每个组件进行“影子决策”，得到 r_shadow 向量；
+        2. 调用一次推断引擎的职责一，获取 C_est 和 R_est；
+        3. 用流体模型预测出 dD_predicted；
+        4. 计算并返回 U_virtual 向量。
+
+        Returns:
+            np.ndarray: 与 components 顺序一致的虚拟效用值。
         """
-        # --- 待实现 ---
-        # 1. 让组件进行“影子决策”，得到 r_shadow
-        # 2. 调用推断引擎的职责一，获取 C_est 和 R_est
-        # 3. 用流体模型预测出 dD_predicted
-        # 4. 计算并返回 U_virtual
-        print(f"正在对 {component.name} 进行虚拟评估...")
-        # 简化模拟：暂时返回一个随机的、较高的潜在效用值
-        return np.random.uniform(500, 1500)
\ No newline at end of file
+        network_env = inference_engine.network_env
+        if feedback is None:
+            current_state = network_env.get_current_state()
+        else:
+            current_state = network_env.state_from_feedback(feedback)
+        rtt_current = current_state['rtt']
+        rtt_min = current_state['rtt_min']
+
+        # 组件查询不改变状态，影子速率就是各组件此刻实际会发送的速率
+        r_shadow = np.array([c.get_suggested_rate(current_state) for c in components], dtype=np.float64)
+        estimates = inference_engine.estimate_network_conditions(network_state)
+        return predict_virtual_utility(r_shadow, estimates['C_est'], estimates['R_est'],
+                                       rtt_current, rtt_min, self.utility_params)
\ No newline at end of file
@@ -1,7 +1,8 @@
 # 双维智能触发器的逻辑实现
 # genet_project/engine/trigger_engine.py
 
-import numpy as np
+from core.rolling_window import RollingWindow
+from utils import events
 
 
 class DualDimensionSmartTrigger:
@@ -16,16 +17,24 @@ class DualDimensionSmartTrigger:
     def __init__(self, config):
         """
         初始化触发器所需的所有参数。
+
+        参数直接位于 engine_params.inference_engine 下 (旧配置中的 inference_engine.trigger 子节仍然兼容)。
         """
-        trigger_params = config.get('engine_params', {}).get('inference_engine', {}).get('trigger', {})
+        engine_params = config.get('engine_params', {}).get('inference_engine', {})
+        trigger_params = {**engine_params, **engine_params.get('trigger', {})}
         self.benchmark_alpha = trigger_params.get('trigger_benchmark_alpha', 0.05)
         self.activation_k = trigger_params.get('trigger_activation_k', 0.85)
         self.stagnation_rates_std_dev = trigger_params.get('trigger_stagnation_rates_std_dev', 0.1)
         self.stagnation_throughput_ratio = trigger_params.get('trigger_stagnation_throughput_ratio', 0.7)
+        self.stagnation_gradient_tol = trigger_params.get('trigger_stagnation_gradient_tol', 0.01)
+        self.stagnation_window = int(trigger_params.get('trigger_stagnation_window', 5))
+        self.peak_decay = trigger_params.get('trigger_stagnation_peak_decay', 0.995)
 
         # 初始化自适应历史标杆
         self.adaptive_benchmark = 1000.0  # 可以设置一个合理的初始值
-        self.historical_max_throughput = 1.0  # 记录历史最高吞吐
+        self.historical_max_throughput = 0.0  # 记录历史最高吞吐 (按 peak_decay 每周期衰减)
+        # 最近若干个周期中各组件延迟梯度的最大值
+        self.gradient_window = RollingWindow(self.stagnation_window)
 
     def should_infer(self, performance_report, all_rates):
         """
@@ -33,7 +42,7 @@ class DualDimensionSmartTrigger:
 
         Args:
             performance_report (dict): 包含本轮各组件真实效用值的报告。
-            all_rates (list): 包含本轮所有备选速率的列表 [r_cl, r_rl, r_prev]。
+            all_rates (dict): 本轮各组件的速率与延迟梯度 {组件名: {'rate': ..., 'gradient': ...}}。
 
         Returns:
             bool: 如果需要推断则返回True，否则返回False。
@@ -52,7 +61,7 @@ class DualDimensionSmartTrigger:
 
         # --- 最终裁决 ---
         if is_underperforming or is_stagnated:
-            print(f"[触发器] 触发推断! (表现不佳: {is_underperforming}, 陷入停滞: {is_stagnated})")
+            events.emit(events.TRIGGER_FIRED, underperforming=is_underperforming, stagnated=is_stagnated)
             return True
 
         return False
@@ -69,11 +78,31 @@ class DualDimensionSmartTrigger:
         return all(u < threshold for u in utilities)
 
     def _check_stagnation(self, all_rates):
-        """检查系统是否陷入“性能高原”僵局。"""
-        # --- 待实现 ---
-        # 这个检查比较复杂，需要获取更多网络状态信息
-        # 1. 检查意见趋同: rates_are_close = np.std(all_rates) < self.stagnation_rates_std_dev
-        # 2. 检查表现稳定: gradients_are_stable = ... (所有延迟梯度都为0或负)
-        # 3. 检查潜力巨大: throughput_is_low = current_max_throughput < self.stagnation_throughput_ratio * self.historical_max_throughput
-        # return rates_are_close and gradients_are_stable and throughput_is_low
-        return False  # 暂时返回False
\ No newline at end of file
+        """
+        检查系统是否陷入“性能高原”僵局：三个条件同时成立时返回True。
+        1. 意见趋同：各组件速率的变异系数 (标准差/均值) 低于阈值；
+        2. 表现稳定：最近 stagnation_window 个周期里，所有组件的延迟梯度都不超过容差 (队列没有增长)；
+        3. 潜力巨大：本轮最高吞吐低于 (衰减的) 历史最高吞吐的一定比例。
+
+        Args:
+            all_rates (dict): {组件名: {'rate': 速率, 'gradient': 延迟梯度}}。
+        """
+        if not all_rates:
+            return False
+        rates = [info.get('rate') or 0.0 for info in all_rates.values()]
+        gradient = max(info.get('gradient') or 0.0 for info in all_rates.values())
+        current_max_throughput = max(rates)
+
+        # 增量状态：梯度窗口与衰减的历史峰值 (先比较，再把本轮计入峰值)
+        self.gradient_window.push(gradient)
+        peak = self.historical_max_throughput
+        self.historical_max_throughput = max(current_max_throughput, peak * self.peak_decay)
+
+        mean_rate = sum(rates) / len(rates)
+        if mean_rate <= 0:
+            return False
+        rate_std = (sum((r - mean_rate) ** 2 for r in rates) / len(rates)) ** 0.5
+        rates_are_close = rate_std / mean_rate < self.stagnation_rates_std_dev
+        gradients_are_stable = self.gradient_window.full and self.gradient_window.max <= self.stagnation_gradient_tol
+        throughput_is_low = current_max_throughput < self.stagnation_throughput_ratio * peak
+        return rates_are_close and gradients_are_stable and throughput_is_low
@@ -0,0 +1,101 @@
+## NetworkEnvironment 的 asyncio 版本：链路I/O在专用线程上进行，控制器在事件循环上并行处理
+# genet_project/env/async_env.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.utility import calculate_utility
+from utils import events
+
+
+class AsyncNetworkEnvironment:
+    """
+    包装一个 NetworkEnvironment，提供协程形式的同名接口。
+
+    所有发送都交给一个专用的“链路线程”串行执行 (链路同一时刻只承载一个速率)，
+    调用方可以先用 start_transmit 发出下一个RTT，再在事件循环上处理上一个RTT的反馈
+    (效用值、推断、遥测/日志写入)，使控制器的处理时间与链路上的传输重叠。
+
+    链路线程不写任何共享状态：每次发送的结果是这个RTT自己的反馈快照与发送结束时的仿真时钟，
+    被包装环境的 last_feedback 由事件循环在取走结果时更新 (见 commit_feedback)，
+    因此处理某个RTT时不会读到正在传输的下一个RTT的状态。
+
+    链路线程记录相邻两次发送之间的空闲时间 (link_idle_sec)：控制器的决策延迟
+    从不占用RTT时隙时，它只包含线程交接的开销。
+    """
+
+    def __init__(self, network_env):
+        """
+        Args:
+            network_env (NetworkEnvironment): 被包装的同步环境 (其后端只在链路线程上调用)。
+        """
+        self.env = network_env
+        self.config = network_env.config
+        self.backend = network_env.backend
+        self._link = ThreadPoolExecutor(max_workers=1, thread_name_prefix='genet-link')
+        self._last_end = None
+        self.link_idle_sec = 0.0
+        self.transmissions = 0
+
+    # --- 链路线程 ---
+    def _transmit(self, rate, duration_sec):
+        start = time.perf_counter()
+        if self._last_end is not None:
+            self.link_idle_sec += start - self._last_end
+        feedback = self.backend.transmit(rate, duration_sec)
+        sim_time = getattr(self.backend, 'time_sec', None)
+        self.transmissions += 1
+        self._last_end = time.perf_counter()
+        return feedback, sim_time
+
+    # --- 协程接口 ---
+    def start_transmit(self, rate, duration_sec=None):
+        """
+        立即把一次发送排入链路线程，返回可 await 的 Future。
+
+        必须在事件循环中调用。
+
+        Returns:
+            asyncio.Future: 结果为 (反馈字典, 发送结束时后端的仿真时钟；没有仿真时钟的后端为None)。
+        """
+        return asyncio.get_running_loop().run_in_executor(self._link, self._transmit, rate, duration_sec)
+
+    def commit_feedback(self, feedback):
+        """在事件循环上登记一个已经取走的RTT的反馈 (更新被包装环境的 last_feedback)。"""
+        self.env.last_feedback = feedback
+        return feedback
+
+    async def _run(self, rate, duration_sec=None):
+        feedback, _ = await self.start_transmit(rate, duration_sec)
+        return self.commit_feedback(feedback)
+
+    async def run_rate_for_one_rtt(self, rate):
+        """以指定速率运行一个RTT，返回完整的反馈字典。"""
+        return await self._run(rate)
+
+    async def run_and_get_feedback(self, component, duration_sec=0.5, rate=None):
+        """评估阶段：运行一个组件 (rate 为None时由组件根据当前状态给出) 并返回反馈。"""
+        if rate is None:
+            rate = component.commit_suggested_rate(self.env.get_current_state())
+        events.emit(events.ENV_EVAL_RUN, component=component.name, rate=rate, duration=duration_sec)
+        return await self._run(rate, duration_sec)
+
+    async def execute_rate_for_one_rtt(self, rate, primary_component):
+        """执行阶段：以指定速率运行一个RTT并返回效用值。"""
+        events.emit(events.ENV_EXEC_RTT, rate=rate)
+        feedback = await self._run(rate)
+        return calculate_utility(feedback, self.config['utility_params'])
+
+    # --- 与同步环境相同的状态查询 ---
+    @property
+    def last_feedback(self):
+        return self.env.last_feedback
+
+    def get_current_state(self):
+        return self.env.get_current_state()
+
+    def close(self):
+        """等待链路线程上的发送完成，再释放被包装环境的后端资源。"""
+        self._link.shutdown(wait=True)
+        self.env.close()
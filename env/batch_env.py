@@ -0,0 +1,175 @@
+## 多流批量仿真环境：把N个独立场景的链路状态放进数组，一次向量化步进
+# genet_project/env/batch_env.py
+
+import numpy as np
+
+from core.utility import UtilityParams, utility_from_columns
+from env.simulator import PACKET_BITS
+
+
+class BatchFluidLinkSimulator:
+    """
+    FluidLinkSimulator 的向量化版本：N 条相互独立的瓶颈链路。
+
+    每个参数都可以是标量或长度为N的数组 (会广播成长度N)；
+    transmit() 一次推进全部N条链路，各链路可以有各自的发送速率与时长。
+    单条链路的演化规则与 FluidLinkSimulator 完全相同。
+    """
+
+    def __init__(self, n_flows, capacity_mbps=100.0, base_rtt_ms=40.0, buffer_bdp=1.0,
+                 loss_rate=0.0, cross_traffic_mbps=0.0, cross_traffic_jitter=0.0, seed=None):
+        self.n_flows = int(n_flows)
+
+        def column(value):
+            return np.broadcast_to(np.asarray(value, dtype=np.float64), (self.n_flows,)).copy()
+
+        self.capacity_mbps = column(capacity_mbps)
+        self.base_rtt_ms = column(base_rtt_ms)
+        self.buffer_mbit = column(buffer_bdp) * self.capacity_mbps * self.base_rtt_ms / 1000.0
+        self.loss_rate = column(loss_rate)
+        self.cross_traffic_mbps = column(cross_traffic_mbps)
+        self.cross_traffic_jitter = column(cross_traffic_jitter)
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    @classmethod
+    def from_scenarios(cls, scenarios, seed=None):
+        """
+        由场景列表构建批量仿真器。
+
+        Args:
+            scenarios (list[dict]): 每个元素是 env_params.link 形式的字典。
+            seed (int, optional): 随机数种子。
+        """
+        def field(name, default):
+            return [s.get(name, default) for s in scenarios]
+
+        return cls(
+            len(scenarios),
+            capacity_mbps=field('capacity_mbps', 100.0),
+            base_rtt_ms=field('base_rtt_ms', 40.0),
+            buffer_bdp=field('buffer_bdp', 1.0),
+            loss_rate=field('loss_rate', 0.0),
+            cross_traffic_mbps=field('cross_traffic_mbps', 0.0),
+            cross_traffic_jitter=field('cross_traffic_jitter', 0.0),
+            seed=seed,
+        )
+
+    def reset(self):
+        """清空所有队列并把仿真时钟归零。"""
+        self.queue_mbit = np.zeros(self.n_flows)
+        self.time_sec = np.zeros(self.n_flows)
+        self.rtt_min_ms = np.full(self.n_flows, np.inf)
+
+    @property
+    def rtt_sec(self):
+        """每条链路当前队列状态下的RTT (秒)。"""
+        return (self.base_rtt_ms + self.queue_mbit / self.capacity_mbps * 1000.0) / 1000.0
+
+    def transmit(self, sending_rate, duration_sec=None):
+        """
+        N 条链路同时以各自的速率发送一段时间。
+
+        Args:
+            sending_rate (array_like): 长度N的发送速率 (Mbps)。
+            duration_sec (array_like, optional): 标量或长度N的时长；为None时各发送一个当前RTT。
+
+        Returns:
+            dict[str, np.ndarray]: 与 FluidLinkSimulator.transmit 相同的字段，每个字段是长度N的数组。
+        """
+        if duration_sec is None:
+            duration_sec = self.rtt_sec
+        duration_sec = np.broadcast_to(np.asarray(duration_sec, dtype=np.float64), (self.n_flows,))
+        sending_rate = np.maximum(np.asarray(sending_rate, dtype=np.float64), 0.0)
+        capacity = self.capacity_mbps
+
+        cross = self.cross_traffic_mbps
+        jittered = (self.cross_traffic_jitter > 0) & (cross > 0)
+        if jittered.any():
+            noise = self.rng.standard_normal(self.n_flows)
+            cross = np.where(jittered, np.maximum(0.0, cross * (1.0 + self.cross_traffic_jitter * noise)), cross)
+        arrival_rate = sending_rate + cross
+
+        # 1. 队列演化
+        q0 = self.queue_mbit
+        unclipped = q0 + (arrival_rate - capacity) * duration_sec
+        q1 = np.minimum(np.maximum(unclipped, 0.0), self.buffer_mbit)
+        overflow_mbit = np.maximum(unclipped - self.buffer_mbit, 0.0)
+
+        # 2. FIFO 按到达比例分配离开队列的流量
+        served_mbit = arrival_rate * duration_sec - overflow_mbit - (q1 - q0)
+        share = np.divide(sending_rate, arrival_rate, out=np.zeros(self.n_flows), where=arrival_rate > 0)
+        delivered_mbit = np.maximum(served_mbit, 0.0) * share
+        congestion_loss = overflow_mbit * share
+
+        # 3. 随机丢包
+        random_loss = np.zeros(self.n_flows)
+        lossy = (self.loss_rate > 0) & (delivered_mbit > 0)
+        if lossy.any():
+            packets = np.where(lossy, delivered_mbit * 1e6 / PACKET_BITS, 0).astype(np.int64)
+            random_loss = self.rng.binomial(packets, np.where(lossy, self.loss_rate, 0.0)) * PACKET_BITS / 1e6
+            delivered_mbit = delivered_mbit - random_loss
+
+        self.queue_mbit = q1
+        self.time_sec = self.time_sec + duration_sec
+
+        # 4. 时延反馈
+        rtt_start = self.base_rtt_ms + q0 / capacity * 1000.0
+        rtt_end = self.base_rtt_ms + q1 / capacity * 1000.0
+        self.rtt_min_ms = np.minimum(self.rtt_min_ms, np.minimum(rtt_start, rtt_end))
+
+        sent_mbit = sending_rate * duration_sec
+        positive = duration_sec > 0
+        return {
+            'sending_rate': np.divide(delivered_mbit, duration_sec, out=np.zeros(self.n_flows), where=positive),
+            'rtt_gradient': np.divide(rtt_end - rtt_start, duration_sec * 1000.0,
+                                      out=np.zeros(self.n_flows), where=positive),
+            'rtt_current': 0.5 * (rtt_start + rtt_end),
+            'rtt_min': self.rtt_min_ms.copy(),
+            'loss': np.divide(congestion_loss + random_loss, sent_mbit,
+                              out=np.zeros(self.n_flows), where=sent_mbit > 0),
+            'queue_delay_ms': q1 / capacity * 1000.0,
+        }
+
+
+class BatchNetworkEnvironment:
+    """
+    NetworkEnvironment 的批量版本：N 个场景共用一个进程、一组数组。
+
+    与标量版本一样，它负责“发送速率 -> 反馈 -> 效用值”这条链路，
+    并记录每个场景的上一轮反馈作为组件决策所需的当前状态。
+    """
+
+    def __init__(self, config, scenarios, seed=None):
+        """
+        Args:
+            config (dict): 完整配置 (读取 utility_params)。
+            scenarios (list[dict]): 每个场景的链路参数 (env_params.link 形式)。
+            seed (int, optional): 随机数种子；默认取 env_params.seed。
+        """
+        self.config = config
+        self.utility_params = UtilityParams.from_config(config.get('utility_params', {}))
+        if seed is None:
+            seed = config.get('env_params', {}).get('seed')
+        self.simulator = BatchFluidLinkSimulator.from_scenarios(scenarios, seed=seed)
+        self.n_flows = self.simulator.n_flows
+        # 尚无反馈时的默认状态与 NetworkEnvironment._get_current_state 一致
+        self.current_rate = np.full(self.n_flows, 50.0)
+        self.current_rtt = np.full(self.n_flows, 40.0)
+        self.current_rtt_min = np.full(self.n_flows, 40.0)
+
+    def transmit(self, rates, duration_sec=None):
+        """
+        所有场景同时以各自速率发送，返回 (反馈字典, 效用值数组)。
+
+        Args:
+            rates (array_like): 长度N的发送速率。
+            duration_sec (array_like, optional): 各场景的发送时长；为None时发送一个RTT。
+        """
+        feedback = self.simulator.transmit(rates, duration_sec)
+        utility = utility_from_columns(feedback['sending_rate'], feedback['rtt_gradient'],
+                                       feedback['rtt_current'], feedback['rtt_min'], self.utility_params)
+        self.current_rate = feedback['sending_rate']
+        self.current_rtt = feedback['rtt_current']
+        self.current_rtt_min = feedback['rtt_min']
+        return feedback, utility
\ No newline at end of file
@@ -0,0 +1,213 @@
+## Mahimahi执行后端：常驻的 mm-shell + 速率代理 + 回显服务器，通过持久的控制通道切换速率
+# genet_project/env/mahimahi_backend.py
+
+import os
+import sys
+import json
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+
+from utils import events
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+AGENT_PATH = os.path.join(project_root, 'env', 'rate_agent.py')
+# Mahimahi 轨迹中一个投递机会对应的包大小 (bit)
+TRACE_PACKET_BITS = 1500 * 8
+
+
+def write_constant_trace(path, capacity_mbps, period_ms=1000):
+    """
+    写一个恒定容量的 Mahimahi 轨迹 (每行一个毫秒时间戳，表示一个1500字节包的投递机会)。
+    """
+    n_packets = max(int(round(capacity_mbps * 1e6 * period_ms / 1000.0 / TRACE_PACKET_BITS)), 1)
+    timestamps = np.maximum(np.ceil(np.arange(1, n_packets + 1) * period_ms / n_packets), 1).astype(np.int64)
+    np.savetxt(path, timestamps, fmt='%d')
+    return path
+
+
+class _AgentProcess:
+    """一个常驻子进程：stdin 写JSON指令，stdout 由读线程逐行放入队列。"""
+
+    def __init__(self, command, name, startup_timeout):
+        self.name = name
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, bufsize=1, cwd=project_root)
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        self.ready = self.read_message(startup_timeout)
+        if self.ready.get('event') != 'ready':
+            raise RuntimeError(f"{name} failed to start: {self.ready}")
+
+    def _read_loop(self):
+        for line in self.process.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def read_message(self, timeout):
+        """读取下一条JSON消息；超时或进程退出时抛出 RuntimeError。"""
+        try:
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError(f"{self.name} did not answer within {timeout}s") from None
+        if line is None:
+            raise RuntimeError(f"{self.name} exited with code {self.process.wait()}")
+        return json.loads(line)
+
+    def request(self, message, timeout):
+        self.process.stdin.write(json.dumps(message) + '\n')
+        self.process.stdin.flush()
+        reply = self.read_message(timeout)
+        if reply.get('event') == 'error':
+            raise RuntimeError(f"{self.name}: {reply.get('error')}")
+        return reply
+
+    def close(self, timeout=2.0):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.write(json.dumps({'cmd': 'quit'}) + '\n')
+                self.process.stdin.flush()
+                self.process.stdin.close()
+                self.process.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+
+
+class MahimahiBackend:
+    """
+    基于真实 Mahimahi 链路的执行后端，接口与 FluidLinkSimulator 相同 (transmit / rtt_sec)。
+
+    每个场景只启动一次：
+        - 回显服务器 (rate_agent.py --role reflector) 在 mm-shell 外常驻，代替 iperf 服务器；
+        - mm-delay / mm-loss / mm-link 组成的 shell 内常驻一个速率代理 (rate_agent.py --role sender)。
+    之后每次 transmit 只是在代理的 stdin 上写一行指令并读回一行结果，
+    组件之间切换速率只需毫秒级的管道往返，而不是每次重新启动 shell 与 iperf。
+
+    launcher 为 'fake' 时不需要 Mahimahi：代理以流体模型仿真链路并走同一条控制通道 (本地测试用)。
+    真实链路没有仿真时钟，因此本后端没有 time_sec，运行预算的 sim_sec 按墙钟计时。
+    """
+
+    def __init__(self, link_params, launcher='mahimahi', reflector_port=0, packet_bytes=1200,
+                 startup_timeout_sec=10.0, command_timeout_sec=5.0, drain_rtts=1.5, seed=None, realtime=False):
+        """
+        Args:
+            link_params (dict): env_params.link 形式的链路参数 (容量、基础RTT、缓冲区、丢包率、轨迹)。
+            launcher (str): 'mahimahi' (真实 mm-shell) 或 'fake' (本地替身)。
+            reflector_port (int): 回显服务器的UDP端口 (0 表示自动分配)。
+            packet_bytes (int): 探测包大小 (字节)。
+            startup_timeout_sec (float): 等待子进程就绪的时间上限。
+            command_timeout_sec (float): 每条指令在发送时长之外额外等待应答的时间上限。
+            drain_rtts (float): 每个发送窗口结束后，最多再等待多少个RTT收回该窗口的在途回显。
+            seed (int, optional): fake 模式的随机数种子。
+            realtime (bool): fake 模式下是否按墙钟实际等待发送时长。
+        """
+        if launcher not in ('mahimahi', 'fake'):
+            raise ValueError(f"Unknown Mahimahi launcher: {launcher}")
+        self.link_params = dict(link_params)
+        self.launcher = launcher
+        self.base_rtt_ms = float(self.link_params.get('base_rtt_ms', 40.0))
+        self.command_timeout_sec = command_timeout_sec
+        self.drain_rtts = drain_rtts
+        self.last_feedback = None
+        self._tmpdir = None
+        self.reflector = None
+        self.agent = None
+
+        try:
+            if launcher == 'fake':
+                command = [sys.executable, AGENT_PATH, '--role', 'fake', '--link', json.dumps(self.link_params)]
+                if seed is not None:
+                    command += ['--seed', str(seed)]
+                if realtime:
+                    command.append('--realtime')
+            else:
+                self.reflector = _AgentProcess([sys.executable, AGENT_PATH, '--role', 'reflector',
+                                                '--port', str(reflector_port), '--packet-bytes', str(packet_bytes)],
+                                               'reflector', startup_timeout_sec)
+                command = self._shell_command(self.reflector.ready['port'], packet_bytes)
+            events.emit(events.ENV_BACKEND_START, launcher=launcher, command=' '.join(command))
+            self.agent = _AgentProcess(command, 'rate agent', startup_timeout_sec)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def from_config(cls, link_params, mahimahi_params=None, seed=None):
+        """根据 env_params.link 与 env_params.mahimahi 构建后端。"""
+        params = mahimahi_params or {}
+        return cls(link_params,
+                   launcher=params.get('launcher', 'mahimahi'),
+                   reflector_port=params.get('reflector_port', 0),
+                   packet_bytes=params.get('packet_bytes', 1200),
+                   startup_timeout_sec=params.get('startup_timeout_sec', 10.0),
+                   command_timeout_sec=params.get('command_timeout_sec', 5.0),
+                   drain_rtts=params.get('drain_rtts', 1.5),
+                   seed=seed,
+                   realtime=params.get('realtime', False))
+
+    def _shell_command(self, reflector_port, packet_bytes):
+        """构建 mm-delay [mm-loss] mm-link -- 速率代理 的嵌套shell命令 (参数列表，不经过 shell=True)。"""
+        for tool in ('mm-delay', 'mm-link'):
+            if shutil.which(tool) is None:
+                raise RuntimeError(f"{tool} not found; install Mahimahi or set env_params.mahimahi.launcher: fake")
+        link = self.link_params
+        trace = link.get('trace_path')
+        if not trace:
+            self._tmpdir = tempfile.mkdtemp(prefix='genet_mm_')
+            trace = write_constant_trace(os.path.join(self._tmpdir, 'link.trace'), link.get('capacity_mbps', 100.0))
+            capacity = float(link.get('capacity_mbps', 100.0))
+        else:
+            from env.trace_link import MahimahiTrace
+            capacity = MahimahiTrace(trace).mean_capacity_mbps
+        buffer_bytes = int(link.get('buffer_bdp', 1.0) * capacity * 1e6 * self.base_rtt_ms / 1000.0 / 8)
+
+        command = ['mm-delay', str(max(int(round(self.base_rtt_ms / 2)), 0))]
+        loss = link.get('loss_rate', 0.0)
+        if loss:
+            command += ['mm-loss', 'uplink', str(loss)]
+        command += ['mm-link', trace, trace, '--uplink-queue=droptail',
+                    f'--uplink-queue-args=bytes={max(buffer_bytes, packet_bytes)}', '--']
+        command += [sys.executable, AGENT_PATH, '--role', 'sender', '--port', str(reflector_port),
+                    '--packet-bytes', str(packet_bytes)]
+        return command
+
+    @property
+    def rtt_sec(self):
+        """最近一次测得的RTT (秒)，用作“一个RTT”的时长；尚无测量时取基础RTT。"""
+        if self.last_feedback is None:
+            return self.base_rtt_ms / 1000.0
+        return self.last_feedback['rtt_current'] / 1000.0
+
+    def transmit(self, sending_rate, duration_sec=None):
+        """
+        让速率代理以 sending_rate 发送 duration_sec 秒，返回反馈字典 (与 FluidLinkSimulator.transmit 相同的键)。
+        反馈只统计这个窗口发出的包：代理在窗口结束后最多再等待 drain_rtts 个RTT收回它们的回显。
+        """
+        if duration_sec is None:
+            duration_sec = self.rtt_sec
+        drain_sec = self.drain_rtts * self.rtt_sec
+        reply = self.agent.request({'cmd': 'send', 'rate': max(float(sending_rate), 0.0),
+                                    'duration': float(duration_sec), 'drain': drain_sec},
+                                   timeout=duration_sec + drain_sec + self.command_timeout_sec)
+        reply.pop('event', None)
+        self.last_feedback = reply
+        return reply
+
+    def close(self):
+        """停止速率代理 (连同 mm-shell) 与回显服务器，并删除临时轨迹文件。"""
+        if self.agent is not None:
+            self.agent.close()
+            self.agent = None
+        if self.reflector is not None:
+            self.reflector.process.kill()
+            self.reflector.process.wait()
+            self.reflector = None
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
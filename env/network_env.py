@@ -1,13 +1,10 @@
 ## 封装与mahimahi仿真环境交互的代码
 # genet_project/env/network_env.py
 
-import subprocess
-import time
-import re
-import pandas as pd
-import numpy as np
 # --- 导入我们自己的模块 ---
 from core.utility import calculate_utility
+from env.simulator import create_link_backend
+from utils import events
 
 class NetworkEnvironment:
     """
@@ -31,27 +28,31 @@ class NetworkEnvironment:
         self.config = config
         self.utility_params = config.get('utility_params', {})
         self.last_feedback = {}  # 用于记录上一个周期的反馈
-        print("NetworkEnvironment initialized.")
+        # 在接入真实的Mahimahi之前，由本地链路仿真器 (默认为流体模型) 产生反馈
+        self.backend = create_link_backend(config)
+        events.emit(events.ENV_INIT)
 
-    def run_and_get_feedback(self, component, duration_sec=0.5):
+    def run_and_get_feedback(self, component, duration_sec=0.5, rate=None):
         """
         在评估阶段的核心函数：真实地运行一个组件并返回其性能反馈。
 
         Args:
-            component (BaseComponent): 要运行的组件 (CubicComponent或SageComponent)。
+            component (BaseComponent): 要运行的组件。
             duration_sec (float): 运行的持续时间（秒）。
+            rate (float, optional): 组件已经给出的建议速率 (见 ComponentRegistry.suggest_rates_batch)；
+                为None时由组件根据当前网络状态给出。
 
         Returns:
             dict: 包含网络测量值的反馈字典。
         """
         # 1. 从组件获取建议速率
-        #    注意：get_current_state()是一个需要您自己实现的辅助函数
-        current_network_state = self._get_current_state()
-        rate_to_test = component.get_suggested_rate(current_network_state)
+        if rate is None:
+            rate = component.commit_suggested_rate(self._get_current_state())
+        rate_to_test = rate
 
         # 2. 构建并执行Mahimahi命令来运行这个速率
         #    这是一个简化的示例，您需要根据Mahimahi的实际用法来构建命令
-        print(f"  [Network Env] Running {component.name} at {rate_to_test:.2f} Mbps for {duration_sec}s...")
+        events.emit(events.ENV_EVAL_RUN, component=component.name, rate=rate_to_test, duration=duration_sec)
 
         # --- 待实现：调用Mahimahi和iperf的shell命令 ---
         # command = f"mm-delay 20 mm-loss 0.1 -- iperf -c <server_ip> -b {rate_to_test}M -t {duration_sec}"
@@ -61,8 +62,9 @@ class NetworkEnvironment:
         # 3. 收集并解析网络反馈 (例如，从iperf输出或tcpdump日志)
         # --- 待实现：解析iperf_output或tcpdump日志 ---
         # 这是一个复杂的过程，需要您编写专门的解析器
-        # 我们在这里用随机生成的模拟数据代替
-        feedback = self._generate_mock_feedback(rate_to_test)
+        # 我们在这里由链路仿真后端给出反馈
+        feedback = self.backend.transmit(rate_to_test, duration_sec)
+        self.last_feedback = feedback
 
         return feedback
 
@@ -70,49 +72,65 @@ class NetworkEnvironment:
         """
         在执行阶段的核心函数：以指定速率运行一个RTT。
         """
-        print(f"  [Network Env] Executing at {rate:.2f} Mbps for one RTT...")
+        events.emit(events.ENV_EXEC_RTT, rate=rate)
         # 这里的逻辑与run_and_get_feedback类似，只是运行时长是一个RTT
-        feedback = self._generate_mock_feedback(rate)
+        feedback = self.run_rate_for_one_rtt(rate)
 
         # 在这里我们直接计算并返回效用值，供危机监测使用
         utility = calculate_utility(feedback, self.config['utility_params'])
         return utility
 
+    def run_rate_for_one_rtt(self, rate):
+        """
+        以指定速率运行一个RTT，并返回完整的反馈字典 (推断引擎的“真实验证”使用)。
+        """
+        feedback = self.backend.transmit(rate)
+        self.last_feedback = feedback
+        return feedback
+
+    def run_rate_for_short_period(self, rate, duration_sec=0.2):
+        """
+        以指定速率运行一小段时间并返回反馈 (generate_data.py 的微型实验使用)。
+        """
+        feedback = self.backend.transmit(rate, duration_sec)
+        self.last_feedback = feedback
+        return feedback
+
+    def calculate_utility_from_feedback(self, feedback):
+        """用本环境的效用函数超参数计算一条反馈的效用值。"""
+        return calculate_utility(feedback, self.utility_params)
+
+    def get_last_feedback(self):
+        """返回最近一次运行得到的反馈字典 (尚未运行时为空字典)。"""
+        return self.last_feedback
+
+    def close(self):
+        """释放链路后端持有的外部资源 (如 Mahimahi 后端的常驻子进程)。"""
+        close = getattr(self.backend, 'close', None)
+        if close is not None:
+            close()
+
+    def get_current_state(self):
+        """对外暴露的当前网络状态 (见 _get_current_state)。"""
+        return self._get_current_state()
+
     def _get_current_state(self):
         """
         获取当前的网络状态，用于喂给组件进行决策。
-        这是一个需要您实现的辅助函数。
+        状态来自链路后端的上一次反馈；尚无反馈时返回默认值。
         """
-        # --- 待实现 ---
-        # 需要从内核或之前的反馈中获取最新的RTT, 吞吐量等信息
-        # 暂时返回一个空的mock状态
-        return {'current_rate': 50.0, 'rtt': 40.0}
+        return self.state_from_feedback(self.last_feedback)
 
-    def _generate_mock_feedback(self, sending_rate):
+    @staticmethod
+    def state_from_feedback(feedback):
         """
-        生成模拟的网络反馈数据，用于快速测试。
-        在您完成真实的数据采集和解析前，这个函数非常有用。
+        把一条反馈转换成组件使用的网络状态 (feedback 为空时返回默认状态)。
+
+        异步主循环中链路上可能还有下一个RTT在传输，处理某个RTT时应使用它自己的反馈快照，
+        而不是 last_feedback。
         """
-        # 模拟一个简单的网络行为
-        # 假设真实带宽是100Mbps
-        real_bandwidth = 100
-        rtt_min = 40
-
-        if sending_rate <= real_bandwidth:
-            # 未拥塞
-            throughput = sending_rate
-            rtt_current = rtt_min + np.random.uniform(0, 5)  # 正常抖动
-            rtt_gradient = np.random.uniform(-10, 10)
-        else:
-            # 拥塞
-            throughput = real_bandwidth
-            queue_delay = (sending_rate - real_bandwidth) * 2
-            rtt_current = rtt_min + queue_delay + np.random.uniform(0, 5)
-            rtt_gradient = (rtt_current - (rtt_min + queue_delay / 2)) / 0.1  # 简化的梯度计算
-
-        return {
-            'sending_rate': throughput,
-            'rtt_gradient': rtt_gradient,
-            'rtt_current': rtt_current,
-            'rtt_min': rtt_min
-        }
\ No newline at end of file
+        if not feedback:
+            return {'current_rate': 50.0, 'rtt': 40.0, 'rtt_min': 40.0}
+        return {'current_rate': feedback['sending_rate'],
+                'rtt': feedback['rtt_current'],
+                'rtt_min': feedback.get('rtt_min', feedback['rtt_current'])}
\ No newline at end of file
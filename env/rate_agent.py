@@ -0,0 +1,239 @@
+## 常驻速率代理：在Mahimahi shell内按控制通道的指令以给定速率发送UDP探测流
+# genet_project/env/rate_agent.py
+#
+# 三种角色 (同一个文件，由命令行参数选择)：
+#   sender    —— 在 mm-shell 内运行，从 stdin 逐行读取JSON指令，按速率发送带时间戳的UDP包，
+#                统计回显得到吞吐/RTT/丢包，并向 stdout 写一行JSON结果；
+#   reflector —— 在 mm-shell 外运行，把收到的UDP包原样回显 (代替每次重启的iperf服务器)；
+#   fake      —— 不发包，用流体模型仿真链路并按同一协议应答 (没有Mahimahi时的本地替身)。
+#
+# 控制协议 (每行一个JSON对象)：
+#   代理 -> {"event": "ready", ...}                   启动完成
+#   主进程 -> {"cmd": "send", "rate": Mbps, "duration": 秒, "drain": 秒 (可选，窗口结束后等待回显的上限)}
+#   代理 -> {"event": "result", "sending_rate": ..., "rtt_current": ..., ...}
+#   主进程 -> {"cmd": "quit"}
+#   出错时代理写 {"event": "error", "error": "..."}
+
+import sys
+import os
+import argparse
+import json
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# --- 项目路径设置 (在 mm-shell 中以脚本方式启动) ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from env.simulator import FluidLinkSimulator
+from utils.pcap import rtt_feedback
+
+# 探测包头：序号 (uint32) + 发送窗口编号 (uint32) + 发送时刻 (perf_counter, float64)
+HEADER = struct.Struct('!IId')
+
+
+def _reply(message):
+    sys.stdout.write(json.dumps(message) + '\n')
+    sys.stdout.flush()
+
+
+class UdpProbeSender:
+    """
+    按给定速率发送带时间戳的UDP包，并由后台线程接收回显、记录RTT样本。
+
+    每个包带有发送窗口的编号，回显按发送窗口归属：一个窗口的吞吐、丢包与RTT只统计该窗口发出的包。
+    窗口结束后继续等待它的在途回显，直到全部收回或超过 drain 秒 (约一个RTT)；
+    更晚到达的回显属于已经结束的窗口，直接丢弃。因此连续的指令之间链路最多空闲 drain 秒。
+    """
+
+    def __init__(self, server, port, packet_bytes=1200):
+        self.packet_bytes = max(int(packet_bytes), HEADER.size)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        self.sock.connect((server, port))
+        self.payload = bytearray(self.packet_bytes)
+        self.seq = 0
+        self.window = 0
+        self.rtt_min_ms = float('inf')
+        self.last_rtt_ms = None
+        # 回显样本 (窗口编号, 发送时刻, 接收时刻)；接收线程追加，主线程从另一端取走
+        self._echoes = deque()
+        self._running = True
+        self._receiver = threading.Thread(target=self._receive_loop, daemon=True)
+        self._receiver.start()
+
+    def _receive_loop(self):
+        size = self.packet_bytes
+        while self._running:
+            try:
+                data = self.sock.recv(size)
+            except OSError:
+                return
+            if len(data) >= HEADER.size:
+                _, window, sent = HEADER.unpack_from(data)
+                self._echoes.append((window, sent, time.perf_counter()))
+
+    def _collect(self, window, samples):
+        """把回显队列中属于 window 的样本移到 samples (其他窗口的迟到回显丢弃)。"""
+        echoes = self._echoes
+        while echoes:
+            echo_window, sent, received = echoes.popleft()
+            if echo_window == window:
+                samples.append((sent, received))
+
+    def send(self, rate, duration, drain=None):
+        """
+        以 rate Mbps 发送 duration 秒，等待本窗口的回显，返回反馈字典。
+
+        Args:
+            drain (float, optional): 窗口结束后等待在途回显的上限 (秒)；默认取上一次测得的RTT
+                (尚无测量时取 duration)。
+        """
+        packet_bits = self.packet_bytes * 8
+        n_packets = int(max(rate, 0.0) * 1e6 * duration / packet_bits)
+        interval = duration / n_packets if n_packets else duration
+        payload, sock = self.payload, self.sock
+        if drain is None:
+            drain = self.last_rtt_ms / 1000.0 if self.last_rtt_ms is not None else duration
+        self.window = window = (self.window + 1) & 0xFFFFFFFF
+        samples = []
+
+        start = time.perf_counter()
+        sent = 0
+        while sent < n_packets:
+            now = time.perf_counter()
+            # 发出所有已经到期的包 (sleep 的粒度远大于包间隔时按批发送)
+            due = min(int((now - start) / interval) + 1, n_packets)
+            while sent < due:
+                HEADER.pack_into(payload, 0, self.seq, window, time.perf_counter())
+                try:
+                    sock.send(payload)
+                except OSError:
+                    pass  # 本地发送缓冲区满，视为丢包
+                self.seq = (self.seq + 1) & 0xFFFFFFFF
+                sent += 1
+            next_due = start + sent * interval
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        end = start + duration
+        remaining = end - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+
+        # 等待本窗口的在途回显：全部收回或超过 drain 秒即停止
+        deadline = end + max(drain, 0.0)
+        while True:
+            self._collect(window, samples)
+            now = time.perf_counter()
+            if len(samples) >= n_packets or now >= deadline:
+                break
+            time.sleep(min(0.001, deadline - now))
+
+        received = min(len(samples), n_packets)
+        feedback = {'sending_rate': received * packet_bits / duration / 1e6,
+                    'loss': 1.0 - received / n_packets if n_packets else 0.0}
+        delay = {}
+        if samples:
+            # 按发送时刻排列：RTT梯度反映的是本窗口发送期间排队的变化
+            echoes = np.array(samples, dtype=np.float64)
+            echoes = echoes[np.argsort(echoes[:, 0], kind='stable')]
+            timestamp = echoes[:, 0] - start
+            rtt_ms = (echoes[:, 1] - echoes[:, 0]) * 1000.0
+            delay = rtt_feedback(timestamp, rtt_ms, window_sec=duration, end_time=duration)
+        if delay:
+            self.rtt_min_ms = min(self.rtt_min_ms, delay['rtt_min'])
+            delay['rtt_min'] = self.rtt_min_ms
+            feedback.update(delay)
+            self.last_rtt_ms = delay['rtt_current']
+        else:
+            # 窗口内没有可用的回显：沿用上一次的RTT (尚无测量时记为窗口长度)，梯度记为0
+            rtt = self.last_rtt_ms if self.last_rtt_ms is not None else duration * 1000.0
+            feedback.update(rtt_current=rtt, rtt_min=min(self.rtt_min_ms, rtt), rtt_gradient=0.0)
+        return feedback
+
+    def close(self):
+        self._running = False
+        self.sock.close()
+
+
+class FakeLinkSender:
+    """本地替身：用流体模型代替真实链路，按同一协议应答 (可选按墙钟实际等待发送时长)。"""
+
+    def __init__(self, link_params, seed=None, realtime=False):
+        self.simulator = FluidLinkSimulator.from_config(link_params, seed=seed)
+        self.realtime = realtime
+
+    def send(self, rate, duration, drain=None):
+        # 流体模型的反馈本身就按发送窗口计，没有在途的包需要等待 (drain 不起作用)
+        if self.realtime:
+            time.sleep(duration)
+        return self.simulator.transmit(rate, duration)
+
+    def close(self):
+        pass
+
+
+def serve_commands(sender):
+    """控制通道主循环：逐行处理 stdin 上的指令，直到收到 quit 或 stdin 关闭。"""
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            command = json.loads(line)
+            if command.get('cmd') == 'quit':
+                break
+            if command.get('cmd') != 'send':
+                raise ValueError(f"unknown command: {command.get('cmd')}")
+            drain = command.get('drain')
+            feedback = sender.send(float(command['rate']), float(command['duration']),
+                                   None if drain is None else float(drain))
+            _reply({'event': 'result', **{k: float(v) for k, v in feedback.items()}})
+        except Exception as e:
+            _reply({'event': 'error', 'error': f'{type(e).__name__}: {e}'})
+    sender.close()
+
+
+def run_reflector(port, packet_bytes):
+    """UDP回显服务器：把收到的每个包原样发回。"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+    sock.bind(('0.0.0.0', port))
+    _reply({'event': 'ready', 'role': 'reflector', 'port': sock.getsockname()[1]})
+    buffer = bytearray(max(packet_bytes, 2048))
+    while True:
+        n, address = sock.recvfrom_into(buffer)
+        try:
+            sock.sendto(memoryview(buffer)[:n], address)
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Persistent rate agent for the Mahimahi backend.')
+    parser.add_argument('--role', choices=['sender', 'reflector', 'fake'], default='sender')
+    parser.add_argument('--server', default=None, help='reflector address (default: $MAHIMAHI_BASE)')
+    parser.add_argument('--port', type=int, default=0, help='reflector UDP port')
+    parser.add_argument('--packet-bytes', type=int, default=1200)
+    parser.add_argument('--link', default='{}', help='fake role: env_params.link as JSON')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--realtime', action='store_true', help='fake role: sleep for each send duration')
+    args = parser.parse_args()
+
+    if args.role == 'reflector':
+        run_reflector(args.port, args.packet_bytes)
+    elif args.role == 'fake':
+        agent = FakeLinkSender(json.loads(args.link), seed=args.seed, realtime=args.realtime)
+        _reply({'event': 'ready', 'role': 'fake'})
+        serve_commands(agent)
+    else:
+        server = args.server or os.environ.get('MAHIMAHI_BASE', '127.0.0.1')
+        agent = UdpProbeSender(server, args.port, args.packet_bytes)
+        _reply({'event': 'ready', 'role': 'sender', 'server': server})
+        serve_commands(agent)
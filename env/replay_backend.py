@@ -0,0 +1,102 @@
+## 回放后端：把遥测文件中记录的逐RTT反馈按顺序重新喂给控制器 (离线、按CPU速度运行)
+# genet_project/env/replay_backend.py
+
+import math
+
+import numpy as np
+
+from utils.telemetry import load_telemetry, STAGE_EVAL
+
+
+class ReplayBackend:
+    """
+    接口与 FluidLinkSimulator 相同 (transmit / rtt_sec / time_sec) 的回放后端。
+
+    第 i 次 transmit 返回录制运行中第 i 条遥测记录的反馈 (吞吐、RTT、最小RTT、RTT梯度)，
+    与请求的速率无关；控制器逻辑不变时，回放运行逐RTT地重现录制运行的全部决策。
+    决策一旦与录制运行不同，回放反馈就只是近似：请求速率与录制速率不同时，
+    吞吐取 min(录制吞吐, 请求速率) (链路不会交付比发送更多的数据)，其余字段照录制值给出。
+    评估记录的 rate 字段是测得的吞吐而不是请求速率，因此只对执行/验证记录做这项检查。
+
+    time_sec 取记录中的仿真时间 (真实链路记录为 NaN 时按请求时长累加)，
+    因此按仿真时间设定的运行预算与录制运行一致。
+    """
+
+    def __init__(self, records, rate_tolerance=1e-3):
+        """
+        Args:
+            records (np.ndarray): load_telemetry 返回的结构化遥测记录。
+            rate_tolerance (float): 请求速率与录制速率的相对差超过它时，视为速率不一致。
+        """
+        if len(records) == 0:
+            raise ValueError("Cannot replay an empty telemetry file")
+        self.n_records = len(records)
+        # 预先转换成Python列表：逐条取值比索引 memmap 快得多
+        self._rate = records['rate'].astype(np.float64).tolist()
+        self._throughput = records['throughput'].astype(np.float64).tolist()
+        self._rtt = records['rtt_ms'].astype(np.float64).tolist()
+        self._rtt_min = records['rtt_min_ms'].astype(np.float64).tolist()
+        self._gradient = records['rtt_gradient'].astype(np.float64).tolist()
+        self._sim_time = records['sim_time'].astype(np.float64).tolist()
+        self._rate_known = (records['stage'] != STAGE_EVAL).tolist()
+        self.rate_tolerance = rate_tolerance
+
+        self.position = 0
+        self.time_sec = 0.0
+        self.last_feedback = None
+        self.rate_mismatches = 0   # 请求速率与录制速率不一致的次数
+        self.overrun = 0           # 记录用完后仍被请求的次数 (重复最后一条记录)
+
+    @classmethod
+    def from_path(cls, path, rate_tolerance=1e-3):
+        """从遥测文件构建后端，返回 (后端, 文件头部)。"""
+        records, header = load_telemetry(path)
+        return cls(records, rate_tolerance=rate_tolerance), header
+
+    @classmethod
+    def from_config(cls, replay_params):
+        """根据 env_params.replay ({path, rate_tolerance}) 构建后端。"""
+        params = replay_params or {}
+        if not params.get('path'):
+            raise ValueError("env_params.replay.path must point to a telemetry file")
+        backend, _ = cls.from_path(params['path'], rate_tolerance=params.get('rate_tolerance', 1e-3))
+        return backend
+
+    @property
+    def rtt_sec(self):
+        """最近一次回放的RTT (秒)；尚未回放时取第一条记录的RTT。"""
+        rtt_ms = self._rtt[max(self.position - 1, 0)]
+        return rtt_ms / 1000.0 if rtt_ms > 0 else 0.04
+
+    def transmit(self, sending_rate, duration_sec=None):
+        """
+        返回下一条录制的反馈 (记录用完后重复最后一条并计入 overrun)。
+
+        Returns:
+            dict: 与 FluidLinkSimulator.transmit 相同键的反馈 (录制文件中没有的 loss、queue_delay_ms 除外)。
+        """
+        if duration_sec is None:
+            duration_sec = self.rtt_sec
+        i = self.position
+        if i < self.n_records:
+            self.position = i + 1
+        else:
+            i = self.n_records - 1
+            self.overrun += 1
+
+        throughput = self._throughput[i]
+        recorded_rate = self._rate[i]
+        if self._rate_known[i] and \
+                abs(sending_rate - recorded_rate) > self.rate_tolerance * max(abs(recorded_rate), 1.0):
+            self.rate_mismatches += 1
+            throughput = min(throughput, max(sending_rate, 0.0))
+
+        sim_time = self._sim_time[i]
+        self.time_sec = sim_time if not math.isnan(sim_time) else self.time_sec + duration_sec
+        self.last_feedback = {
+            'sending_rate': throughput,
+            'rtt_gradient': self._gradient[i],
+            'rtt_current': self._rtt[i],
+            'rtt_min': self._rtt_min[i],
+        }
+        return self.last_feedback
@@ -0,0 +1,227 @@
+## 本地链路仿真后端 (无需Mahimahi)
+# genet_project/env/simulator.py
+
+import numpy as np
+
+# 单个数据包的比特数 (按1500字节MTU计算)，用于随机丢包的离散化
+PACKET_BITS = 1500 * 8
+
+
+class MockLinkBackend:
+    """
+    最初的无状态模拟反馈：固定100Mbps带宽、40ms RTT，加上无记忆的随机抖动。
+    保留它只是为了与旧的实验结果对比，新的实验应使用 FluidLinkSimulator。
+    """
+
+    def __init__(self, capacity_mbps=100, base_rtt_ms=40, seed=None):
+        self.capacity_mbps = capacity_mbps
+        self.base_rtt_ms = base_rtt_ms
+        self.rng = np.random.default_rng(seed)
+        self.time_sec = 0.0
+
+    @property
+    def rtt_sec(self):
+        return self.base_rtt_ms / 1000.0
+
+    def transmit(self, sending_rate, duration_sec=None):
+        if duration_sec is None:
+            duration_sec = self.rtt_sec
+        self.time_sec += duration_sec
+
+        real_bandwidth = self.capacity_mbps
+        rtt_min = self.base_rtt_ms
+
+        if sending_rate <= real_bandwidth:
+            # 未拥塞
+            throughput = sending_rate
+            rtt_current = rtt_min + self.rng.uniform(0, 5)  # 正常抖动
+            rtt_gradient = self.rng.uniform(-10, 10)
+        else:
+            # 拥塞
+            throughput = real_bandwidth
+            queue_delay = (sending_rate - real_bandwidth) * 2
+            rtt_current = rtt_min + queue_delay + self.rng.uniform(0, 5)
+            rtt_gradient = (rtt_current - (rtt_min + queue_delay / 2)) / 0.1  # 简化的梯度计算
+
+        return {
+            'sending_rate': throughput,
+            'rtt_gradient': rtt_gradient,
+            'rtt_current': rtt_current,
+            'rtt_min': rtt_min
+        }
+
+
+class FluidLinkSimulator:
+    """
+    有状态的瓶颈队列流体模型。
+
+    链路由容量C、基础RTT、缓冲区大小B、随机丢包率和背景流量R描述。
+    每次 transmit() 都让队列在给定时长内按 (发送速率 + 背景流量 - C) 演化，
+    队列状态在相邻两次调用之间保留，因此一个RTT的过度发送会在后续RTT中
+    以排队延迟的形式体现出来。
+
+    整个步进过程只做若干次标量运算，单核上每秒可以仿真数万个RTT。
+    """
+
+    def __init__(self, capacity_mbps=100.0, base_rtt_ms=40.0, buffer_bdp=1.0,
+                 loss_rate=0.0, cross_traffic_mbps=0.0, cross_traffic_jitter=0.0, seed=None):
+        """
+        Args:
+            capacity_mbps (float): 瓶颈链路容量 C (Mbps)。
+            base_rtt_ms (float): 无排队时的往返时延 (ms)。
+            buffer_bdp (float): 缓冲区大小，以BDP (C * base_rtt) 的倍数表示。
+            loss_rate (float): 与拥塞无关的随机丢包率 (0~1)。
+            cross_traffic_mbps (float): 背景流量的平均速率 R (Mbps)。
+            cross_traffic_jitter (float): 背景流量的相对波动幅度 (标准差/均值)。
+            seed (int, optional): 随机数种子，相同种子给出完全相同的轨迹。
+        """
+        self.capacity_mbps = float(capacity_mbps)
+        self.base_rtt_ms = float(base_rtt_ms)
+        self.buffer_mbit = buffer_bdp * self.capacity_mbps * self.base_rtt_ms / 1000.0
+        self.loss_rate = float(loss_rate)
+        self.cross_traffic_mbps = float(cross_traffic_mbps)
+        self.cross_traffic_jitter = float(cross_traffic_jitter)
+        self.rng = np.random.default_rng(seed)
+        self.reset()
+
+    @classmethod
+    def from_config(cls, link_params, seed=None):
+        """根据 env_params.link 形式的字典构建仿真器。"""
+        return cls(
+            capacity_mbps=link_params.get('capacity_mbps', 100.0),
+            base_rtt_ms=link_params.get('base_rtt_ms', 40.0),
+            buffer_bdp=link_params.get('buffer_bdp', 1.0),
+            loss_rate=link_params.get('loss_rate', 0.0),
+            cross_traffic_mbps=link_params.get('cross_traffic_mbps', 0.0),
+            cross_traffic_jitter=link_params.get('cross_traffic_jitter', 0.0),
+            seed=seed,
+        )
+
+    def reset(self):
+        """清空队列并把仿真时钟归零。"""
+        self.queue_mbit = 0.0
+        self.time_sec = 0.0
+        self.rtt_min_ms = float('inf')
+
+    @property
+    def rtt_sec(self):
+        """当前队列状态下的RTT (秒)，用作“一个RTT”的时长。"""
+        return (self.base_rtt_ms + self._queue_delay_ms(self.queue_mbit)) / 1000.0
+
+    def _queue_delay_ms(self, queue_mbit):
+        return queue_mbit / self.capacity_mbps * 1000.0
+
+    def _capacity_over(self, duration_sec):
+        """当前时间窗口内的链路容量 (Mbps)。子类可以重写它来模拟时变链路。"""
+        return self.capacity_mbps
+
+    def transmit(self, sending_rate, duration_sec=None):
+        """
+        以 sending_rate 发送 duration_sec 秒，推进队列状态并返回反馈。
+
+        Args:
+            sending_rate (float): 发送速率 (Mbps)。
+            duration_sec (float, optional): 发送时长；为None时发送一个当前RTT。
+
+        Returns:
+            dict: 与 calculate_utility 兼容的反馈字典，额外附带 'loss' 与 'queue_delay_ms'。
+        """
+        if duration_sec is None:
+            duration_sec = self.rtt_sec
+        sending_rate = max(float(sending_rate), 0.0)
+        capacity = self._capacity_over(duration_sec)
+
+        cross = self.cross_traffic_mbps
+        if self.cross_traffic_jitter > 0 and cross > 0:
+            cross = max(0.0, cross * (1.0 + self.cross_traffic_jitter * self.rng.standard_normal()))
+        arrival_rate = sending_rate + cross
+
+        # 1. 队列演化：q1 = clip(q0 + (a - C) * T, 0, B)，溢出部分即拥塞丢包
+        q0 = self.queue_mbit
+        unclipped = q0 + (arrival_rate - capacity) * duration_sec
+        q1 = min(max(unclipped, 0.0), self.buffer_mbit)
+        overflow_mbit = max(unclipped - self.buffer_mbit, 0.0)
+
+        # 2. 本流量按到达比例分得离开队列的流量 (FIFO)
+        arrived_mbit = arrival_rate * duration_sec
+        served_mbit = arrived_mbit - overflow_mbit - (q1 - q0)
+        share = sending_rate / arrival_rate if arrival_rate > 0 else 0.0
+        delivered_mbit = max(served_mbit, 0.0) * share
+        congestion_loss = overflow_mbit * share
+
+        # 3. 随机丢包
+        random_loss = 0.0
+        if self.loss_rate > 0 and delivered_mbit > 0:
+            packets = int(delivered_mbit * 1e6 / PACKET_BITS)
+            random_loss = self.rng.binomial(packets, self.loss_rate) * PACKET_BITS / 1e6 if packets else 0.0
+            delivered_mbit -= random_loss
+
+        self.queue_mbit = q1
+        self.time_sec += duration_sec
+
+        # 4. 由队列状态推出时延反馈
+        rtt_start = self.base_rtt_ms + self._queue_delay_ms(q0)
+        rtt_end = self.base_rtt_ms + self._queue_delay_ms(q1)
+        rtt_current = 0.5 * (rtt_start + rtt_end)
+        self.rtt_min_ms = min(self.rtt_min_ms, rtt_start, rtt_end)
+
+        sent_mbit = sending_rate * duration_sec
+        return {
+            'sending_rate': delivered_mbit / duration_sec if duration_sec > 0 else 0.0,
+            'rtt_gradient': (rtt_end - rtt_start) / (duration_sec * 1000.0) if duration_sec > 0 else 0.0,
+            'rtt_current': rtt_current,
+            'rtt_min': self.rtt_min_ms,
+            'loss': (congestion_loss + random_loss) / sent_mbit if sent_mbit > 0 else 0.0,
+            'queue_delay_ms': self._queue_delay_ms(q1),
+        }
+
+
+def create_link_backend(config):
+    """
+    根据配置创建链路后端。
+
+    优先读取 env_params.link；如果配置里带有 generate_data.py 使用的
+    mahimahi_params (bandwidth/delay/loss/background_traffic)，则用它们覆盖对应字段
+    (Mahimahi 的 delay 是单向时延，因此基础RTT取其两倍；trace 对应轨迹文件路径)。
+
+    Args:
+        config (dict): 完整配置。env_params.backend 可选 'fluid' (默认)、'trace'、'mahimahi'、'replay' 或 'mock'；
+                       给出了 link.trace_path 时 'fluid' 自动改用轨迹驱动的链路。
+
+    Returns:
+        FluidLinkSimulator | TraceLinkSimulator | MahimahiBackend | ReplayBackend | MockLinkBackend:
+            提供 transmit() 和 rtt_sec 的后端实例。
+    """
+    env_params = config.get('env_params', {})
+    link_params = dict(env_params.get('link', {}))
+    seed = env_params.get('seed')
+
+    mahimahi_params = config.get('mahimahi_params')
+    if mahimahi_params:
+        if 'bandwidth' in mahimahi_params:
+            link_params['capacity_mbps'] = mahimahi_params['bandwidth']
+        if 'delay' in mahimahi_params:
+            link_params['base_rtt_ms'] = 2 * mahimahi_params['delay']
+        if 'loss' in mahimahi_params:
+            link_params['loss_rate'] = mahimahi_params['loss']
+        if 'background_traffic' in mahimahi_params:
+            link_params['cross_traffic_mbps'] = mahimahi_params['background_traffic']
+        if 'trace' in mahimahi_params:
+            link_params['trace_path'] = mahimahi_params['trace']
+
+    backend = env_params.get('backend', 'fluid')
+    if backend == 'trace' or (backend == 'fluid' and link_params.get('trace_path')):
+        from env.trace_link import TraceLinkSimulator
+        return TraceLinkSimulator.from_config(link_params, seed=seed)
+    if backend == 'fluid':
+        return FluidLinkSimulator.from_config(link_params, seed=seed)
+    if backend == 'mahimahi':
+        from env.mahimahi_backend import MahimahiBackend
+        return MahimahiBackend.from_config(link_params, env_params.get('mahimahi'), seed=seed)
+    if backend == 'replay':
+        from env.replay_backend import ReplayBackend
+        return ReplayBackend.from_config(env_params.get('replay'))
+    if backend == 'mock':
+        return MockLinkBackend(link_params.get('capacity_mbps', 100),
+                               link_params.get('base_rtt_ms', 40), seed=seed)
+    raise ValueError(f"Unknown env backend: {backend}")
\ No newline at end of file
@@ -0,0 +1,124 @@
+## 基于Mahimahi轨迹文件的时变链路仿真后端
+# genet_project/env/trace_link.py
+
+import os
+
+import numpy as np
+
+from env.simulator import FluidLinkSimulator, PACKET_BITS
+
+# 预处理缓存文件的后缀：与原始轨迹放在同一目录下
+CACHE_SUFFIX = '.cum.npy'
+
+
+class MahimahiTrace:
+    """
+    Mahimahi 格式的分组投递轨迹 (每行一个毫秒时间戳，表示该时刻可以投递一个MTU大小的包)。
+
+    轨迹在第一次使用时被解析成“累计投递数”数组 cum，其中 cum[t] 是 (0, t] 毫秒内
+    可投递的包数，并缓存为 .npy 文件；之后通过 np.load(mmap_mode='r') 以只读内存映射
+    方式打开，数百MB的蜂窝轨迹也能瞬间加载，并在多个工作进程之间共享同一份页缓存。
+
+    与 Mahimahi 一样，轨迹在最后一个时间戳处循环。任意时间窗口内的容量都是
+    对 cum 的两次索引，即 O(1) 查询。
+    """
+
+    def __init__(self, path, cache_path=None):
+        """
+        Args:
+            path (str): Mahimahi 轨迹文件路径。
+            cache_path (str, optional): 累计数组缓存文件路径，默认是 path + '.cum.npy'。
+        """
+        self.path = path
+        self.cache_path = cache_path or path + CACHE_SUFFIX
+        if not self._cache_is_fresh():
+            self._build_cache()
+        self.cum = np.load(self.cache_path, mmap_mode='r')
+        self.period_ms = len(self.cum) - 1
+        self.packets_per_period = int(self.cum[-1])
+        if self.period_ms <= 0 or self.packets_per_period <= 0:
+            raise ValueError(f"Mahimahi trace {path} contains no deliveries")
+
+    def __reduce__(self):
+        # 传给子进程时只传路径，由子进程重新打开内存映射，而不是复制整个数组
+        return (self.__class__, (self.path, self.cache_path))
+
+    def _cache_is_fresh(self):
+        try:
+            return os.path.getmtime(self.cache_path) >= os.path.getmtime(self.path)
+        except OSError:
+            return False
+
+    def _build_cache(self):
+        """解析轨迹文本并写出累计投递数组 (先写临时文件再原子替换，避免并发读到半个文件)。"""
+        timestamps = np.loadtxt(self.path, dtype=np.int64, ndmin=1)
+        if timestamps.size == 0:
+            raise ValueError(f"Mahimahi trace {self.path} is empty")
+        period_ms = int(timestamps.max())
+        # 轨迹循环时时间戳0与周期末尾重合，统一折算到周期末尾
+        timestamps = np.where(timestamps == 0, period_ms, timestamps)
+        # cum[t] = 时间戳 <= t 的包数，即 (0, t] 毫秒内可投递的包数
+        cum = np.cumsum(np.bincount(timestamps, minlength=period_ms + 1), dtype=np.int64)
+
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, cum)
+        os.replace(tmp_path, self.cache_path)
+
+    def deliveries_until(self, t_ms):
+        """(0, t_ms] 内可投递的包数 (t_ms 可以超过一个周期，轨迹循环)。"""
+        t_ms = int(t_ms)
+        periods, offset = divmod(t_ms, self.period_ms)
+        return periods * self.packets_per_period + int(self.cum[offset])
+
+    def capacity_mbps(self, start_sec, duration_sec):
+        """(start, start + duration] 时间窗口内的平均链路容量 (Mbps)。"""
+        if duration_sec <= 0:
+            return 0.0
+        start_ms = start_sec * 1000.0
+        end_ms = start_ms + duration_sec * 1000.0
+        packets = self.deliveries_until(end_ms) - self.deliveries_until(start_ms)
+        return packets * PACKET_BITS / duration_sec / 1e6
+
+    @property
+    def mean_capacity_mbps(self):
+        """整条轨迹的平均容量 (Mbps)。"""
+        return self.packets_per_period * PACKET_BITS / (self.period_ms / 1000.0) / 1e6
+
+
+class TraceLinkSimulator(FluidLinkSimulator):
+    """
+    轨迹驱动的流体模型：队列演化规则与 FluidLinkSimulator 相同，
+    但每一步的服务容量来自 Mahimahi 轨迹在该时间窗口内的投递能力。
+
+    缓冲区大小与排队时延的换算使用轨迹的平均容量。
+    """
+
+    def __init__(self, trace, base_rtt_ms=40.0, buffer_bdp=1.0, loss_rate=0.0,
+                 cross_traffic_mbps=0.0, cross_traffic_jitter=0.0, seed=None):
+        """
+        Args:
+            trace (MahimahiTrace | str): 轨迹对象或轨迹文件路径。
+            其余参数与 FluidLinkSimulator 相同。
+        """
+        self.trace = trace if isinstance(trace, MahimahiTrace) else MahimahiTrace(trace)
+        super().__init__(capacity_mbps=self.trace.mean_capacity_mbps, base_rtt_ms=base_rtt_ms,
+                         buffer_bdp=buffer_bdp, loss_rate=loss_rate,
+                         cross_traffic_mbps=cross_traffic_mbps,
+                         cross_traffic_jitter=cross_traffic_jitter, seed=seed)
+
+    @classmethod
+    def from_config(cls, link_params, seed=None):
+        """根据 env_params.link 形式的字典构建仿真器 (需要 trace_path 字段)。"""
+        return cls(
+            link_params['trace_path'],
+            base_rtt_ms=link_params.get('base_rtt_ms', 40.0),
+            buffer_bdp=link_params.get('buffer_bdp', 1.0),
+            loss_rate=link_params.get('loss_rate', 0.0),
+            cross_traffic_mbps=link_params.get('cross_traffic_mbps', 0.0),
+            cross_traffic_jitter=link_params.get('cross_traffic_jitter', 0.0),
+            seed=seed,
+        )
+
+    def _capacity_over(self, duration_sec):
+        return self.trace.capacity_mbps(self.time_sec, duration_sec)
\ No newline at end of file
@@ -1 +1,294 @@
-##模型的接口文件
\ No newline at end of file
+##模型的接口文件
+# genet_project/model/inference_model.py
+
+import json
+import os
+
+import numpy as np
+
+# 模型工件 (目录) 的格式标识与版本：manifest.json + 每个节点数组一个 .npy 文件
+ARTIFACT_FORMAT = 'genet-flat-gbdt'
+ARTIFACT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+# 工件中保存的节点数组 (FlatTreeEnsemble 的同名属性)
+_ARTIFACT_ARRAYS = ('feature', 'threshold', 'children', 'default_left', 'value', 'roots', 'target_offsets',
+                    'base_score')
+
+# 输出为恒等变换的回归目标；其他目标 (如logistic) 需要对边际值再做变换，这里不支持
+_IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror',
+                        'reg:quantileerror', 'reg:linear')
+
+
+class FlatTreeEnsemble:
+    """
+    把训练好的GBDT (XGBoost) 展平成一组扁平的NumPy节点数组，并用紧凑的遍历进行预测。
+
+    所有树的节点拼接在同一组数组里：
+        feature[i], threshold[i]   —— 节点i的分裂特征与阈值 (float32，与XGBoost一致)
+        children[2*i], children[2*i+1] —— 左/右子节点的全局编号；叶子节点指向自己
+        default_left[i]            —— 特征缺失 (NaN) 时是否走左子树
+        value[i]                   —— 叶子节点的输出值
+    roots 是每棵树根节点的编号；同一输出目标的树在数组中是连续的，
+    target_offsets 给出每个目标的第一棵树，便于用 reduceat 按目标求和。
+
+    因为叶子节点指向自己，所有树可以一起向下走 max_depth 步，而不需要逐节点判断是否到达叶子；
+    单行预测复用预先分配的缓冲区，除返回值外不再分配内存。
+    """
+
+    def __init__(self, feature, threshold, children, default_left, value, roots, target_offsets,
+                 base_score, n_features, max_depth=None, feature_names=None, target_names=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.target_offsets = np.ascontiguousarray(target_offsets, dtype=np.intp)
+        self.base_score = np.ascontiguousarray(base_score, dtype=np.float64)
+        self.n_features = int(n_features)
+        self.n_trees = len(self.roots)
+        self.n_targets = len(self.base_score)
+        self.max_depth = self._compute_max_depth() if max_depth is None else int(max_depth)
+        # 特征/输出的列名 (工件中的特征模式)；从XGBoost导出时为None
+        self.feature_names = None if feature_names is None else list(feature_names)
+        self.target_names = None if target_names is None else list(target_names)
+
+        # --- 单行预测的预分配缓冲区 ---
+        n = self.n_trees
+        self._row = np.empty(self.n_features, dtype=np.float32)
+        self._node = np.empty(n, dtype=np.int32)
+        self._idx = np.empty(n, dtype=np.int32)
+        self._feat = np.empty(n, dtype=np.int32)
+        self._xval = np.empty(n, dtype=np.float32)
+        self._thr = np.empty(n, dtype=np.float32)
+        self._right = np.empty(n, dtype=bool)
+        self._leaf = np.empty(n, dtype=np.float64)
+        self._sum = np.empty(self.n_targets, dtype=np.float64)
+
+    def _compute_max_depth(self):
+        depth = 0
+        frontier = self.roots.copy()
+        while True:
+            nxt = np.concatenate([self.children[2 * frontier], self.children[2 * frontier + 1]])
+            nxt = nxt[nxt != np.concatenate([frontier, frontier])]
+            if nxt.size == 0:
+                return depth
+            frontier = nxt
+            depth += 1
+
+    # --- 从XGBoost导出 ---
+    @classmethod
+    def from_xgboost(cls, model):
+        """
+        从 XGBRegressor (或底层的 xgboost.Booster) 导出扁平节点数组。
+
+        支持 one_output_per_tree 策略下的多输出回归 (XGBRegressor 的默认策略)。
+
+        Args:
+            model: xgboost.XGBRegressor 或 xgboost.Booster。
+
+        Returns:
+            FlatTreeEnsemble
+        """
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+
+        objective = learner['objective']['name']
+        if objective not in _IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for flat export: {objective}")
+
+        model_param = learner['learner_model_param']
+        n_targets = max(int(model_param.get('num_target', 1)), 1)
+        base_score = np.atleast_1d(np.asarray(json.loads(model_param['base_score']), dtype=np.float64))
+        if base_score.size == 1 and n_targets > 1:
+            base_score = np.repeat(base_score, n_targets)
+
+        gbtree = learner['gradient_booster']
+        if 'model' not in gbtree:
+            raise ValueError(f"Unsupported booster for flat export: {gbtree.get('name')}")
+        trees = gbtree['model']['trees']
+        tree_info = gbtree['model']['tree_info']
+
+        # 按输出目标把树排成连续的分组 (组内保持原有顺序)
+        order = sorted(range(len(trees)), key=lambda i: (tree_info[i], i))
+        tree_targets = [tree_info[i] for i in order]
+        target_offsets = [tree_targets.index(t) for t in range(n_targets)]
+
+        features, thresholds, children, default_left, values, roots = [], [], [], [], [], []
+        offset = 0
+        for i in order:
+            tree = trees[i]
+            if int(tree['tree_param'].get('size_leaf_vector', '1')) > 1:
+                raise ValueError("Vector-leaf trees (multi_strategy='multi_output_tree') are not supported")
+            if any(tree.get('split_type', [])):
+                raise ValueError("Categorical splits are not supported")
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            right = np.asarray(tree['right_children'], dtype=np.int64)
+            n_nodes = len(left)
+            is_leaf = left == -1
+            own = np.arange(n_nodes) + offset
+
+            pair = np.empty((n_nodes, 2), dtype=np.int64)
+            pair[:, 0] = np.where(is_leaf, own, left + offset)
+            pair[:, 1] = np.where(is_leaf, own, right + offset)
+
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            features.append(np.where(is_leaf, 0, tree['split_indices']))
+            thresholds.append(np.where(is_leaf, 0, conditions))
+            values.append(np.where(is_leaf, conditions, 0))  # 叶子节点的 split_conditions 即叶子值
+            default_left.append(np.asarray(tree['default_left'], dtype=bool))
+            children.append(pair.ravel())
+            roots.append(offset)
+            offset += n_nodes
+
+        return cls(np.concatenate(features), np.concatenate(thresholds), np.concatenate(children),
+                   np.concatenate(default_left), np.concatenate(values), roots, target_offsets,
+                   base_score, int(model_param['num_feature']))
+
+    # --- 模型工件 ---
+    def save(self, path, feature_names=None, target_names=None, metadata=None):
+        """
+        保存为带版本的模型工件目录：每个节点数组一个 .npy 文件，加上描述特征模式的 manifest.json。
+
+        Args:
+            path (str): 工件目录 (不存在时创建，已有的同名文件被覆盖)。
+            feature_names, target_names (list[str], optional): 输入特征与输出目标的列名，默认沿用本对象的。
+            metadata (dict, optional): 额外写进清单的信息 (训练参数、样本数等)。
+        """
+        feature_names = list(feature_names if feature_names is not None else self.feature_names or [])
+        target_names = list(target_names if target_names is not None else self.target_names or [])
+        if feature_names and len(feature_names) != self.n_features:
+            raise ValueError(f"{len(feature_names)} feature names for a model with {self.n_features} features")
+        if target_names and len(target_names) != self.n_targets:
+            raise ValueError(f"{len(target_names)} target names for a model with {self.n_targets} targets")
+
+        os.makedirs(path, exist_ok=True)
+        arrays = {}
+        for name in _ARTIFACT_ARRAYS:
+            array = getattr(self, name)
+            np.save(os.path.join(path, f'{name}.npy'), array, allow_pickle=False)
+            arrays[name] = {'file': f'{name}.npy', 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'version': ARTIFACT_VERSION,
+            'n_features': self.n_features,
+            'n_targets': self.n_targets,
+            'n_trees': self.n_trees,
+            'max_depth': self.max_depth,
+            'feature_names': feature_names,
+            'target_names': target_names,
+            'arrays': arrays,
+            'metadata': metadata or {},
+        }
+        with open(os.path.join(path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        加载 save() 写出的模型工件。
+
+        Args:
+            path (str): 工件目录。
+            mmap (bool): 以只读内存映射方式打开节点数组 (不读入、不拷贝，页面按需载入)。
+
+        Returns:
+            FlatTreeEnsemble
+        """
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"{path} is not a {ARTIFACT_FORMAT} artifact")
+        if manifest.get('version') != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported {ARTIFACT_FORMAT} version {manifest.get('version')} "
+                             f"(expected {ARTIFACT_VERSION})")
+        arrays = {}
+        for name in _ARTIFACT_ARRAYS:
+            entry = manifest['arrays'][name]
+            array = np.load(os.path.join(path, entry['file']), mmap_mode='r' if mmap else None, allow_pickle=False)
+            if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+                raise ValueError(f"{path}: {entry['file']} does not match the manifest")
+            arrays[name] = array
+        return cls(n_features=manifest['n_features'], max_depth=manifest['max_depth'],
+                   feature_names=manifest.get('feature_names') or None,
+                   target_names=manifest.get('target_names') or None, **arrays)
+
+    # --- 预测 ---
+    def predict_one(self, x):
+        """
+        对单行特征进行预测。
+
+        Args:
+            x (array_like): 长度为 n_features 的特征向量 (NaN 表示缺失)。
+
+        Returns:
+            np.ndarray: 长度为 n_targets 的预测值。
+        """
+        row = self._row
+        row[:] = x
+        node, idx, feat, xval, thr, right = self._node, self._idx, self._feat, self._xval, self._thr, self._right
+        has_missing = np.isnan(row).any()
+
+        np.copyto(node, self.roots)
+        for _ in range(self.max_depth):
+            np.take(self.feature, node, out=feat)
+            np.take(row, feat, out=xval)
+            np.take(self.threshold, node, out=thr)
+            np.greater_equal(xval, thr, out=right)
+            if has_missing:
+                missing = np.isnan(xval)
+                right[missing] = ~self.default_left[node[missing]]
+            np.multiply(node, 2, out=idx)
+            np.add(idx, right, out=idx)
+            np.take(self.children, idx, out=node)
+
+        np.take(self.value, node, out=self._leaf)
+        np.add.reduceat(self._leaf, self.target_offsets, out=self._sum)
+        return np.add(self._sum, self.base_score)
+
+    def predict(self, X, block_rows=256):
+        """
+        批量预测：按 block_rows 行一块，整块的所有行、所有树一起向下走。
+
+        Args:
+            X (array_like): 形状为 (n_rows, n_features) 的特征矩阵。
+            block_rows (int): 每块的行数 (每块的中间数组为 block_rows x n_trees，在块之间复用)。
+
+        Returns:
+            np.ndarray: 形状为 (n_rows, n_targets) 的预测值。
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_rows = X.shape[0]
+        out = np.empty((n_rows, self.n_targets), dtype=np.float64)
+        size = max(min(block_rows, n_rows), 1)
+        shape = (size, self.n_trees)
+        node, feat = np.empty(shape, dtype=np.int32), np.empty(shape, dtype=np.int32)
+        xval, thr = np.empty(shape, dtype=np.float32), np.empty(shape, dtype=np.float32)
+        right = np.empty(shape, dtype=bool)
+        # 块内第r行的特征在展平数组中的起始位置
+        row_start = (np.arange(size, dtype=np.int32) * self.n_features)[:, None]
+
+        for start in range(0, n_rows, size):
+            block = X[start:start + size]
+            b = block.shape[0]
+            flat = block.ravel()
+            has_missing = np.isnan(block).any()
+            nd, ft, xv, th, rt = node[:b], feat[:b], xval[:b], thr[:b], right[:b]
+            nd[:] = self.roots
+            for _ in range(self.max_depth):
+                np.take(self.feature, nd, out=ft)
+                ft += row_start[:b]
+                np.take(flat, ft, out=xv)
+                np.take(self.threshold, nd, out=th)
+                np.greater_equal(xv, th, out=rt)
+                if has_missing:
+                    missing = np.isnan(xv)
+                    rt[missing] = ~self.default_left[nd[missing]]
+                nd *= 2
+                nd += rt
+                np.take(self.children, nd, out=nd)
+            out[start:start + b] = np.add.reduceat(self.value[nd], self.target_offsets, axis=1)
+        out += self.base_score
+        return out
@@ -0,0 +1,199 @@
+## Sage策略网络的加载与CPU推断 (NumPy MLP / ONNX)
+# genet_project/model/sage_policy.py
+
+import contextlib
+import os
+
+import numpy as np
+
+# 策略网络的输入观测：当前速率 (Mbps)、当前RTT (ms)、最小RTT (ms)、排队比例 rtt/rtt_min - 1
+OBSERVATION_FIELDS = ('current_rate', 'rtt', 'rtt_min', 'queue_ratio')
+N_OBSERVATIONS = len(OBSERVATION_FIELDS)
+
+_ACTIVATIONS = {
+    'relu': lambda x: np.maximum(x, 0.0, out=x),
+    'tanh': lambda x: np.tanh(x, out=x),
+    'identity': lambda x: x,
+}
+
+
+def blas_thread_limit(threads):
+    """
+    返回一个上下文管理器工厂：with 块内把NumPy底层BLAS的线程数限制为 threads，离开时恢复。
+    限制只在推断调用期间生效，不影响进程中其他NumPy代码。
+    需要 threadpoolctl；未安装，或加载的BLAS本来就不超过 threads 个线程时，返回空的上下文
+    (threadpoolctl 每次进出约10us，比一次单行推断还贵)。
+
+    Returns:
+        callable: 无参数，返回上下文管理器。
+    """
+    try:
+        from threadpoolctl import ThreadpoolController
+    except ImportError:
+        return contextlib.nullcontext
+    blas = ThreadpoolController().select(user_api='blas')
+    if all(lib.num_threads <= threads for lib in blas.lib_controllers):
+        return contextlib.nullcontext
+    return lambda: blas.limit(limits=threads)
+
+
+class MLPPolicy:
+    """
+    保存在 .npz 文件中的全连接策略网络，用NumPy在CPU上推断。
+
+    文件中的数组：
+        W0, b0, W1, b1, ...           —— 各层权重 (in x out) 与偏置
+        activation (可选)             —— 隐藏层激活函数名 (relu / tanh)，默认 relu
+        output_activation (可选)      —— 输出层激活函数名，默认 identity
+        input_mean, input_scale (可选) —— 输入标准化：(x - mean) / scale
+
+    单行推断 predict_one 在构造时预先分配每一层的输出缓冲区，之后不再分配内存；
+    批量推断 predict 的缓冲区按目前见过的最大批量分配，批量不变大时也不再分配。
+    推断期间BLAS线程数限制为 threads (见 blas_thread_limit)。
+    """
+
+    def __init__(self, weights, biases, activation='relu', output_activation='identity',
+                 input_mean=None, input_scale=None, threads=1):
+        if len(weights) != len(biases) or not weights:
+            raise ValueError("MLPPolicy needs the same (non-zero) number of weight and bias arrays")
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32).reshape(-1) for b in biases]
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            if w.shape[1] != b.shape[0] or (i and w.shape[0] != self.weights[i - 1].shape[1]):
+                raise ValueError(f"Layer {i} shape mismatch: W{i} {w.shape}, b{i} {b.shape}")
+        self.activation = _ACTIVATIONS[activation]
+        self.output_activation = _ACTIVATIONS[output_activation]
+        self.n_inputs = self.weights[0].shape[0]
+        self.n_outputs = self.weights[-1].shape[1]
+        n = self.n_inputs
+        self.input_mean = np.zeros(n, np.float32) if input_mean is None else np.asarray(input_mean, np.float32)
+        self.input_scale = np.ones(n, np.float32) if input_scale is None else np.asarray(input_scale, np.float32)
+
+        # predict_one 的缓冲区：标准化后的输入与每一层的输出
+        self._input = np.zeros(self.n_inputs, dtype=np.float32)
+        self._layers = [np.zeros(w.shape[1], dtype=np.float32) for w in self.weights]
+        # predict 的缓冲区 (行数为目前见过的最大批量)
+        self._batch_input = np.zeros((0, self.n_inputs), dtype=np.float32)
+        self._batch_layers = [np.zeros((0, w.shape[1]), dtype=np.float32) for w in self.weights]
+        self._blas_limit = blas_thread_limit(threads)
+
+    @classmethod
+    def load(cls, path, threads=1):
+        with np.load(path, allow_pickle=False) as data:
+            n_layers = sum(1 for key in data.files if key.startswith('W'))
+            weights = [data[f'W{i}'] for i in range(n_layers)]
+            biases = [data[f'b{i}'] for i in range(n_layers)]
+            activation = str(data['activation']) if 'activation' in data.files else 'relu'
+            output_activation = str(data['output_activation']) if 'output_activation' in data.files else 'identity'
+            input_mean = data['input_mean'] if 'input_mean' in data.files else None
+            input_scale = data['input_scale'] if 'input_scale' in data.files else None
+        return cls(weights, biases, activation, output_activation, input_mean, input_scale, threads=threads)
+
+    def save(self, path):
+        """保存为 load() 可以读取的 .npz 文件。"""
+        arrays = {}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            arrays[f'W{i}'] = w
+            arrays[f'b{i}'] = b
+        names = {fn: name for name, fn in _ACTIVATIONS.items()}
+        np.savez(path, activation=names[self.activation], output_activation=names[self.output_activation],
+                 input_mean=self.input_mean, input_scale=self.input_scale, **arrays)
+
+    def predict_one(self, observation):
+        """
+        单个观测的推断。
+
+        Args:
+            observation (np.ndarray): 长度 n_inputs 的观测。
+
+        Returns:
+            np.ndarray: 长度 n_outputs 的输出 (内部缓冲区，下次调用时会被覆盖)。
+        """
+        x = self._input
+        np.subtract(observation, self.input_mean, out=x)
+        np.divide(x, self.input_scale, out=x)
+        with self._blas_limit():
+            return self._forward(x, self._layers)
+
+    def _forward(self, x, layers):
+        last = len(self.weights) - 1
+        for i, (w, b, out) in enumerate(zip(self.weights, self.biases, layers)):
+            np.matmul(x, w, out=out)
+            np.add(out, b, out=out)
+            x = self.output_activation(out) if i == last else self.activation(out)
+        return x
+
+    def predict(self, observations):
+        """
+        批量推断。
+
+        Args:
+            observations (np.ndarray): 形状为 (n, n_inputs) 的观测。
+
+        Returns:
+            np.ndarray: 形状为 (n, n_outputs) 的输出 (内部缓冲区，下次调用时会被覆盖)。
+        """
+        n = len(observations)
+        if n > len(self._batch_input):
+            self._batch_input = np.zeros((n, self.n_inputs), dtype=np.float32)
+            self._batch_layers = [np.zeros((n, w.shape[1]), dtype=np.float32) for w in self.weights]
+        x = self._batch_input[:n]
+        np.subtract(observations, self.input_mean, out=x)
+        np.divide(x, self.input_scale, out=x)
+        with self._blas_limit():
+            return self._forward(x, [out[:n] for out in self._batch_layers])
+
+
+class OnnxPolicy:
+    """
+    ONNX格式的策略网络，用 onnxruntime 的CPU执行器推断 (需要安装 onnxruntime)。
+
+    模型须只有一个输入 (形状为 [batch, n_inputs] 的float32) 与一个输出；
+    intra-op 线程数由 threads 指定，inter-op 固定为1 (单次推断没有可并行的算子分支)。
+    """
+
+    def __init__(self, path, threads=1):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("Loading an ONNX Sage policy requires onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_names = [self.session.get_outputs()[0].name]
+        self.n_inputs = model_input.shape[-1] if isinstance(model_input.shape[-1], int) else N_OBSERVATIONS
+        # predict_one 的输入缓冲区 (1 x n_inputs)
+        self._input = np.zeros((1, self.n_inputs), dtype=np.float32)
+        self._feed = {self.input_name: self._input}
+
+    def predict_one(self, observation):
+        self._input[0] = observation
+        return self.session.run(self.output_names, self._feed)[0][0]
+
+    def predict(self, observations):
+        observations = np.ascontiguousarray(observations, dtype=np.float32)
+        return self.session.run(self.output_names, {self.input_name: observations})[0]
+
+
+def load_sage_policy(path, threads=1):
+    """
+    按扩展名加载Sage策略网络 (.onnx 用 onnxruntime，.npz 用 NumPy MLP)。
+
+    Args:
+        path (str): 模型文件路径。
+        threads (int): CPU推断线程数 (ONNX 的 intra-op 线程；NumPy 的 BLAS 线程)。
+
+    Returns:
+        MLPPolicy | OnnxPolicy
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.onnx':
+        return OnnxPolicy(path, threads=threads)
+    if extension == '.npz':
+        return MLPPolicy.load(path, threads=threads)
+    raise ValueError(f"Unsupported Sage policy format: {path} (expected .onnx or .npz)")
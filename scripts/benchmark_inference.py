@@ -0,0 +1,164 @@
+## 推断引擎延迟基准测试
+# genet_project/scripts/benchmark_inference.py
+
+import sys
+import os
+import argparse
+import tempfile
+import time
+import yaml
+import numpy as np
+
+# --- 项目路径设置 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from model.inference_model import FlatTreeEnsemble
+from model.sage_policy import MLPPolicy, N_OBSERVATIONS
+from core.components import SageComponent
+from utils.logger import setup_logger
+
+
+def _time_per_call(fn, iterations):
+    """返回每次调用耗时的 (中位数, p99)，单位微秒。"""
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    return np.median(samples) * 1e6, np.percentile(samples, 99) * 1e6
+
+
+def _synthetic_model(config, n_samples=5000, seed=0):
+    """没有现成模型时，用配置中的超参数在合成数据上训练一个同规模的9维3输出模型。"""
+    import xgboost as xgb
+
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(0, 100, size=(n_samples, 9))
+    Y = np.stack([X[:, 0] * 0.8 + X[:, 3] * 0.2, X[:, 0] + X[:, 3], 0.3 * X[:, 6]], axis=1)
+    model_params = config.get('engine_params', {}).get('inference_engine', {}).get('model_params', {})
+    model = xgb.XGBRegressor(**model_params)
+    model.fit(X, Y)
+    return model
+
+
+def benchmark_gbdt(config, model_path=None, iterations=2000, batch_size=1024):
+    """
+    比较 XGBoost (sklearn包装层 / Booster.inplace_predict) 与扁平数组预测器的单行与批量延迟。
+    """
+    log = setup_logger(name='InferenceBenchmark')
+
+    if model_path:
+        import joblib
+        model = joblib.load(model_path)
+        log.info(f"Loaded GBDT model from {model_path}")
+    else:
+        model = _synthetic_model(config)
+        log.info("No model given; trained a synthetic model with engine_params.inference_engine.model_params")
+
+    flat = FlatTreeEnsemble.from_xgboost(model)
+    log.info(f"Exported {flat.n_trees} trees ({len(flat.feature)} nodes, max depth {flat.max_depth})")
+
+    rng = np.random.default_rng(1)
+    rows = rng.uniform(0, 100, size=(batch_size, 9)).astype(np.float32)
+    row = rows[0]
+    booster = model.get_booster()
+
+    max_diff = np.abs(np.asarray(model.predict(rows)) - flat.predict(rows)).max()
+    log.info(f"Max |xgboost - flat| over {batch_size} rows: {max_diff:.3g}")
+
+    results = [
+        ('xgboost XGBRegressor.predict (1 row)', _time_per_call(lambda: model.predict(row[None, :]), iterations)),
+        ('xgboost Booster.inplace_predict (1 row)',
+         _time_per_call(lambda: booster.inplace_predict(row[None, :]), iterations)),
+        ('flat predict_one (1 row)', _time_per_call(lambda: flat.predict_one(row), iterations)),
+    ]
+    batch_iters = max(iterations // 100, 10)
+    xgb_batch = _time_per_call(lambda: model.predict(rows), batch_iters)
+    flat_batch = _time_per_call(lambda: flat.predict(rows), batch_iters)
+    results.append((f'xgboost XGBRegressor.predict ({batch_size} rows, per row)',
+                    tuple(v / batch_size for v in xgb_batch)))
+    results.append((f'flat predict ({batch_size} rows, per row)', tuple(v / batch_size for v in flat_batch)))
+
+    _print_results(config, results)
+    return results
+
+
+def _print_results(config, results):
+    rtt_us = config.get('env_params', {}).get('link', {}).get('base_rtt_ms', 40) * 1000
+    print(f"\n{'path':<55}{'median (us)':>14}{'p99 (us)':>12}{'% of RTT':>10}")
+    for name, (median, p99) in results:
+        print(f"{name:<55}{median:>14.1f}{p99:>12.1f}{100 * median / rtt_us:>10.3f}")
+
+
+def _synthetic_sage_policy(path, hidden=(256, 256), seed=0):
+    """没有现成的Sage模型时，写一个随机权重的同规模MLP (只用于测延迟)。"""
+    rng = np.random.default_rng(seed)
+    sizes = (N_OBSERVATIONS,) + tuple(hidden) + (1,)
+    weights = [rng.normal(0, 1 / np.sqrt(n_in), size=(n_in, n_out)) for n_in, n_out in zip(sizes[:-1], sizes[1:])]
+    biases = [np.zeros(n_out) for n_out in sizes[1:]]
+    MLPPolicy(weights, biases, activation='tanh').save(path)
+
+
+def benchmark_sage(config, model_path=None, threads=1, iterations=2000, batch_size=1024):
+    """
+    测量 SageComponent 每次决策的策略网络延迟 (单个状态与批量状态)。
+    """
+    log = setup_logger(name='InferenceBenchmark')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if not model_path:
+            model_path = os.path.join(tmp, 'sage_policy.npz')
+            _synthetic_sage_policy(model_path)
+            log.info("No Sage model given; wrote a random 4-256-256-1 tanh MLP for timing")
+        component = SageComponent(model_path=model_path, threads=threads)
+
+    policy = component.policy
+    log.info(f"Sage policy: {type(policy).__name__}, {policy.n_inputs} inputs, {threads} thread(s)")
+
+    rng = np.random.default_rng(1)
+    rates = rng.uniform(1, 200, batch_size)
+    rtt_min = rng.uniform(10, 100, batch_size)
+    rtt = rtt_min * rng.uniform(1, 3, batch_size)
+    state = {'current_rate': rates[0], 'rtt': rtt[0], 'rtt_min': rtt_min[0]}
+    observation = np.array([rates[0], rtt[0], rtt_min[0], rtt[0] / rtt_min[0] - 1], dtype=np.float32)
+
+    max_diff = abs(component.get_suggested_rate(state) -
+                   component.get_suggested_rate_batch(rates[:1], rtt[:1], rtt_min[:1])[0])
+    log.info(f"|single - batch| suggested rate for one state: {max_diff:.3g}")
+
+    results = [
+        ('Sage policy predict_one (1 state)', _time_per_call(lambda: policy.predict_one(observation), iterations)),
+        ('SageComponent.get_suggested_rate (1 state)',
+         _time_per_call(lambda: component.get_suggested_rate(state), iterations)),
+    ]
+    batch_iters = max(iterations // 100, 10)
+    batch = _time_per_call(lambda: component.get_suggested_rate_batch(rates, rtt, rtt_min), batch_iters)
+    results.append((f'SageComponent batch ({batch_size} states, per state)', tuple(v / batch_size for v in batch)))
+    _print_results(config, results)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark per-decision inference latency.')
+    parser.add_argument('--model', default=None, help='joblib GBDT model (default: train a synthetic one)')
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--target', choices=['gbdt', 'sage', 'all'], default='all', help='which model to benchmark')
+    parser.add_argument('--sage-model', default=None, help='Sage policy (.onnx / .npz; default: random MLP)')
+    parser.add_argument('--threads', type=int, default=1, help='CPU threads for Sage inference')
+    args = parser.parse_args()
+
+    config_path = os.path.join(project_root, 'config.yml')
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+    except Exception as e:
+        print(f"FATAL: Could not load config file. Error: {e}")
+        sys.exit(1)
+
+    if args.target in ('gbdt', 'all'):
+        benchmark_gbdt(config, model_path=args.model, iterations=args.iterations, batch_size=args.batch_size)
+    if args.target in ('sage', 'all'):
+        benchmark_sage(config, model_path=args.sage_model, threads=args.threads, iterations=args.iterations,
+                       batch_size=args.batch_size)
\ No newline at end of file
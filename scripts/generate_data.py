@@ -3,8 +3,9 @@
 
 import sys
 import os
+import argparse
+import multiprocessing
 import yaml
-import pandas as pd
 from itertools import product
 import numpy as np
 
@@ -13,8 +14,11 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
 from env.network_env import NetworkEnvironment
-from core.components import CubicComponent, SageComponent
+from env.trace_link import MahimahiTrace
+from core.registry import ComponentRegistry
+from core.features import FEATURE_COLUMNS, LABEL_COLUMNS, feature_row
 from utils.logger import setup_logger
+from utils.dataset_writer import ChunkedSampleWriter, SUPPORTED_FORMATS
 
 
 def find_optimal_rate_via_micro_experiment(network_env, candidate_rates):
@@ -43,9 +47,112 @@ def find_optimal_rate_via_micro_experiment(network_env, candidate_rates):
     return best_rate
 
 
-def generate_training_data(config):
+def _scenario_seed(base_seed, index):
+    """由全局种子和场景编号派生出该场景独立且确定的随机数种子。"""
+    return int(np.random.SeedSequence([base_seed, index]).generate_state(1)[0])
+
+
+def run_scenario(scenario, config, seed):
+    """
+    在一个“参数已知的宇宙”中运行，收集该场景的全部训练样本。
+
+    Args:
+        scenario (tuple): (link, delay, loss, r_ratio)，link 为带宽 (Mbps) 或 MahimahiTrace。
+        config (dict): 完整配置。
+        seed (int): 该场景的随机数种子；相同种子产生完全相同的样本。
+
+    Returns:
+        list: 训练样本列表，每条样本为 9 维特征 + 3 个标签。
+    """
+    link, delay, loss, r_ratio = scenario
+    log = setup_logger(name='DataGenerator', log_file='data_generation.log')
+    np.random.seed(seed)
+
+    # --- “上帝”知道这个宇宙的物理常数 ---
+    # 轨迹驱动的链路以整条轨迹的平均容量作为 C 的标签
+    bw = link.mean_capacity_mbps if isinstance(link, MahimahiTrace) else link
+    ground_truth_C = bw
+    ground_truth_R = bw * r_ratio
+
+    log.info(
+        f"Running in new universe: C={ground_truth_C}Mbps, R={ground_truth_R}Mbps, Delay={delay}ms, Loss={loss * 100}%")
+
+    # a. 创建这个宇宙
+    mahimahi_params = {'bandwidth': bw, 'delay': delay, 'loss': loss, 'background_traffic': ground_truth_R}
+    if isinstance(link, MahimahiTrace):
+        mahimahi_params['trace'] = link.path
+    env_params = dict(config.get('env_params', {}), seed=seed)
+    env_config = {'mahimahi_params': mahimahi_params, 'env_params': env_params,
+                  'utility_params': config.get('utility_params', {})}
+    network_env = NetworkEnvironment(env_config)
+    # cl / rl 两组特征分别来自组件池中扮演对应角色的组件
+    feature_components = ComponentRegistry.from_config(config).feature_components
+    cubic = feature_components['cl']
+    sage = feature_components['rl']
+
+    # 先以初始速率运行一个RTT，建立“上一轮”的反馈
+    network_env.run_rate_for_one_rtt(network_env.get_current_state()['current_rate'])
+
+    samples = []
+    # b. 记录“问题 (X)” 和 “答案 (Y)”
+    # 在这个环境中运行一段时间，收集多个决策点的数据
+    for _ in range(config.get('samples_per_scenario', 10)):
+        # i. 记录问题：上一轮的反馈，以及CUBIC和Sage的建议及其反馈
+        feedback_prev = dict(network_env.get_last_feedback())
+        feedback_cl = network_env.run_and_get_feedback(cubic)
+        feedback_rl = network_env.run_and_get_feedback(sage)
+        for feedback in (feedback_prev, feedback_cl, feedback_rl):
+            feedback['utility'] = network_env.calculate_utility_from_feedback(feedback)
+
+        # 构建9维输入向量X (列顺序由 core.features 统一定义)
+        input_X = feature_row({'cl': feedback_cl, 'rl': feedback_rl, 'prev': feedback_prev})
+
+        # ii. 寻找答案：进行微型实验
+        candidate_rates = [
+            feedback_cl['sending_rate'],
+            feedback_rl['sending_rate'],
+            np.mean([feedback_cl['sending_rate'], feedback_rl['sending_rate']]),
+            max(feedback_cl['sending_rate'], feedback_rl['sending_rate']) * 1.2
+        ]
+        r_opt_label = find_optimal_rate_via_micro_experiment(network_env, candidate_rates)
+
+        # iii. 组装一条完整的训练样本
+        samples.append(input_X + [r_opt_label, ground_truth_C, ground_truth_R])
+
+    return samples
+
+
+def _run_scenario_task(task):
+    """进程池的工作函数 (必须是模块级函数才能被pickle)。"""
+    index, scenario, config, seed = task
+    return index, run_scenario(scenario, config, seed)
+
+
+def scenario_key(scenario):
+    """场景在清单中的唯一标识 (轨迹场景用轨迹路径代替带宽)。"""
+    link, delay, loss, r_ratio = scenario
+    link = link.path if isinstance(link, MahimahiTrace) else link
+    return f"{link}|{delay}|{loss}|{r_ratio}"
+
+
+def generate_training_data(config, workers=1, seed=None, output_path=None, output_format=None,
+                           chunk_size=None, resume=False):
     """
     在受控环境中，通过主动实验生成用于训练GBDT模型的数据集。
+
+    样本按场景流式写入磁盘 (见 ChunkedSampleWriter)，内存占用与场景总数无关；
+    resume=True 时跳过清单中已经完成的场景，从中断处继续。
+
+    Args:
+        config (dict): 完整配置。
+        workers (int): 并行工作进程数；1 表示在当前进程中顺序运行。
+        seed (int, optional): 全局随机数种子，默认取 data_generation_params.seed (缺省为0)。
+                              每个场景的种子由它和场景编号派生，与工作进程数无关，
+                              因此同一个种子总是生成同一份CSV。
+        output_path (str, optional): 输出路径，默认是 data/training_data.<format>。
+        output_format (str, optional): 'csv' (默认)、'parquet' 或 'arrow'。
+        chunk_size (int, optional): 每批写入的样本数。
+        resume (bool): 是否在已有输出上续写。
     """
     log = setup_logger(name='DataGenerator', log_file='data_generation.log')
     log.info("Starting data generation process with self-sufficient method...")
@@ -56,73 +163,58 @@ def generate_training_data(config):
     delays = gen_config.get('delays', [20, 50])
     loss_rates = gen_config.get('loss_rates', [0, 0.01])
     background_traffic_ratios = gen_config.get('background_traffic_ratios', [0.1, 0.3])
-
-    network_scenarios = list(product(bandwidths, delays, loss_rates, background_traffic_ratios))
-    log.info(f"Generated {len(network_scenarios)} network scenarios to run.")
-
-    all_training_samples = []
-
-    # 2. 遍历每一个“参数已知的宇宙”
-    for bw, delay, loss, r_ratio in network_scenarios:
-
-        # --- “上帝”知道这个宇宙的物理常数 ---
-        ground_truth_C = bw
-        ground_truth_R = bw * r_ratio
-
-        log.info(
-            f"Running in new universe: C={ground_truth_C}Mbps, R={ground_truth_R}Mbps, Delay={delay}ms, Loss={loss * 100}%")
-
-        # a. 创建这个宇宙
-        env_config = {
-            'mahimahi_params': {'bandwidth': bw, 'delay': delay, 'loss': loss, 'background_traffic': ground_truth_R}}
-        network_env = NetworkEnvironment(env_config)
-        cubic = CubicComponent()
-        sage = SageComponent()
-
-        # b. 记录“问题 (X)” 和 “答案 (Y)”
-        # 在这个环境中运行一段时间，收集多个决策点的数据
-        for _ in range(config.get('samples_per_scenario', 10)):
-            # i. 记录问题：获取CUBIC和Sage的建议及其反馈
-            feedback_cl = network_env.run_and_get_feedback(cubic)
-            feedback_rl = network_env.run_and_get_feedback(sage)
-            feedback_prev = network_env.get_last_feedback()  # 假设可以获取上一轮的反馈
-
-            # 构建9维输入向量X (这里需要您根据feedback字典填充)
-            input_X = [
-                feedback_cl['sending_rate'], feedback_cl['utility'], feedback_cl['rtt_gradient'],
-                feedback_rl['sending_rate'], feedback_rl['utility'], feedback_rl['rtt_gradient'],
-                feedback_prev['sending_rate'], feedback_prev['utility'], feedback_prev['rtt_gradient'],
-            ]
-
-            # ii. 寻找答案：进行微型实验
-            candidate_rates = [
-                feedback_cl['sending_rate'],
-                feedback_rl['sending_rate'],
-                np.mean([feedback_cl['sending_rate'], feedback_rl['sending_rate']]),
-                max(feedback_cl['sending_rate'], feedback_rl['sending_rate']) * 1.2
-            ]
-            r_opt_label = find_optimal_rate_via_micro_experiment(network_env, candidate_rates)
-
-            # iii. 组装一条完整的训练样本
-            training_sample = input_X + [r_opt_label, ground_truth_C, ground_truth_R]
-            all_training_samples.append(training_sample)
-
-    # 3. 将所有收集到的数据保存到CSV文件中
-    if all_training_samples:
-        feature_columns = [
-            'r_cl', 'U_cl', 'dD_cl', 'r_rl', 'U_rl', 'dD_rl', 'r_prev', 'U_prev', 'dD_prev'
-        ]
-        label_columns = ['r_opt_label', 'C_label', 'R_label']
-        df = pd.DataFrame(all_training_samples, columns=feature_columns + label_columns)
-
-        output_path = os.path.join(project_root, 'data', 'training_data.csv')
-        df.to_csv(output_path, index=False)
-        log.info(f"Successfully saved {len(df)} training samples to {output_path}")
+    # 可选：Mahimahi 轨迹文件列表。给出时用轨迹代替恒定带宽维度
+    traces = gen_config.get('traces', [])
+    if seed is None:
+        seed = gen_config.get('seed', 0)
+    output_format = output_format or gen_config.get('output_format', 'csv')
+    chunk_size = chunk_size or gen_config.get('chunk_size', 1000)
+    if output_path is None:
+        output_path = os.path.join(project_root, 'data', f'training_data.{output_format}')
+
+    links = [MahimahiTrace(path) for path in traces] if traces else bandwidths
+    network_scenarios = list(product(links, delays, loss_rates, background_traffic_ratios))
+    log.info(f"Generated {len(network_scenarios)} network scenarios to run with {workers} worker(s).")
+
+    writer = ChunkedSampleWriter(output_path, FEATURE_COLUMNS + LABEL_COLUMNS, fmt=output_format,
+                                 chunk_size=chunk_size, resume=resume,
+                                 metadata={'seed': seed,
+                                           'samples_per_scenario': config.get('samples_per_scenario', 10)})
+
+    tasks = [(i, scenario, config, _scenario_seed(seed, i)) for i, scenario in enumerate(network_scenarios)
+             if not writer.is_done(scenario_key(scenario))]
+    if len(tasks) < len(network_scenarios):
+        log.info(f"Resuming: {len(network_scenarios) - len(tasks)} scenarios already completed.")
+
+    # 2. 遍历每一个“参数已知的宇宙”；并行时按场景顺序流式收回结果，保证输出顺序确定
+    with writer:
+        if workers > 1:
+            with multiprocessing.Pool(processes=workers) as pool:
+                for index, samples in pool.imap(_run_scenario_task, tasks):
+                    writer.write_scenario(scenario_key(network_scenarios[index]), samples)
+                    log.info(f"Scenario {index + 1}/{len(network_scenarios)} finished ({len(samples)} samples).")
+        else:
+            for task in tasks:
+                index, samples = _run_scenario_task(task)
+                writer.write_scenario(scenario_key(network_scenarios[index]), samples)
+
+    # 3. 所有样本都已分批写入磁盘
+    if writer.rows_written:
+        log.info(f"Successfully saved {writer.rows_written} training samples to {output_path}")
     else:
         log.warning("No training samples were collected.")
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate GBDT training data.')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--seed', type=int, default=None, help='global random seed')
+    parser.add_argument('--output', default=None, help='output file (csv) or directory (parquet/arrow)')
+    parser.add_argument('--format', choices=SUPPORTED_FORMATS, default=None, help='output format')
+    parser.add_argument('--chunk-size', type=int, default=None, help='samples per written batch')
+    parser.add_argument('--resume', action='store_true', help='skip scenarios already in the manifest')
+    args = parser.parse_args()
+
     # ... (加载配置文件的代码保持不变) ...
     config_path = os.path.join(project_root, 'config.yml')
     try:
@@ -134,4 +226,5 @@ if __name__ == '__main__':
     except yaml.YAMLError as e:
         print(f"FATAL: Error parsing YAML file: {e}")
         sys.exit(1)
-    generate_training_data(config)
\ No newline at end of file
+    generate_training_data(config, workers=args.workers, seed=args.seed, output_path=args.output,
+                           output_format=args.format, chunk_size=args.chunk_size, resume=args.resume)
\ No newline at end of file
@@ -14,6 +14,7 @@ sys.path.insert(0, project_root)
 
 from utils.parser import parse_iperf_output
 from utils.logger import setup_logger
+from utils.telemetry import load_telemetry, telemetry_frame
 
 
 def plot_throughput_over_time(results_df, output_path):
@@ -70,6 +71,43 @@ def plot_throughput_delay_scatter(results_df, output_path):
     log.info("Plot saved successfully.")
 
 
+def load_telemetry_results(results_directory):
+    """
+    读取目录下所有遥测文件 (*.tlm)，每个文件视为一次运行，文件名 (去掉扩展名) 作为算法名。
+
+    Returns:
+        tuple: (时间序列DataFrame, 汇总DataFrame)；没有遥测文件时返回 (None, None)。
+               时间序列含 'Algorithm', 'Time', 'Throughput' 列，
+               汇总含 'Algorithm', 'Avg_Throughput', 'Avg_Delay' 列。
+    """
+    if not os.path.isdir(results_directory):
+        return None, None
+    files = sorted(f for f in os.listdir(results_directory) if f.endswith('.tlm'))
+    if not files:
+        return None, None
+
+    timeseries, summary = [], []
+    for file_name in files:
+        records, header = load_telemetry(os.path.join(results_directory, file_name))
+        if len(records) == 0:
+            continue
+        df = telemetry_frame(records, header)
+        algorithm = os.path.splitext(file_name)[0]
+        # 优先使用仿真时间；真实链路上没有仿真时间，改用相对墙钟时间
+        if df['sim_time'].notna().all():
+            elapsed = df['sim_time']
+        else:
+            elapsed = df['wall_time'] - df['wall_time'].iloc[0]
+        timeseries.append(pd.DataFrame({'Algorithm': algorithm, 'Time': elapsed.round(1),
+                                        'Throughput': df['throughput']}))
+        summary.append({'Algorithm': algorithm,
+                        'Avg_Throughput': df['throughput'].mean(),
+                        'Avg_Delay': df['rtt_ms'].quantile(0.95)})
+    if not summary:
+        return None, None
+    return pd.concat(timeseries, ignore_index=True), pd.DataFrame(summary)
+
+
 def main(results_directory):
     """
     主函数，负责读取所有实验结果，并调用绘图函数。
@@ -91,8 +129,20 @@ def main(results_directory):
     #             # ... 在这里您还需要解析出延迟数据 ...
     #             # ... 然后将所有数据合并到一个大的DataFrame中 ...
 
-    # --- 使用模拟数据进行演示 ---
-    # 假设我们已经解析好了数据
+    timeseries_df, summary_df = load_telemetry_results(results_directory)
+
+    # --- 调用绘图函数 ---
+    output_dir = os.path.join(project_root, 'results', 'plots')
+    os.makedirs(output_dir, exist_ok=True)
+
+    if summary_df is not None:
+        log.info(f"Loaded telemetry for {len(summary_df)} run(s).")
+        plot_throughput_over_time(timeseries_df, os.path.join(output_dir, 'throughput_over_time.png'))
+        plot_throughput_delay_scatter(summary_df, os.path.join(output_dir, 'throughput_delay_scatter.png'))
+        return
+
+    # --- 没有遥测文件时，使用模拟数据进行演示 ---
+    log.warning("No telemetry (*.tlm) found; plotting mock data.")
     mock_data = {
         'Algorithm': ['Genet', 'Genet', 'Anole', 'Anole', 'CUBIC', 'CUBIC'],
         'Avg_Throughput': [95, 98, 85, 88, 70, 72],
@@ -100,10 +150,6 @@ def main(results_directory):
     }
     summary_df = pd.DataFrame(mock_data)
 
-    # --- 调用绘图函数 ---
-    output_dir = os.path.join(project_root, 'results', 'plots')
-    os.makedirs(output_dir, exist_ok=True)
-
     # 绘制散点图
     scatter_plot_path = os.path.join(output_dir, 'throughput_delay_scatter.png')
     plot_throughput_delay_scatter(summary_df, scatter_plot_path)
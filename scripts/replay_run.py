@@ -0,0 +1,163 @@
+## 离线回放：用录制的逐RTT反馈重新运行 Genet 的决策逻辑，并报告与录制运行的差异
+# genet_project/scripts/replay_run.py
+
+import sys
+import os
+import copy
+import json
+import time
+import argparse
+import yaml
+
+# --- 项目路径设置 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from core.genet import Genet
+from core.registry import component_names
+from core.run_summary import RunBudget
+from env.network_env import NetworkEnvironment
+from utils.logger import setup_logger
+from utils.telemetry import load_telemetry, read_telemetry_header, compare_decisions
+from utils import events
+
+
+def set_config_value(config, path, value):
+    """把 value 写到配置中以点号分隔的 path (如 'genet_params.n_min')，缺失的中间层自动创建。"""
+    *parents, leaf = path.strip().split('.')
+    node = config
+    for name in parents:
+        node = node.setdefault(name, {})
+    node[leaf] = value
+
+
+def apply_overrides(config, overrides):
+    """
+    返回应用了命令行覆盖项的配置副本。
+
+    Args:
+        config (dict): 原始配置 (不会被修改)。
+        overrides (list[str]): 形如 'genet_params.eta_update_alpha=0.2' 的覆盖项，值按YAML解析。
+
+    Returns:
+        dict: 新的配置。
+    """
+    config = copy.deepcopy(config)
+    for override in overrides or []:
+        key, sep, value = override.partition('=')
+        if not sep or not key:
+            raise ValueError(f"Override must look like section.key=value: {override}")
+        set_config_value(config, key, yaml.safe_load(value))
+    return config
+
+
+def replay_run(config, telemetry_path, output_path=None, log_level='WARNING'):
+    """
+    以录制运行的遥测文件为链路后端，重新运行一次 Genet (不改动任何控制器逻辑)。
+
+    录制运行与回放必须使用相同的组件列表 (遥测头部中的组件名)；
+    预算为录制的RTT数，因此回放在同一个RTT处结束 (决策不同时最多多出一个周期的评估探测)。
+
+    Args:
+        config (dict): 回放使用的配置 (可以带有覆盖过的超参数)。
+        telemetry_path (str): 录制运行的 .tlm 文件。
+        output_path (str, optional): 回放运行的遥测写到这里；默认只保留在内存中。
+        log_level (str): 回放期间的事件日志级别。
+
+    Returns:
+        tuple: (RunSummary, report)。report 是 compare_decisions 的结果，另含
+               'rate_mismatches' / 'overrun' (见 ReplayBackend) 与 'wall_sec'。
+    """
+    header, _, n_records = read_telemetry_header(telemetry_path)
+    names = component_names(config)
+    if names != header['components']:
+        raise ValueError(f"Replay components {names} do not match the recorded run {header['components']}")
+
+    replay_config = copy.deepcopy(config)
+    env_params = replay_config.setdefault('env_params', {})
+    env_params['backend'] = 'replay'
+    env_params.setdefault('replay', {})['path'] = telemetry_path
+    # 回放记录保留在内存环中时，环必须装得下整个回放 (录制的RTT数 + 最多一轮评估与验证)
+    replay_config['telemetry_params'] = {'enabled': True, 'path': output_path,
+                                         'buffer_records': n_records + len(names) + 2}
+    replay_config['logging_params'] = {'level': log_level, 'console': True}
+
+    events.configure(replay_config)
+    network_env = NetworkEnvironment(replay_config)
+    genet = Genet(replay_config, network_env)
+    wall_start = time.perf_counter()
+    try:
+        summary = genet.run(RunBudget(rtts=n_records))
+    finally:
+        genet.close()
+        network_env.close()
+    wall_sec = time.perf_counter() - wall_start
+
+    recorded, _ = load_telemetry(telemetry_path)
+    replayed = load_telemetry(output_path)[0] if output_path else genet.telemetry.recent()
+    report = compare_decisions(recorded, replayed)
+    report.update(rate_mismatches=network_env.backend.rate_mismatches,
+                  overrun=network_env.backend.overrun, wall_sec=wall_sec)
+    return summary, report
+
+
+def format_report(path, report):
+    """把一次回放的差异报告格式化为几行文字。"""
+    lines = [f"{path}: {report['n_compared']} RTTs compared "
+             f"(recorded {report['n_recorded']}, replayed {report['n_replayed']}) in {report['wall_sec']:.2f}s"]
+    first = report['first_divergence']
+    if first is None:
+        lines.append("  decisions identical to the recorded run")
+    else:
+        fields = ', '.join(f"{k}: {a} -> {b}" for k, a, b in
+                           ((k, *v) for k, v in first['fields'].items()))
+        lines.append(f"  first divergence at RTT {first['rtt_index']} (cycle {first['cycle']}): {fields}")
+        mismatches = ', '.join(f"{k} {v}" for k, v in report['mismatches'].items() if v)
+        lines.append(f"  divergent RTTs {report['divergent_rtts']} ({mismatches}); "
+                     f"divergent cycles {len(report['divergent_cycles'])}")
+    recorded_u, replayed_u = report['mean_utility']
+    lines.append(f"  mean utility {recorded_u:.2f} -> {replayed_u:.2f}; "
+                 f"rate mismatches {report['rate_mismatches']}, overrun {report['overrun']}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay recorded Genet telemetry through the controller offline.')
+    parser.add_argument('telemetry', nargs='+', help='recorded .tlm files')
+    parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='KEY=VALUE',
+                        help='config override, e.g. genet_params.eta_update_alpha=0.2 (repeatable)')
+    parser.add_argument('--output-dir', default=None, help='write each replayed run\'s telemetry here')
+    parser.add_argument('--report', default=None, help='write the divergence reports to this JSON file')
+    parser.add_argument('--log-level', default='WARNING', help='event log level during the replay')
+    args = parser.parse_args()
+
+    log = setup_logger(name='GenetReplay', log_file='replay.log')
+
+    # 加载配置文件
+    config_path = os.path.join(project_root, 'config.yml')
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+    except FileNotFoundError:
+        print(f"FATAL: Configuration file not found at {config_path}")
+        sys.exit(1)
+    except yaml.YAMLError as e:
+        print(f"FATAL: Error parsing YAML file: {e}")
+        sys.exit(1)
+    config = apply_overrides(config, args.overrides)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    reports = {}
+    for path in args.telemetry:
+        output_path = None
+        if args.output_dir:
+            output_path = os.path.join(args.output_dir, os.path.basename(path))
+        summary, report = replay_run(config, path, output_path, args.log_level)
+        reports[path] = {**report, 'summary': summary.as_dict()}
+        log.info(format_report(path, report))
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(reports, f, indent=2, default=float)
+        log.info(f"Wrote {len(reports)} replay reports to {args.report}")
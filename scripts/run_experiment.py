@@ -3,6 +3,9 @@
 
 import sys
 import os
+import copy
+import csv
+import argparse
 import yaml
 
 # 为了能从脚本中正确导入项目内的其他模块，我们需要将项目根目录添加到Python的搜索路径中
@@ -11,18 +14,32 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
 from core.genet import Genet
+from core.async_genet import AsyncGenet
+from core.run_summary import RunBudget
 from env.network_env import NetworkEnvironment
+from env.async_env import AsyncNetworkEnvironment
 from utils.logger import setup_logger
+from utils import events
 
-def run_single_experiment(config):
+def run_single_experiment(config, budget=None, async_loop=False):
     """
     运行单次完整的Genet实验。
+
+    Args:
+        config (dict): 配置。
+        budget (RunBudget, optional): 运行预算；默认使用 simulation_params.duration_sec。
+        async_loop (bool): 使用 asyncio 主循环 (AsyncGenet)，让控制器的处理与链路传输重叠。
+
+    Returns:
+        RunSummary | None: 本次运行的汇总；被中断或出错时为 None。
     """
     # 1. 设置日志记录器
     log = setup_logger(name='GenetExperiment', log_file='experiment.log')
     log.info("="*30)
     log.info("Starting a new Genet experiment run.")
     log.info("="*30)
+    # Genet 各模块的运行事件按 logging_params 输出
+    events.configure(config)
 
     # 2. 初始化网络环境
     # network_env将负责所有与Mahimahi的交互
@@ -31,24 +48,101 @@ def run_single_experiment(config):
 
     # 3. 初始化Genet算法核心，并将环境和配置注入
     log.info("Initializing Genet core algorithm...")
-    genet_algorithm = Genet(config, network_env)
+    if async_loop:
+        genet_algorithm = AsyncGenet(config, AsyncNetworkEnvironment(network_env))
+    else:
+        genet_algorithm = Genet(config, network_env)
 
-    # 4. 启动Genet的主循环
-    # 注意：在一个真实的实验中，您可能需要在这里添加超时控制
-    # 或者让run()方法在特定条件下返回，以结束实验。
-    # 目前，它是一个无限循环，用于测试。
+    # 4. 启动Genet的主循环，直到运行预算用完
+    if budget is None:
+        budget = RunBudget.from_config(config)
+    log.info(f"Running with {budget}")
+    summary = None
     try:
-        genet_algorithm.run()
+        summary = genet_algorithm.run(budget)
+        log.info(f"Summary: {summary}")
+        if async_loop:
+            log.info(f"Link idle time between transmissions: {genet_algorithm.async_env.link_idle_sec:.3f}s "
+                     f"over {genet_algorithm.async_env.transmissions} transmissions")
     except KeyboardInterrupt:
         log.warning("Experiment interrupted by user.")
     except Exception as e:
         log.error(f"An unexpected error occurred: {e}", exc_info=True)
     finally:
+        genet_algorithm.close()
+        network_env.close()
+        events.shutdown()
         log.info("Experiment run finished.")
         log.info("="*30 + "\n")
+    return summary
+
+
+def _repetition_config(config, repetition):
+    """
+    第 repetition 次重复实验的配置：链路种子依次递增，遥测文件加上重复编号后缀。
+    """
+    rep_config = copy.deepcopy(config)
+    env_params = rep_config.setdefault('env_params', {})
+    if env_params.get('seed') is not None:
+        env_params['seed'] = env_params['seed'] + repetition
+    telemetry = rep_config.get('telemetry_params') or {}
+    if telemetry.get('enabled') and telemetry.get('path'):
+        stem, ext = os.path.splitext(telemetry['path'])
+        telemetry['path'] = f"{stem}_rep{repetition}{ext}"
+    return rep_config
+
+
+def run_experiments(config, repetitions=None, budget=None, output_path=None, async_loop=False):
+    """
+    按 simulation_params.repetitions 重复运行实验，并把每次的汇总写入CSV。
+
+    Args:
+        repetitions (int, optional): 重复次数，默认取 simulation_params.repetitions。
+        budget (RunBudget, optional): 每次运行的预算，默认取 simulation_params.duration_sec。
+        output_path (str, optional): 汇总CSV路径。
+        async_loop (bool): 使用 asyncio 主循环 (见 run_single_experiment)。
+
+    Returns:
+        list[RunSummary]: 成功完成的各次运行的汇总。
+    """
+    log = setup_logger(name='GenetExperiment', log_file='experiment.log')
+    if repetitions is None:
+        repetitions = config.get('simulation_params', {}).get('repetitions', 1)
+
+    summaries, rows = [], []
+    for repetition in range(repetitions):
+        log.info(f"Repetition {repetition + 1}/{repetitions}")
+        run_budget = copy.copy(budget) if budget is not None else None
+        summary = run_single_experiment(_repetition_config(config, repetition), run_budget, async_loop)
+        if summary is None:
+            break
+        summaries.append(summary)
+        rows.append({'repetition': repetition, **summary.as_dict()})
+
+    if output_path and rows:
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        with open(output_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        log.info(f"Wrote {len(rows)} run summaries to {output_path}")
+    return summaries
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run bounded Genet experiments.')
+    parser.add_argument('--repetitions', type=int, default=None, help='default: simulation_params.repetitions')
+    parser.add_argument('--duration', type=float, default=None, help='simulated seconds per run '
+                                                                     '(default: simulation_params.duration_sec)')
+    parser.add_argument('--wall-sec', type=float, default=None, help='wall-clock seconds per run')
+    parser.add_argument('--rtts', type=int, default=None, help='RTTs per run')
+    parser.add_argument('--cycles', type=int, default=None, help='decision cycles per run')
+    parser.add_argument('--output', default=os.path.join(project_root, 'results', 'run_summaries.csv'),
+                        help='CSV file for the per-run summaries')
+    parser.add_argument('--async-loop', action='store_true',
+                        help='overlap controller processing with link transmission on an asyncio event loop')
+    args = parser.parse_args()
+
     # 加载配置文件
     config_path = os.path.join(project_root, 'config.yml')
     try:
@@ -61,5 +155,9 @@ if __name__ == '__main__':
         print(f"FATAL: Error parsing YAML file: {e}")
         sys.exit(1)
 
-    # 运行实验
-    run_single_experiment(config)
\ No newline at end of file
+    # 运行实验 (命令行给出的预算覆盖 simulation_params.duration_sec)
+    budget = None
+    if any(v is not None for v in (args.duration, args.wall_sec, args.rtts, args.cycles)):
+        budget = RunBudget(wall_sec=args.wall_sec, sim_sec=args.duration, rtts=args.rtts, cycles=args.cycles)
+    run_experiments(config, repetitions=args.repetitions, budget=budget, output_path=args.output,
+                    async_loop=args.async_loop)
\ No newline at end of file
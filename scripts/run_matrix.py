@@ -0,0 +1,231 @@
+## 实验矩阵：在进程池上并行运行 (场景, 算法, 重复) 的所有组合并汇总结果
+# genet_project/scripts/run_matrix.py
+
+import sys
+import os
+import copy
+import csv
+import itertools
+import argparse
+import multiprocessing
+import yaml
+import numpy as np
+
+# --- 项目路径设置 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from core.genet import Genet
+from core.baseline import SingleComponentBaseline
+from core.registry import component_names
+from core.run_summary import RunBudget, RunStats, RunSummary
+from env.network_env import NetworkEnvironment
+from utils.logger import setup_logger
+from utils import events
+
+KEY_COLUMNS = ['run_id', 'scenario', 'algorithm', 'repetition', 'seed', 'status', 'error']
+
+
+def build_scenarios(matrix_params):
+    """
+    把 link_grid (每个链路参数一个取值列表) 与 trace_paths 展开成场景列表。
+
+    Returns:
+        list[dict]: 每个场景是一组 env_params.link 覆盖值。
+    """
+    grid = dict(matrix_params.get('link_grid') or {})
+    if matrix_params.get('trace_paths'):
+        grid['trace_path'] = list(matrix_params['trace_paths'])
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def scenario_key(scenario):
+    """场景的稳定字符串标识，用于结果表与断点续跑。"""
+    return ','.join(f'{k}={scenario[k]}' for k in scenario)
+
+
+def _run_seed(base_seed, scenario_index, repetition):
+    """同一场景、同一重复的所有算法共用一个种子，保证比较是在同一条链路上进行的。"""
+    return int(np.random.SeedSequence([base_seed, scenario_index, repetition]).generate_state(1)[0])
+
+
+def _run_config(config, scenario, seed, log_level):
+    run_config = copy.deepcopy(config)
+    env_params = run_config.setdefault('env_params', {})
+    env_params['seed'] = seed
+    env_params.setdefault('link', {}).update(scenario)
+    # 工作进程不写遥测，事件日志只保留告警
+    run_config.setdefault('telemetry_params', {})['enabled'] = False
+    run_config['logging_params'] = {'level': log_level, 'console': True}
+    return run_config
+
+
+def run_one(config, algorithm, budget):
+    """
+    在当前进程中运行一次 Genet 或单组件基线。
+
+    Returns:
+        RunSummary
+    """
+    events.configure(config)
+    network_env = NetworkEnvironment(config)
+    if algorithm == 'Genet':
+        runner = Genet(config, network_env)
+    else:
+        runner = SingleComponentBaseline(config, network_env, algorithm)
+    try:
+        return runner.run(budget)
+    finally:
+        runner.close()
+        network_env.close()
+
+
+def _run_matrix_task(task):
+    """进程池任务：返回结果表中的一行 (出错时 status 为 error)。"""
+    row = {k: task[k] for k in ('run_id', 'scenario', 'algorithm', 'repetition', 'seed')}
+    budget = RunBudget(wall_sec=task['timeout_sec'], sim_sec=task['duration_sec'])
+    try:
+        summary = run_one(task['config'], task['algorithm'], budget)
+    except Exception as e:
+        row.update(status='error', error=f'{type(e).__name__}: {e}')
+        return row
+    # 墙钟预算先于仿真时长用完，说明这一次运行超时了
+    status = 'timeout' if summary.stop_reason == 'wall_sec' and task['duration_sec'] is not None else 'ok'
+    row.update(status=status, error='', **summary.as_dict())
+    return row
+
+
+def _summary_columns(config):
+    return list(RunSummary(RunStats(component_names(config)), 0.0, 0.0, 0, 0, None).as_dict())
+
+
+def _completed_runs(output_path):
+    """读取已有结果表，返回 status 为 ok 的 run_id 集合。"""
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, newline='') as f:
+        return {row['run_id'] for row in csv.DictReader(f) if row.get('status') == 'ok'}
+
+
+def run_matrix(config, workers=None, output_path=None, algorithms=None, repetitions=None):
+    """
+    运行完整的实验矩阵。
+
+    每个 (场景, 算法, 重复) 组合是一次独立运行，以仿真时长 simulation_params.duration_sec
+    为预算，并以 timeout_sec 作为墙钟上限；结果逐行追加到CSV，重跑时跳过已成功的组合。
+
+    Args:
+        config (dict): 配置 (读取 experiment_matrix_params 与 simulation_params)。
+        workers (int, optional): 工作进程数，默认取 experiment_matrix_params.workers (null 为CPU核数)。
+        output_path (str, optional): 结果CSV路径。
+        algorithms (list[str], optional): 覆盖 experiment_matrix_params.algorithms。
+        repetitions (int, optional): 覆盖 simulation_params.repetitions。
+
+    Returns:
+        str: 结果CSV路径。
+    """
+    log = setup_logger(name='ExperimentMatrix', log_file='experiment_matrix.log')
+    params = config.get('experiment_matrix_params', {}) or {}
+    sim_params = config.get('simulation_params', {}) or {}
+    algorithms = algorithms or params.get('algorithms', ['Genet', 'CUBIC', 'Sage'])
+    repetitions = repetitions or sim_params.get('repetitions', 1)
+    workers = workers or params.get('workers') or os.cpu_count()
+    output_path = output_path or os.path.join(project_root, params.get('output', 'results/matrix_results.csv'))
+    timeout_sec = params.get('timeout_sec')
+    base_seed = params.get('seed', 0)
+    log_level = params.get('log_level', 'WARNING')
+
+    scenarios = build_scenarios(params)
+    done = _completed_runs(output_path)
+    tasks = []
+    for scenario_index, scenario in enumerate(scenarios):
+        key = scenario_key(scenario)
+        for repetition in range(repetitions):
+            seed = _run_seed(base_seed, scenario_index, repetition)
+            for algorithm in algorithms:
+                run_id = f'{key}|{algorithm}|{repetition}'
+                if run_id in done:
+                    continue
+                tasks.append({
+                    'run_id': run_id, 'scenario': key, 'algorithm': algorithm, 'repetition': repetition,
+                    'seed': seed, 'config': _run_config(config, scenario, seed, log_level),
+                    'duration_sec': sim_params.get('duration_sec'), 'timeout_sec': timeout_sec,
+                })
+    total = len(scenarios) * repetitions * len(algorithms)
+    log.info(f"{len(scenarios)} scenarios x {len(algorithms)} algorithms x {repetitions} repetitions = {total} runs; "
+             f"{total - len(tasks)} already done, {len(tasks)} to run on {workers} worker(s).")
+
+    columns = KEY_COLUMNS + _summary_columns(config)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+    with open(output_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        if write_header:
+            writer.writeheader()
+
+        def write(row):
+            writer.writerow(row)
+            f.flush()
+            log.info(f"[{row['status']}] {row['run_id']}")
+
+        if workers > 1 and len(tasks) > 1:
+            # 工作进程内部已有墙钟预算；这里的超时只兜底卡死的进程
+            grace = None if timeout_sec is None else timeout_sec * 2 + 30
+            pool = multiprocessing.Pool(processes=workers, maxtasksperchild=50)
+            try:
+                pending = [(task, pool.apply_async(_run_matrix_task, (task,))) for task in tasks]
+                for task, result in pending:
+                    try:
+                        write(result.get(timeout=grace))
+                    except multiprocessing.TimeoutError:
+                        write({k: task[k] for k in ('run_id', 'scenario', 'algorithm', 'repetition', 'seed')}
+                              | {'status': 'timeout', 'error': f'no result after {grace}s'})
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for task in tasks:
+                write(_run_matrix_task(task))
+
+    log.info(f"Results written to {output_path}")
+    return output_path
+
+
+def aggregate_results(output_path):
+    """
+    按 (场景, 算法) 汇总成功运行的均值，返回 DataFrame (同时打印一张对比表)。
+    """
+    import pandas as pd
+
+    df = pd.read_csv(output_path)
+    df = df[df['status'] == 'ok']
+    if df.empty:
+        return df
+    metrics = ['avg_throughput', 'delay_p95', 'mean_utility', 'trigger_count', 'crisis_count']
+    table = df.groupby(['scenario', 'algorithm'])[metrics].mean()
+    table['runs'] = df.groupby(['scenario', 'algorithm']).size()
+    print(table.to_string(float_format=lambda v: f'{v:.2f}'))
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the Genet / baseline experiment matrix.')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--output', default=None, help='results CSV (default: experiment_matrix_params.output)')
+    parser.add_argument('--algorithms', nargs='+', default=None,
+                        help='Genet and/or baseline component names (e.g. CUBIC Sage BBR)')
+    parser.add_argument('--repetitions', type=int, default=None, help='default: simulation_params.repetitions')
+    args = parser.parse_args()
+
+    config_path = os.path.join(project_root, 'config.yml')
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+    except Exception as e:
+        print(f"FATAL: Could not load config file. Error: {e}")
+        sys.exit(1)
+
+    results_path = run_matrix(config, workers=args.workers, output_path=args.output,
+                              algorithms=args.algorithms, repetitions=args.repetitions)
+    aggregate_results(results_path)
@@ -0,0 +1,278 @@
+## 超参数搜索：随机 / 拉丁超立方采样 + 逐次减半，在进程池上并行评估候选配置
+# genet_project/scripts/search_hyperparams.py
+
+import sys
+import os
+import copy
+import csv
+import math
+import argparse
+import multiprocessing
+import yaml
+import numpy as np
+
+# --- 项目路径设置 ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+
+from core.genet import Genet
+from core.run_summary import RunBudget
+from core.utility import UtilityParams, utility_from_columns
+from env.network_env import NetworkEnvironment
+from scripts.replay_run import apply_overrides, set_config_value
+from scripts.run_matrix import scenario_key
+from utils.logger import setup_logger
+from utils.telemetry import STAGE_EXEC
+from utils import events
+
+# 按基准效用函数计算的执行阶段平均效用值 (候选配置可能改动 utility_params，需要一把固定的尺子)
+REFERENCE_UTILITY = 'reference_utility'
+# 工作进程内存遥测环的容量 (条)；超过时只按最近的记录计算 reference_utility
+TELEMETRY_RECORDS = 1 << 17
+
+
+def sample_candidates(space, n, sampler='lhs', seed=0):
+    """
+    在搜索空间中采样 n 个候选配置。
+
+    Args:
+        space (dict): {参数路径: [下界, 上界]} (两端都是整数时按整数采样) 或 {参数路径: {'choices': [...]}}。
+        n (int): 候选个数。
+        sampler (str): 'random' (独立均匀采样) 或 'lhs' (拉丁超立方：每一维的 n 个分层各落一个样本)。
+        seed (int): 随机数种子。
+
+    Returns:
+        list[dict]: 每个候选是 {参数路径: 取值}。
+    """
+    if sampler not in ('random', 'lhs'):
+        raise ValueError(f"Unknown sampler: {sampler}")
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for path, spec in space.items():
+        if sampler == 'lhs':
+            u = (rng.permutation(n) + rng.random(n)) / n
+        else:
+            u = rng.random(n)
+        if isinstance(spec, dict):
+            choices = list(spec['choices'])
+            columns[path] = [choices[min(int(x * len(choices)), len(choices) - 1)] for x in u]
+        else:
+            low, high = spec
+            if isinstance(low, int) and isinstance(high, int):
+                columns[path] = np.minimum(low + np.floor(u * (high - low + 1)), high).astype(int).tolist()
+            else:
+                columns[path] = (low + u * (high - low)).tolist()
+    return [{path: values[i] for path, values in columns.items()} for i in range(n)]
+
+
+def with_params(config, params):
+    """返回把候选参数 {参数路径: 取值} 写入后的配置副本。"""
+    config = copy.deepcopy(config)
+    for path, value in params.items():
+        set_config_value(config, path, value)
+    return config
+
+
+def _candidate_config(config, params, scenario, seed):
+    """一次评估的配置：候选参数 + 场景链路 + 种子；事件日志只保留告警，遥测只保留在内存中。"""
+    run_config = with_params(config, params)
+    env_params = run_config.setdefault('env_params', {})
+    env_params['seed'] = seed
+    env_params.setdefault('link', {}).update(scenario)
+    run_config['telemetry_params'] = {'enabled': True, 'path': None, 'buffer_records': TELEMETRY_RECORDS}
+    run_config['logging_params'] = {'level': 'WARNING', 'console': True}
+    return run_config
+
+
+def evaluate_candidate(config, budget, reference_params):
+    """
+    在当前进程中运行一次候选配置。
+
+    Returns:
+        dict: RunSummary.as_dict() 加上 reference_utility。
+    """
+    events.configure(config)
+    network_env = NetworkEnvironment(config)
+    genet = Genet(config, network_env)
+    try:
+        summary = genet.run(budget)
+    finally:
+        genet.close()
+        network_env.close()
+    records = genet.telemetry.recent()
+    execution = records[records['stage'] == STAGE_EXEC]
+    utility = utility_from_columns(execution['throughput'], execution['rtt_gradient'],
+                                   execution['rtt_ms'], execution['rtt_min_ms'], reference_params)
+    return {**summary.as_dict(), REFERENCE_UTILITY: float(np.mean(utility)) if utility.size else float('nan')}
+
+
+def _search_task(task):
+    """进程池任务：评估一个 (候选, 场景)，出错时返回 status 为 error 的结果。"""
+    budget = RunBudget(sim_sec=task['duration_sec'], wall_sec=task['timeout_sec'])
+    try:
+        result = evaluate_candidate(task['config'], budget, task['reference_params'])
+    except Exception as e:
+        return {'status': 'error', 'error': f'{type(e).__name__}: {e}'}
+    return {'status': 'ok', 'error': '', **result}
+
+
+def _run_tasks(tasks, workers):
+    if workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(processes=min(workers, len(tasks)), maxtasksperchild=50) as pool:
+            return pool.map(_search_task, tasks, chunksize=1)
+    return [_search_task(task) for task in tasks]
+
+
+def successive_halving(config, candidates, scenarios, min_duration_sec, eta=3, max_rungs=None,
+                       objective=REFERENCE_UTILITY, maximize=True, workers=1, seed=0, timeout_sec=None):
+    """
+    逐次减半：第 r 轮以 min_duration_sec * eta^r 的仿真时长在所有场景上评估存活的候选，
+    按场景平均的目标值排序，只保留前 1/eta 进入下一轮，直到只剩一个候选或达到 max_rungs。
+
+    同一场景在所有候选、所有轮次中使用同一个链路种子，候选之间的比较是在同一条链路上进行的。
+
+    Args:
+        config (dict): 基准配置 (候选参数覆盖在它之上；reference_utility 使用它的 utility_params)。
+        candidates (list[dict]): sample_candidates 的结果。
+        scenarios (list[dict]): env_params.link 覆盖值列表 (可以含 trace_path)。
+        objective (str): reference_utility 或 RunSummary.as_dict() 中的任一列。
+        maximize (bool): 目标值越大越好。
+        workers (int): 工作进程数。
+        timeout_sec (float, optional): 单次评估的墙钟上限。
+
+    Returns:
+        list[dict]: 每个候选一行：candidate、rung (到达的最高轮次)、score (该轮的目标值)、
+                    status、各参数取值及该轮场景平均的主要指标；按 (rung, score) 从好到差排序。
+    """
+    log = setup_logger(name='HyperparamSearch', log_file='hyperparam_search.log')
+    reference_params = UtilityParams.from_config(config.get('utility_params', {}))
+    seeds = [int(np.random.SeedSequence([seed, i]).generate_state(1)[0]) for i in range(len(scenarios))]
+    sign = 1.0 if maximize else -1.0
+    if max_rungs is None:
+        max_rungs = max(int(math.ceil(math.log(max(len(candidates), 1), eta))), 0) + 1
+
+    rows = {i: {'candidate': i, 'rung': -1, 'score': float('nan'), 'status': 'pending', **params}
+            for i, params in enumerate(candidates)}
+    alive = list(rows)
+    for rung in range(max_rungs):
+        duration_sec = min_duration_sec * eta ** rung
+        tasks = [{'candidate': i, 'duration_sec': duration_sec, 'timeout_sec': timeout_sec,
+                  'reference_params': reference_params,
+                  'config': _candidate_config(config, candidates[i], scenario, run_seed)}
+                 for i in alive for scenario, run_seed in zip(scenarios, seeds)]
+        log.info(f"Rung {rung}: {len(alive)} candidates x {len(scenarios)} scenarios at {duration_sec:g}s sim")
+        results = _run_tasks(tasks, workers)
+
+        scores = {}
+        for k, i in enumerate(alive):
+            per_scenario = results[k * len(scenarios):(k + 1) * len(scenarios)]
+            row = rows[i]
+            row['rung'] = rung
+            errors = [r['error'] for r in per_scenario if r['status'] != 'ok']
+            if errors:
+                row.update(status='error', error=errors[0], score=float('nan'))
+                continue
+            row['status'] = 'ok'
+            for metric in (objective, 'avg_throughput', 'delay_p95', 'mean_utility', 'crisis_count'):
+                row[metric] = float(np.mean([r[metric] for r in per_scenario]))
+            row['score'] = row[objective]
+            if not math.isnan(row['score']):
+                scores[i] = row['score']
+
+        ranked = sorted(scores, key=lambda i: -sign * scores[i])
+        if ranked:
+            log.info(f"Rung {rung} best: candidate {ranked[0]} {objective}={scores[ranked[0]]:.3f}")
+        keep = max(len(ranked) // eta, 1)
+        if rung == max_rungs - 1 or len(ranked) <= 1:
+            break
+        for i in ranked[keep:]:
+            rows[i]['status'] = 'stopped'
+        alive = ranked[:keep]
+
+    def rank_key(row):
+        score = row['score']
+        return (-row['rung'], row['status'] != 'ok', math.isnan(score), -sign * score if not math.isnan(score) else 0)
+    return sorted(rows.values(), key=rank_key)
+
+
+def write_results(rows, output_path):
+    """把排好序的候选表写入CSV。"""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    columns = []
+    for row in rows:
+        columns += [k for k in row if k not in columns]
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_best_config(config, params, path):
+    """把最优候选覆盖到基准配置上，写出一份完整的配置文件。"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    best = with_params(config, params)
+    with open(path, 'w') as f:
+        yaml.safe_dump(best, f, sort_keys=False, allow_unicode=True)
+
+
+def run_search(config, workers=None, n_candidates=None, output_path=None, best_config_path=None):
+    """
+    按 hyperparam_search_params 运行一次完整的搜索，写出排序后的候选表与最优配置。
+
+    Returns:
+        list[dict]: 排序后的候选表 (见 successive_halving)。
+    """
+    log = setup_logger(name='HyperparamSearch', log_file='hyperparam_search.log')
+    params = config.get('hyperparam_search_params', {}) or {}
+    space = params.get('space') or {}
+    if not space:
+        raise ValueError("hyperparam_search_params.space is empty")
+    n_candidates = n_candidates or params.get('n_candidates', 27)
+    workers = workers or params.get('workers') or os.cpu_count()
+    scenarios = params.get('scenarios') or [{}]
+    output_path = output_path or os.path.join(project_root, params.get('output', 'results/hyperparam_search.csv'))
+    best_config_path = best_config_path or os.path.join(project_root,
+                                                        params.get('best_config', 'results/best_config.yml'))
+
+    candidates = sample_candidates(space, n_candidates, params.get('sampler', 'lhs'), params.get('seed', 0))
+    log.info(f"{n_candidates} candidates over {len(space)} parameters, {len(scenarios)} scenario(s): "
+             f"{', '.join(scenario_key(s) or 'default link' for s in scenarios)}")
+    rows = successive_halving(config, candidates, scenarios,
+                              min_duration_sec=params.get('min_duration_sec', 10),
+                              eta=params.get('eta', 3), max_rungs=params.get('max_rungs'),
+                              objective=params.get('objective', REFERENCE_UTILITY),
+                              maximize=params.get('maximize', True), workers=workers,
+                              seed=params.get('seed', 0), timeout_sec=params.get('timeout_sec'))
+    write_results(rows, output_path)
+    log.info(f"Ranked candidates written to {output_path}")
+
+    best = rows[0]
+    if best['status'] == 'ok':
+        write_best_config(config, {path: best[path] for path in space}, best_config_path)
+        log.info(f"Best candidate {best['candidate']} (score {best['score']:.3f}) written to {best_config_path}")
+    else:
+        log.warning("No candidate finished successfully; no config written.")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Search Genet hyperparameters with successive halving.')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    parser.add_argument('--candidates', type=int, default=None, help='default: hyperparam_search_params.n_candidates')
+    parser.add_argument('--output', default=None, help='ranked CSV (default: hyperparam_search_params.output)')
+    parser.add_argument('--best-config', default=None, help='default: hyperparam_search_params.best_config')
+    parser.add_argument('--set', dest='overrides', action='append', default=[], metavar='KEY=VALUE',
+                        help='base config override (repeatable)')
+    args = parser.parse_args()
+
+    config_path = os.path.join(project_root, 'config.yml')
+    try:
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+    except Exception as e:
+        print(f"FATAL: Could not load config file. Error: {e}")
+        sys.exit(1)
+    config = apply_overrides(config, args.overrides)
+
+    run_search(config, workers=args.workers, n_candidates=args.candidates,
+               output_path=args.output, best_config_path=args.best_config)
@@ -3,46 +3,63 @@
 
 import sys
 import os
+import argparse
 import yaml
-import pandas as pd
-import xgboost as xgb
-import joblib
 
 # --- 项目路径设置 ---
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 sys.path.insert(0, project_root)
 
+from core.features import FEATURE_COLUMNS, LABEL_COLUMNS
+from model.inference_model import FlatTreeEnsemble
 from utils.logger import setup_logger
 
 
+def load_training_data(data_path):
+    """
+    读取 generate_data.py 生成的数据集：CSV 文件，或由 part 文件组成的 Parquet / Arrow IPC 目录。
+    """
+    import pandas as pd
+
+    if not os.path.isdir(data_path):
+        return pd.read_csv(data_path)
+    if data_path.rstrip(os.sep).endswith('.parquet'):
+        return pd.read_parquet(data_path)
+
+    import pyarrow as pa
+    import pyarrow.ipc
+    parts = sorted(name for name in os.listdir(data_path) if name.endswith('.arrow'))
+    tables = [pa.ipc.open_file(os.path.join(data_path, name)).read_all() for name in parts]
+    return pa.concat_tables(tables).to_pandas()
+
+
 def train_inference_model(config):
     """
     读取生成的训练数据，训练GBDT推断模型，并保存。
+
+    同时写出两份模型：线上使用的扁平模型工件目录 (models/inference_engine.flat，见 export_model_artifact)
+    与 XGBoost 模型的 joblib pickle (models/inference_engine.gbdt，供基准测试与继续训练使用)。
     """
+    import xgboost as xgb
+    import joblib
+
     log = setup_logger(name='ModelTrainer', log_file='model_training.log')
     log.info("Starting GBDT model training process...")
 
     # 1. 加载训练数据集
-    data_path = os.path.join(project_root, 'data', 'training_data.csv')
+    output_format = config.get('data_generation_params', {}).get('output_format', 'csv')
+    data_path = os.path.join(project_root, 'data', f'training_data.{output_format}')
     try:
-        df = pd.read_csv(data_path)
+        df = load_training_data(data_path)
         log.info(f"Successfully loaded {len(df)} training samples from {data_path}")
     except FileNotFoundError:
         log.error(f"FATAL: Training data not found at {data_path}. Please run generate_data.py first.")
         return
 
     # 2. 准备特征 (X) 和标签 (Y)
-    # 特征是9维的网络状态向量
-    feature_columns = [
-        'r_cl', 'U_cl', 'dD_cl',
-        'r_rl', 'U_rl', 'dD_rl',
-        'r_prev', 'U_prev', 'dD_prev'
-    ]
-    # 标签是3个我们要预测的值
-    label_columns = ['r_opt_label', 'C_label', 'R_label']
-
-    X = df[feature_columns]
-    Y = df[label_columns]
+    # 特征是9维的网络状态向量，标签是3个我们要预测的值 (列定义与线上推断共用 core.features)
+    X = df[FEATURE_COLUMNS]
+    Y = df[LABEL_COLUMNS]
 
     log.info(f"Features shape: {X.shape}")
     log.info(f"Labels shape: {Y.shape}")
@@ -71,8 +88,41 @@ def train_inference_model(config):
     joblib.dump(model, model_path)
     log.info(f"Trained model saved successfully to {model_path}")
 
+    artifact_path = os.path.join(output_dir, 'inference_engine.flat')
+    export_model_artifact(model, artifact_path, metadata={'model_params': model_params, 'n_samples': len(df)})
+    log.info(f"Flat model artifact written to {artifact_path}")
+
+
+def export_model_artifact(model, artifact_path, metadata=None):
+    """
+    把训练好的 XGBoost 模型导出为扁平模型工件 (节点数组 .npy + manifest.json，推断引擎以内存映射方式加载)。
+
+    Args:
+        model: xgboost.XGBRegressor / Booster，或旧模型 pickle 的路径。
+        artifact_path (str): 工件目录。
+        metadata (dict, optional): 写进清单的额外信息。
+    """
+    if isinstance(model, str):
+        import joblib
+        model = joblib.load(model)
+    flat = FlatTreeEnsemble.from_xgboost(model)
+    flat.save(artifact_path, FEATURE_COLUMNS, LABEL_COLUMNS, metadata=metadata)
+    return flat
+
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the GBDT inference model.')
+    parser.add_argument('--export', metavar='PICKLE', default=None,
+                        help='only convert an existing joblib model to the flat artifact format')
+    parser.add_argument('--artifact', default=os.path.join(project_root, 'models', 'inference_engine.flat'),
+                        help='artifact directory for --export')
+    args = parser.parse_args()
+
+    if args.export:
+        export_model_artifact(args.export, args.artifact, metadata={'source': os.path.basename(args.export)})
+        print(f"Exported {args.export} to {args.artifact}")
+        sys.exit(0)
+
     # 加载主配置文件
     config_path = os.path.join(project_root, 'config.yml')
     try:
@@ -0,0 +1,192 @@
+## 训练数据的流式分块写入
+# genet_project/utils/dataset_writer.py
+
+import csv
+import json
+import os
+
+SUPPORTED_FORMATS = ('csv', 'parquet', 'arrow')
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def _import_pyarrow():
+    """pyarrow 是可选依赖，只有写 Parquet / Arrow IPC 时才需要。"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Writing parquet/arrow output requires pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+class ChunkedSampleWriter:
+    """
+    把训练样本按固定大小的批次追加写入磁盘，并维护一份“已完成场景”清单。
+
+    - csv: 单个CSV文件，每次刷新在文件末尾追加一批记录。
+    - parquet / arrow: 一个目录，每次刷新写出一个 part-XXXXX 文件 (Parquet 或 Arrow IPC)。
+
+    一个场景的样本只有在写入磁盘之后才会被记入清单 (<output>.manifest.json)，
+    清单本身通过临时文件 + 原子替换更新。因此进程在任何时刻崩溃，重新以
+    resume=True 打开时：清单之外的残留数据 (CSV 尾部 / 未登记的 part 文件) 会被丢弃，
+    清单中的场景会被跳过，其余场景从头重跑，不会出现重复或半截的场景。
+    """
+
+    def __init__(self, output_path, columns, fmt='csv', chunk_size=1000, resume=False, metadata=None):
+        """
+        Args:
+            output_path (str): CSV 文件路径，或 parquet/arrow 的输出目录。
+            columns (list[str]): 列名。
+            fmt (str): 'csv'、'parquet' 或 'arrow'。
+            chunk_size (int): 每批写入的记录数。
+            resume (bool): 为True时在已有输出上续写，否则覆盖旧输出。
+            metadata (dict, optional): 写入清单的元信息 (如随机数种子)；续写时必须与清单中的一致。
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported output format: {fmt} (expected one of {SUPPORTED_FORMATS})")
+        if fmt != 'csv':
+            self._pa = _import_pyarrow()
+
+        self.output_path = output_path
+        self.columns = list(columns)
+        self.fmt = fmt
+        self.chunk_size = chunk_size
+        self.metadata = metadata or {}
+        self.manifest_path = output_path.rstrip(os.sep) + MANIFEST_SUFFIX
+
+        self._rows = []
+        self._pending_keys = []
+
+        manifest = self._load_manifest() if resume else None
+        if manifest is None:
+            self._start_fresh()
+        else:
+            self._resume_from(manifest)
+        self._completed_set = set(self.completed)
+
+    # --- 清单 ---
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        if manifest['format'] != self.fmt or manifest['columns'] != self.columns:
+            raise ValueError(f"Existing output at {self.output_path} has a different format or schema; "
+                             f"cannot resume.")
+        if manifest.get('metadata', {}) != self.metadata:
+            raise ValueError(f"Existing output at {self.output_path} was generated with "
+                             f"{manifest.get('metadata')}, not {self.metadata}; cannot resume.")
+        return manifest
+
+    def _save_manifest(self):
+        manifest = {
+            'format': self.fmt,
+            'columns': self.columns,
+            'metadata': self.metadata,
+            'completed': self.completed,
+            'rows': self.rows_written,
+            'committed_bytes': self.committed_bytes,
+            'parts': self.parts,
+        }
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _start_fresh(self):
+        self.completed = []
+        self.rows_written = 0
+        self.parts = []
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        if self.fmt == 'csv':
+            with open(self.output_path, 'w', newline='') as f:
+                csv.writer(f).writerow(self.columns)
+            self.committed_bytes = os.path.getsize(self.output_path)
+        else:
+            self.committed_bytes = 0
+            os.makedirs(self.output_path, exist_ok=True)
+            for name in os.listdir(self.output_path):
+                if name.startswith('part-'):
+                    os.remove(os.path.join(self.output_path, name))
+        self._save_manifest()
+
+    def _resume_from(self, manifest):
+        self.completed = manifest['completed']
+        self.rows_written = manifest['rows']
+        self.committed_bytes = manifest['committed_bytes']
+        self.parts = manifest['parts']
+        if self.fmt == 'csv':
+            # 丢弃最后一次登记之后写入的半批数据
+            with open(self.output_path, 'r+b') as f:
+                f.truncate(self.committed_bytes)
+        else:
+            for name in os.listdir(self.output_path):
+                if name.startswith('part-') and name not in self.parts:
+                    os.remove(os.path.join(self.output_path, name))
+
+    # --- 写入 ---
+    def is_done(self, key):
+        """该场景是否已经完整写入磁盘。"""
+        return key in self._completed_set
+
+    def write_scenario(self, key, samples):
+        """
+        缓存一个场景的全部样本；缓存达到 chunk_size 条时写入一批。
+
+        Args:
+            key (str): 场景的唯一标识。
+            samples (list[list]): 该场景的样本，每条的长度与 columns 一致。
+        """
+        self._rows.extend(samples)
+        self._pending_keys.append(key)
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """把缓存中的样本写入磁盘，然后把对应场景登记为已完成。"""
+        if not self._pending_keys:
+            return
+        if self._rows:
+            if self.fmt == 'csv':
+                self._append_csv(self._rows)
+            else:
+                self._write_part(self._rows)
+            self.rows_written += len(self._rows)
+        self.completed.extend(self._pending_keys)
+        self._completed_set.update(self._pending_keys)
+        self._save_manifest()
+        self._rows = []
+        self._pending_keys = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 出错时也把已经完整收集的场景落盘，下次可以续写
+        self.close()
+        return False
+
+    def _append_csv(self, rows):
+        with open(self.output_path, 'a', newline='') as f:
+            csv.writer(f).writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        self.committed_bytes = os.path.getsize(self.output_path)
+
+    def _write_part(self, rows):
+        pa = self._pa
+        table = pa.table({name: [row[i] for row in rows] for i, name in enumerate(self.columns)})
+        extension = 'parquet' if self.fmt == 'parquet' else 'arrow'
+        name = f"part-{len(self.parts):05d}.{extension}"
+        path = os.path.join(self.output_path, name)
+        if self.fmt == 'parquet':
+            pa.parquet.write_table(table, path)
+        else:
+            with pa.ipc.new_file(path, table.schema) as writer:
+                writer.write_table(table)
+        self.parts.append(name)
\ No newline at end of file
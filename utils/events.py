@@ -0,0 +1,224 @@
+## 结构化事件日志：取代热路径上的 print
+# genet_project/utils/events.py
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+from .logger import setup_logger
+
+EVENT_LOGGER_NAME = 'Genet'
+# 比 CRITICAL 更高的级别，用于彻底关闭事件输出
+OFF = logging.CRITICAL + 10
+
+
+class EventType:
+    """
+    一种事件的类型：名称、级别和消息模板。
+
+    模板使用 str.format 语法，只有在事件真正被某个handler输出时才会被格式化。
+    """
+    __slots__ = ('name', 'level', 'template')
+
+    def __init__(self, name, level, template):
+        self.name = name
+        self.level = level
+        self.template = template
+
+    def __repr__(self):
+        return f"EventType({self.name!r}, {logging.getLevelName(self.level)})"
+
+
+class _EventMessage:
+    """LogRecord.msg 的占位对象：str() 时才按模板格式化。"""
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        return self.event.template.format(**self.fields)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条事件输出一行JSON：时间戳、级别、事件名和原始字段，便于事后分析。"""
+
+    def format(self, record):
+        entry = {'ts': record.created, 'level': record.levelname}
+        event = getattr(record, 'event', None)
+        if event is not None:
+            entry['event'] = event
+            entry.update(record.fields)
+        else:
+            entry['message'] = record.getMessage()
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    只把 LogRecord 放进队列，格式化留给后台线程。
+
+    标准 QueueHandler.prepare 会在调用线程里格式化消息，这里跳过这一步；
+    事件字段在 emit() 时已是独立的字典，跨线程传递是安全的。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+# --- 事件定义 ---
+# 每个RTT都会发生的事件为 DEBUG；每个决策周期一次的事件为 INFO
+GENET_INIT = EventType('genet.init', logging.INFO, "Initializing Genet Framework...")
+GENET_LOOP_START = EventType('genet.loop_start', logging.INFO, "Genet main loop started.")
+RUN_FINISHED = EventType('genet.run_finished', logging.INFO, "Genet run finished: {summary}")
+EVAL_START = EventType('genet.eval_start', logging.INFO, "--- [评估阶段] 开始 ---")
+EVAL_REPORT = EventType('genet.eval_report', logging.INFO, "评估报告: {report}")
+DECISION_START = EventType('genet.decision_start', logging.INFO, "--- [决策阶段] 开始 ---")
+EXEC_START = EventType('genet.exec_start', logging.INFO,
+                       "--- [执行阶段] 开始，主组件: {component}, 任期: {tenure} RTTs ---")
+EXEC_DONE = EventType('genet.exec_done', logging.INFO, "执行阶段完成。")
+ETA_ALL_UPDATED = EventType('genet.eta_all', logging.INFO, "置信度更新: {etas}")
+TENURE_GRANTED = EventType('genet.tenure', logging.INFO, "主组件信誉为 {eta:.3f}, 获得任期: {tenure} RTTs")
+ETA_SECONDARY_UPDATED = EventType('genet.eta_secondary', logging.INFO,
+                                  "  [绩效考核-次组件] {component} η 更新为: {eta:.3f}")
+TENURE_REVIEW = EventType('genet.tenure_review', logging.INFO,
+                          "--- [任期后评估] {component} 的任期平均效用为: {utility:.2f} ---")
+ETA_PRIMARY_UPDATED = EventType('genet.eta_primary', logging.INFO,
+                                "  [绩效考核-主组件] {component} η 更新为: {eta:.3f}")
+
+COMPONENT_LOAD = EventType('component.load', logging.INFO, "[{component}] 正在加载Sage模型 {path} ...")
+COMPONENT_NO_MODEL = EventType('component.no_model', logging.INFO,
+                               "[{component}] 未配置Sage策略模型，使用占位规则 (当前速率 * {gain})。")
+COMPONENT_SUGGEST = EventType('component.suggest', logging.DEBUG,
+                              "[{component}] 根据网络状态 {state} 计算速率...")
+
+ENV_INIT = EventType('env.init', logging.INFO, "NetworkEnvironment initialized.")
+ENV_BACKEND_START = EventType('env.backend_start', logging.INFO,
+                              "  [Network Env] Starting persistent {launcher} link: {command}")
+ENV_EVAL_RUN = EventType('env.eval_run', logging.DEBUG,
+                         "  [Network Env] Running {component} at {rate:.2f} Mbps for {duration}s...")
+ENV_EXEC_RTT = EventType('env.exec_rtt', logging.DEBUG, "  [Network Env] Executing at {rate:.2f} Mbps for one RTT...")
+
+MODEL_LOADED = EventType('inference.model_loaded', logging.INFO, "GBDT model loaded successfully from {path}")
+MODEL_MISSING = EventType('inference.model_missing', logging.WARNING,
+                          "GBDT model not found at {path}. Inference will not work.")
+MODEL_FLAT_FALLBACK = EventType('inference.flat_fallback', logging.WARNING,
+                                "cannot export GBDT to flat arrays ({error}); falling back to model.predict.")
+INFER_START = EventType('inference.start', logging.INFO, "--- [推断引擎] 启动推断确认协议 ---")
+INFER_NO_MODEL = EventType('inference.no_model', logging.INFO, "模型不存在，无法推断。将返回本轮最高分速率。")
+INFER_CANDIDATE = EventType('inference.candidate', logging.INFO, "初步推断建议速率: {rate:.2f} Mbps")
+INFER_VERIFY_RUN = EventType('inference.verify_run', logging.INFO, "进行1 RTT真实验证...")
+INFER_VERIFY = EventType('inference.verify', logging.INFO, "验证效用值 U_candidate: {utility:.2f}")
+INFER_VERDICT = EventType('inference.verdict', logging.INFO, "裁决结果: {winner}胜出！")
+
+TRIGGER_FIRED = EventType('trigger.fired', logging.INFO,
+                          "[触发器] 触发推断! (表现不佳: {underperforming}, 陷入停滞: {stagnated})")
+CRISIS_DETECTED = EventType('recovery.crisis', logging.INFO,
+                            "[危机监测] {component} 触发危机! (判据: {rule}) 当前效用 {utility:.2f}, 近期平均 {average:.2f}")
+SUPPORT_START = EventType('recovery.support_start', logging.INFO, "--- [动态扶持协议] 启动 ---")
+SUPPORT_REWARD = EventType('recovery.support_reward', logging.INFO,
+                           "{component} 表现出潜力(ρ={rho:.2f})，获得扶持性奖励: +{reward:.3f} η，更新后 η = {eta:.3f}")
+
+
+# --- 事件出口 ---
+_logger = logging.getLogger(EVENT_LOGGER_NAME)
+# 级别阈值缓存成一个整数，热路径上只做一次比较
+_threshold = _logger.getEffectiveLevel()
+_listeners = []
+
+
+def enabled(event):
+    """该事件是否会被输出；构造代价较高的字段前先调用它。"""
+    return event.level >= _threshold
+
+
+def emit(event, **fields):
+    """
+    发出一条事件。级别低于阈值时立即返回，不做任何格式化。
+
+    Args:
+        event (EventType): 事件类型。
+        **fields: 模板字段 (原样保存在 LogRecord.fields 上，供结构化handler使用)。
+    """
+    if event.level < _threshold:
+        return
+    _logger.log(event.level, _EventMessage(event, fields), extra={'event': event.name, 'fields': fields})
+
+
+def set_level(level):
+    """修改事件级别 (int 或 'DEBUG'/'INFO'/.../'OFF')。"""
+    global _threshold
+    _logger.setLevel(_parse_level(level))
+    _threshold = _logger.getEffectiveLevel()
+
+
+def _parse_level(level):
+    if isinstance(level, int):
+        return level
+    name = str(level).upper()
+    if name == 'OFF':
+        return OFF
+    value = logging.getLevelName(name)
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown logging level: {level}")
+    return value
+
+
+def shutdown():
+    """停止后台写文件线程，并把队列中剩余的事件写完。"""
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+def configure(config):
+    """
+    根据配置中的 logging_params 配置事件出口，可重复调用 (会先移除上一次的handler)。
+
+    logging_params:
+        level:      DEBUG / INFO / WARNING / ERROR / OFF
+        console:    是否输出到控制台
+        log_file:   事件日志文件 (可选)
+        format:     text 或 jsonl (仅对文件生效)
+        background: 是否由后台线程写文件
+    """
+    global _threshold
+    params = (config or {}).get('logging_params', {}) or {}
+
+    shutdown()
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+        if not isinstance(handler, _DeferredQueueHandler):
+            handler.close()
+
+    level = _parse_level(params.get('level', 'INFO'))
+    setup_logger(name=EVENT_LOGGER_NAME, log_level=level, console=params.get('console', True))
+    _logger.propagate = False
+
+    log_file = params.get('log_file')
+    if log_file:
+        file_handler = logging.FileHandler(log_file, mode='a')
+        if params.get('format', 'text') == 'jsonl':
+            file_handler.setFormatter(JsonLinesFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+        if params.get('background', True):
+            event_queue = queue.SimpleQueue()
+            _logger.addHandler(_DeferredQueueHandler(event_queue))
+            listener = logging.handlers.QueueListener(event_queue, file_handler, respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+        else:
+            _logger.addHandler(file_handler)
+
+    _threshold = _logger.getEffectiveLevel()
+    return _logger
+
+
+atexit.register(shutdown)
@@ -4,7 +4,7 @@
 import logging
 import sys
 
-def setup_logger(name='GenetLogger', log_level=logging.INFO, log_file=None):
+def setup_logger(name='GenetLogger', log_level=logging.INFO, log_file=None, console=True):
     """
     配置并返回一个logger实例。
 
@@ -12,6 +12,7 @@ def setup_logger(name='GenetLogger', log_level=logging.INFO, log_file=None):
         name (str): logger的名称。
         log_level (int): 日志记录的级别 (e.g., logging.INFO, logging.DEBUG)。
         log_file (str, optional): 如果提供，日志将同时输出到指定的文件。
+        console (bool): 是否输出到控制台 (stdout)。
 
     Returns:
         logging.Logger: 配置好的logger实例。
@@ -30,9 +31,10 @@ def setup_logger(name='GenetLogger', log_level=logging.INFO, log_file=None):
     # 避免重复添加handler
     if not logger.handlers:
         # 3. 创建一个handler，用于将日志输出到控制台 (stdout)
-        stream_handler = logging.StreamHandler(sys.stdout)
-        stream_handler.setFormatter(formatter)
-        logger.addHandler(stream_handler)
+        if console:
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(formatter)
+            logger.addHandler(stream_handler)
 
         # 4. 如果指定了日志文件，则创建一个handler，用于写入文件
         if log_file:
@@ -40,6 +42,10 @@ def setup_logger(name='GenetLogger', log_level=logging.INFO, log_file=None):
             file_handler.setFormatter(formatter)
             logger.addHandler(file_handler)
 
+        # 没有任何输出时挂一个空handler，避免 logging 回退到 stderr
+        if not logger.handlers:
+            logger.addHandler(logging.NullHandler())
+
     return logger
 
 # -- 使用示例 --
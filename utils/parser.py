@@ -2,59 +2,277 @@
 
 # genet_project/utils/parser.py
 
+import json
 import re
-import pandas as pd
+
+from .pcap import pcap_rtt_samples
+
+# iperf 的文本输出中 Bytes 以1024为进制，bits/sec 以1000为进制
+_BYTE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+_BIT_UNITS = {'': 1, 'K': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12}
+
+# iperf2 与 iperf3 共用的数据行格式 (iperf2 区间写作 "0.0- 1.0"，iperf3 写作 "0.00-1.00")
+# 例: [  5]   0.00-1.00   sec  11.5 MBytes  96.5 Mbits/sec    0   1.23 MBytes
+#     [  3]  0.0- 1.0 sec  11.5 MBytes  96.5 Mbits/sec
+#     [SUM]   0.00-10.00  sec   115 MBytes  96.5 Mbits/sec                  sender
+_TEXT_RECORD = re.compile(
+    r'\[\s*(?P<stream>\d+|SUM)\]\s+(?P<start>\d+(?:\.\d+)?)\s*-\s*(?P<end>\d+(?:\.\d+)?)\s+sec\s+'
+    r'(?P<transfer>\d+(?:\.\d+)?)\s+(?P<tunit>[KMGT]?)Bytes\s+'
+    r'(?P<rate>\d+(?:\.\d+)?)\s+(?P<runit>[KMGT]?)bits/sec(?P<rest>.*)$'
+)
+# UDP 行尾: "0.020 ms  0/863 (0%)"
+_UDP_TAIL = re.compile(r'(?P<jitter>\d+(?:\.\d+)?)\s+ms\s+(?P<lost>\d+)\s*/\s*(?P<total>\d+)')
+# TCP 客户端行尾的重传次数: "    0   1.23 MBytes" 或 "    0             sender"
+# (UDP 客户端的区间行在同一位置给出数据报个数)
+_RETR_TAIL = re.compile(r'^\s+(?P<retr>\d+)(?:\s|$)')
+# iperf3 在总结行之前打印的分隔线
+_SEPARATOR = re.compile(r'^(?:-\s){3,}')
+# 一次测试开始/结束的标记行 (iperf3 / iperf2 客户端与服务端)；多次运行的输出拼接在一起时据此切分
+_RUN_BOUNDARY = re.compile(r'^(?:Connecting to host|Client connecting to|Accepted connection from|iperf Done\.)')
+
+
+def _record(kind, stream, start, end, n_bytes, bits_per_second, role=None, retransmits=None,
+            rtt_ms=None, jitter_ms=None, lost_packets=None, packets=None):
+    return {
+        'kind': kind,                  # 'interval' (区间报告) 或 'summary' (总结)
+        'stream': stream,              # 流编号，或 'SUM' 表示多流合计
+        'start': start,                # 区间起止 (秒)
+        'end': end,
+        'bytes': n_bytes,
+        'bits_per_second': bits_per_second,
+        'role': role,                  # 'sender' / 'receiver' / None (iperf2 与区间报告没有角色)
+        'retransmits': retransmits,
+        'rtt_ms': rtt_ms,              # 仅 JSON 输出提供 (tcp_info 的平滑RTT)
+        'jitter_ms': jitter_ms,        # 以下为 UDP
+        'lost_packets': lost_packets,
+        'packets': packets,
+    }
+
+
+class IperfStreamParser:
+    """
+    增量式 iperf 输出解析器：逐行喂入，随时返回已经完整的记录。
+
+    支持 iperf2 / iperf3 的文本输出、iperf3 --json (整段JSON) 与 --json-stream (每行一个事件)。
+    解析器只保存当前状态 (是否已进入总结段、每个流最近的区间、未闭合的JSON文本)，
+    因此可以直接挂在运行中的 iperf 子进程的 stdout 上，内存占用与日志长度无关。
+    """
+
+    def __init__(self):
+        self.in_summary = False   # iperf3 文本：是否已越过 "- - -" 分隔线
+        self.udp_columns = False  # 表头含 "Datagrams" 时，行尾的整数是数据报个数而不是重传次数
+        self._last_interval = {}  # iperf2 文本：stream -> (start, end)，用于识别总结行
+        self._json_lines = None   # iperf3 --json：尚未闭合的JSON文本
+
+    def feed(self, line):
+        """
+        喂入一行输出。
+
+        Args:
+            line (str | bytes): 一行输出 (可以带换行符)。
+
+        Returns:
+            list[dict]: 这一行产生的记录 (可能为空)。
+        """
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.rstrip('\r\n')
+
+        # --- iperf3 --json：缓存到顶层对象闭合 ---
+        if self._json_lines is not None:
+            self._json_lines.append(line)
+            if line.startswith('}'):
+                text = '\n'.join(self._json_lines)
+                self._json_lines = None
+                return self._from_json_document(json.loads(text))
+            return []
+
+        stripped = line.strip()
+        if not stripped:
+            return []
+        if stripped.startswith('{'):
+            if stripped.startswith('{"event"'):
+                return self._from_json_event(json.loads(stripped))
+            if line.startswith('{') and stripped.endswith('}'):
+                return self._from_json_document(json.loads(stripped))
+            self._json_lines = [line]
+            return []
+
+        # --- 文本输出 ---
+        if _RUN_BOUNDARY.match(stripped):
+            self._reset_run()
+            return []
+        if _SEPARATOR.match(stripped):
+            self.in_summary = True
+            return []
+        if stripped.startswith('[ ID]'):
+            self.udp_columns = 'Datagrams' in stripped
+            return []
+        match = _TEXT_RECORD.search(line)
+        if not match:
+            return []
+        return [self._from_text_match(match)]
+
+    def _reset_run(self):
+        """一次测试开始或结束：清除上一次测试的总结段与区间状态。"""
+        self.in_summary = False
+        self.udp_columns = False
+        self._last_interval = {}
+
+    def close(self):
+        """输入结束；返回残留的记录 (未闭合的JSON视为截断，直接丢弃)。"""
+        self._json_lines = None
+        return []
+
+    # --- 文本 ---
+    def _from_text_match(self, match):
+        stream = match.group('stream')
+        stream = stream if stream == 'SUM' else int(stream)
+        start, end = float(match.group('start')), float(match.group('end'))
+        rest = match.group('rest')
+
+        role = 'sender' if 'sender' in rest else 'receiver' if 'receiver' in rest else None
+        retransmits = jitter_ms = lost = total = None
+        udp = _UDP_TAIL.search(rest)
+        if udp:
+            jitter_ms, lost, total = float(udp.group('jitter')), int(udp.group('lost')), int(udp.group('total'))
+        else:
+            retr = _RETR_TAIL.match(rest)
+            if retr and self.udp_columns:
+                total = int(retr.group('retr'))
+            elif retr:
+                retransmits = int(retr.group('retr'))
+
+        if self.in_summary and role is None and start == 0 and stream in self._last_interval \
+                and end <= self._last_interval[stream][1] - 1e-6:
+            # 总结段之后又出现从0开始、比上次测试更短的无角色区间：没有边界标记的下一次测试
+            # (它的表头已经在前面解析过，保留 udp_columns)
+            self.in_summary = False
+            self._last_interval = {}
+        if role is not None or self.in_summary:
+            kind = 'summary'
+        else:
+            # iperf2 没有分隔线与角色标记：从0开始、覆盖到该流最近区间末尾的长区间即总结行
+            last = self._last_interval.get(stream)
+            if last is not None and start == 0 and end >= last[1] - 1e-6 and end - start > last[1] - last[0]:
+                kind = 'summary'
+            else:
+                kind = 'interval'
+                self._last_interval[stream] = (start, end)
+
+        return _record(kind, stream, start, end,
+                       float(match.group('transfer')) * _BYTE_UNITS[match.group('tunit')],
+                       float(match.group('rate')) * _BIT_UNITS[match.group('runit')],
+                       role=role, retransmits=retransmits, jitter_ms=jitter_ms, lost_packets=lost, packets=total)
+
+    # --- JSON ---
+    @staticmethod
+    def _from_json_interval(entry, kind, stream, role=None):
+        rtt = entry.get('rtt')
+        return _record(kind, stream, float(entry.get('start', 0)), float(entry.get('end', 0)),
+                       float(entry.get('bytes', 0)), float(entry.get('bits_per_second', 0)),
+                       role=role, retransmits=entry.get('retransmits'),
+                       rtt_ms=rtt / 1000.0 if rtt is not None else None,  # tcp_info 的 RTT 单位为微秒
+                       jitter_ms=entry.get('jitter_ms'), lost_packets=entry.get('lost_packets'),
+                       packets=entry.get('packets'))
+
+    def _json_intervals(self, interval):
+        records = [self._from_json_interval(s, 'interval', s.get('socket')) for s in interval.get('streams', [])]
+        if 'sum' in interval and len(interval.get('streams', [])) > 1:
+            records.append(self._from_json_interval(interval['sum'], 'interval', 'SUM'))
+        return records
+
+    def _json_end(self, end):
+        records = []
+        for stream in end.get('streams', []):
+            for role in ('sender', 'receiver'):
+                if role in stream:
+                    entry = stream[role]
+                    records.append(self._from_json_interval(entry, 'summary', entry.get('socket'), role))
+            if 'udp' in stream:
+                entry = stream['udp']
+                records.append(self._from_json_interval(entry, 'summary', entry.get('socket'), 'sender'))
+        for key, role in (('sum_sent', 'sender'), ('sum_received', 'receiver'), ('sum', None)):
+            if key in end:
+                records.append(self._from_json_interval(end[key], 'summary', 'SUM', role))
+        return records
+
+    def _from_json_event(self, event):
+        name, data = event.get('event'), event.get('data', {})
+        if name == 'interval':
+            return self._json_intervals(data)
+        if name == 'end':
+            return self._json_end(data)
+        return []
+
+    def _from_json_document(self, document):
+        records = []
+        for interval in document.get('intervals', []):
+            records.extend(self._json_intervals(interval))
+        records.extend(self._json_end(document.get('end', {})))
+        return records
+
+
+def iter_iperf_records(source):
+    """
+    逐条产出 iperf 记录 (见 IperfStreamParser)。
+
+    Args:
+        source: 文件对象、子进程的 stdout 管道，或任何按行迭代的对象 (str 或 bytes)。
+
+    Yields:
+        dict: 区间报告或总结记录。
+    """
+    parser = IperfStreamParser()
+    for line in source:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+
 def parse_iperf_output(iperf_log_content):
     """
     解析iperf客户端输出的日志内容，提取吞吐量和延迟等关键指标。
 
     Args:
-        iperf_log_content (str): iperf命令执行后产生的完整字符串输出。
+        iperf_log_content (str | file): iperf命令执行后产生的完整字符串输出，或按行读取的文件对象。
 
     Returns:
         pd.DataFrame: 一个包含时间序列数据的DataFrame，
-                      列如 ['Interval', 'Transfer', 'Bitrate_Mbits_s']。
-        dict: 一个包含总结性数据的字典，如 {'avg_bitrate': ...}
+                      列如 ['Stream', 'Interval_Start_s', 'Interval_End_s', 'Transfer_MBytes', 'Bitrate_Mbits_s']。
+        dict: 一个包含总结性数据的字典，如 {'avg_bitrate_Mbits_s': ...}
     """
-    # iperf输出通常包含多行，我们逐行解析
-    lines = iperf_log_content.strip().split('\n')
+    lines = iperf_log_content.splitlines() if isinstance(iperf_log_content, str) else iperf_log_content
 
     data_rows = []
-    summary = {}
-
-    # 正则表达式，用于匹配iperf的数据行
-    # 例: [  5]   0.00-1.00   sec  11.5 MBytes  96.5 Mbits/sec
-    data_pattern = re.compile(
-        r'\[\s*\d+\]\s*([\d\.-]+)\s*-\s*([\d\.-]+)\s*sec\s*([\d\.-]+)\s*MBytes\s*([\d\.-]+)\s*Mbits/sec'
-    )
-
-    # 正则表达式，用于匹配iperf的总结行
-    summary_pattern = re.compile(
-        r'\[\s*\d+\]\s*([\d\.-]+)\s*-\s*([\d\.-]+)\s*sec\s*([\d\.-]+)\s*MBytes\s*([\d\.-]+)\s*Mbits/sec'
-    )
-
-    for line in lines:
-        data_match = data_pattern.search(line)
-        if data_match:
-            start_time, end_time, transfer, bitrate = data_match.groups()
+    summaries = []
+    for record in iter_iperf_records(lines):
+        if record['kind'] == 'interval':
             data_rows.append({
-                'Interval_Start_s': float(start_time),
-                'Interval_End_s': float(end_time),
-                'Transfer_MBytes': float(transfer),
-                'Bitrate_Mbits_s': float(bitrate)
+                'Stream': record['stream'],
+                'Interval_Start_s': record['start'],
+                'Interval_End_s': record['end'],
+                'Transfer_MBytes': record['bytes'] / _BYTE_UNITS['M'],
+                'Bitrate_Mbits_s': record['bits_per_second'] / 1e6,
             })
-            continue  # 匹配到数据行后，跳过对总结行的匹配
-
-        summary_match = summary_pattern.search(line)
-        if summary_match and "sender" in line:  # 确保是sender的总结
-            start_time, end_time, transfer, bitrate = summary_match.groups()
-            summary = {
-                'total_duration_s': float(end_time),
-                'total_transfer_MBytes': float(transfer),
-                'avg_bitrate_Mbits_s': float(bitrate)
-            }
-
-    # 将数据行转换为pandas DataFrame，便于后续处理和绘图
+        else:
+            summaries.append(record)
+
+    # 优先取发送端的总结 (多流时取合计行)，其次是接收端，最后是没有角色标记的总结 (iperf2)
+    summary = {}
+    if summaries:
+        def rank(r):
+            return ({'sender': 0, None: 1, 'receiver': 2}[r['role']], r['stream'] != 'SUM')
+        best = min(summaries, key=rank)
+        summary = {
+            'total_duration_s': best['end'],
+            'total_transfer_MBytes': best['bytes'] / _BYTE_UNITS['M'],
+            'avg_bitrate_Mbits_s': best['bits_per_second'] / 1e6,
+        }
+        if best['retransmits'] is not None:
+            summary['retransmits'] = best['retransmits']
+
+    # 将数据行转换为pandas DataFrame，便于后续处理和绘图 (pandas 只在解析时才导入)
+    import pandas as pd
     df = pd.DataFrame(data_rows)
 
     return df, summary
@@ -62,24 +280,19 @@ def parse_iperf_output(iperf_log_content):
 
 def parse_tcpdump_for_latency(tcpdump_log_path):
     """
-    解析tcpdump生成的pcap文件或文本日志，来计算端到端延迟。
-    这是一个非常复杂的任务，通常需要专业的库（如Scapy）或工具。
+    解析tcpdump生成的pcap/pcapng文件，按TCP序号与确认号匹配来计算每个数据包的RTT。
+
+    抓包文件以内存映射方式读取，协议头解码与匹配都是对整批包的向量化运算 (见 utils/pcap.py)。
 
     Args:
-        tcpdump_log_path (str): tcpdump日志文件的路径。
+        tcpdump_log_path (str): tcpdump抓包文件的路径。
 
     Returns:
-        pd.DataFrame: 一个包含每个数据包延迟信息的DataFrame。
+        pd.DataFrame: 一个包含每个数据包延迟信息的DataFrame，
+                      列为 ['timestamp', 'rtt_ms', 'flow'] (按ACK到达时间排序)。
     """
-    print(f"--- [Parser] Parsing tcpdump log at {tcpdump_log_path} for latency... ---")
-    # --- 待实现 ---
-    # 实际的延迟计算需要：
-    # 1. 识别TCP数据包的序列号(SEQ)和确认号(ACK)。
-    # 2. 匹配一个发出的数据包和它对应的确认包。
-    # 3. 计算两者的时间戳之差，得到该数据包的RTT。
-    # 这是一个非常专业且复杂的过程，通常会使用 Scapy 库来完成。
-    # 在这里，我们只提供一个框架。
-
-    # 简化模拟：返回一个空的DataFrame
-    latency_df = pd.DataFrame(columns=['timestamp', 'rtt_ms'])
-    return latency_df
\ No newline at end of file
+    samples = pcap_rtt_samples(tcpdump_log_path)
+    import pandas as pd
+    latency_df = pd.DataFrame({'timestamp': samples['timestamp'], 'rtt_ms': samples['rtt_ms'],
+                               'flow': samples['flow']})
+    return latency_df
@@ -0,0 +1,385 @@
+## pcap/pcapng 抓包文件的向量化解析与 TCP RTT 提取
+# genet_project/utils/pcap.py
+
+import struct
+
+import numpy as np
+
+# --- 链路层类型 (LINKTYPE_*) -> 链路层头部长度 ---
+LINKTYPE_NULL = 0          # BSD loopback (4字节协议族)
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101         # 直接是IP包 (Mahimahi 的 tun 接口)
+LINKTYPE_LINUX_SLL = 113   # tcpdump -i any
+LINKTYPE_LINUX_SLL2 = 276
+_DLT_RAW = (12, 14)        # 部分平台上 RAW 的旧编号
+
+_PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+_PCAPNG_SHB = 0x0A0D0D0A
+_PCAPNG_IDB = 0x00000001
+_PCAPNG_EPB = 0x00000006
+_PCAPNG_OPB = 0x00000002   # 已废弃的 Packet Block，结构与 EPB 相同
+
+TCP_FIN, TCP_SYN, TCP_RST, TCP_ACK = 0x01, 0x02, 0x04, 0x10
+
+
+class PcapPackets:
+    """
+    抓包文件的包索引：所有字段都是等长数组，包内容留在内存映射的文件里不做拷贝。
+
+    Attributes:
+        buf (np.memmap): 整个文件的 uint8 映射。
+        timestamp (np.ndarray): 每个包的时间戳 (秒, float64)。
+        offset (np.ndarray): 每个包数据在 buf 中的起始位置。
+        caplen (np.ndarray): 每个包实际抓到的字节数。
+        linktype (np.ndarray): 每个包的链路层类型。
+    """
+
+    def __init__(self, buf, timestamp, offset, caplen, linktype):
+        self.buf = buf
+        self.timestamp = timestamp
+        self.offset = offset
+        self.caplen = caplen
+        self.linktype = linktype
+
+    def __len__(self):
+        return len(self.timestamp)
+
+
+# --- 读取包索引 ---
+def read_pcap(path):
+    """
+    以内存映射方式打开 pcap 或 pcapng 文件，建立包索引。
+
+    Args:
+        path (str): 抓包文件路径。
+
+    Returns:
+        PcapPackets
+    """
+    buf = np.memmap(path, dtype=np.uint8, mode='r')
+    head = bytes(buf[:4])
+    if head in _PCAP_MAGIC:
+        return _read_pcap(buf, *_PCAP_MAGIC[head])
+    if len(buf) >= 12 and struct.unpack('<I', head)[0] == _PCAPNG_SHB:
+        return _read_pcapng(buf)
+    raise ValueError(f"{path} is not a pcap or pcapng file")
+
+
+def _read_pcap(buf, endian, ts_unit):
+    linktype = struct.unpack_from(endian + 'I', buf, 20)[0] & 0x0FFFFFFF
+    size = len(buf)
+    record = np.dtype([('ts_sec', endian + 'u4'), ('ts_frac', endian + 'u4'),
+                       ('caplen', endian + 'u4'), ('origlen', endian + 'u4')])
+
+    # 快速路径：抓包截断长度固定 (tcpdump -s N) 时所有记录等长，可以一次性按步长取出全部记录头
+    offsets = None
+    if size > 24 + 16:
+        first_caplen = struct.unpack_from(endian + 'I', buf, 24 + 8)[0]
+        stride = 16 + first_caplen
+        n = (size - 24) // stride
+        if n and 24 + n * stride == size:
+            headers = np.ndarray((n,), dtype=record, buffer=buf, offset=24, strides=(stride,))
+            if np.all(headers['caplen'] == first_caplen):
+                offsets = 24 + 16 + np.arange(n, dtype=np.int64) * stride
+
+    # 一般路径：逐条跳过记录 (只读记录头，不解析包内容)
+    if offsets is None:
+        unpack = struct.Struct(endian + 'I').unpack_from
+        positions = []
+        pos = 24
+        while pos + 16 <= size:
+            caplen = unpack(buf, pos + 8)[0]
+            if pos + 16 + caplen > size:
+                break  # 文件末尾被截断的记录
+            positions.append(pos)
+            pos += 16 + caplen
+        positions = np.asarray(positions, dtype=np.int64)
+        headers = np.empty(len(positions), dtype=record)
+        for name in record.names:
+            field_offset = record.fields[name][1]
+            headers[name] = _gather_u32(buf, positions + field_offset, endian)
+        offsets = positions + 16
+
+    timestamp = headers['ts_sec'].astype(np.float64) + headers['ts_frac'].astype(np.float64) * ts_unit
+    caplen = headers['caplen'].astype(np.int64)
+    return PcapPackets(buf, timestamp, offsets, caplen, np.full(len(offsets), linktype, dtype=np.int32))
+
+
+def _read_pcapng(buf):
+    size = len(buf)
+    interfaces = []          # 当前段内各接口的 (linktype, 时间戳单位)
+    endian = '<'
+    packet_offsets, caplens, ts_raw, iface_linktype, iface_unit = [], [], [], [], []
+
+    pos = 0
+    while pos + 12 <= size:
+        block_type = struct.unpack_from(endian + 'I', buf, pos)[0]
+        if block_type == _PCAPNG_SHB:
+            # 每个段头块重新确定字节序，接口编号也从0开始重新计数
+            magic = bytes(buf[pos + 8:pos + 12])
+            endian = '<' if magic == b'\x4d\x3c\x2b\x1a' else '>'
+            interfaces = []
+        block_len = struct.unpack_from(endian + 'I', buf, pos + 4)[0]
+        if block_len < 12 or pos + block_len > size:
+            break
+
+        if block_type == _PCAPNG_IDB:
+            linktype = struct.unpack_from(endian + 'H', buf, pos + 8)[0]
+            interfaces.append((linktype, _pcapng_ts_unit(buf, pos + 16, pos + block_len - 4, endian)))
+        elif block_type in (_PCAPNG_EPB, _PCAPNG_OPB):
+            if block_type == _PCAPNG_EPB:
+                iface, ts_high, ts_low, caplen = struct.unpack_from(endian + 'IIII', buf, pos + 8)
+            else:
+                iface, ts_high, ts_low, caplen = struct.unpack_from(endian + 'HxxIII', buf, pos + 8)
+            linktype, unit = interfaces[iface]
+            packet_offsets.append(pos + 28)
+            caplens.append(caplen)
+            ts_raw.append((ts_high << 32) | ts_low)
+            iface_linktype.append(linktype)
+            iface_unit.append(unit)
+        pos += block_len
+
+    timestamp = np.asarray(ts_raw, dtype=np.float64) * np.asarray(iface_unit, dtype=np.float64)
+    return PcapPackets(buf, timestamp, np.asarray(packet_offsets, dtype=np.int64),
+                       np.asarray(caplens, dtype=np.int64), np.asarray(iface_linktype, dtype=np.int32))
+
+
+def _pcapng_ts_unit(buf, pos, end, endian):
+    """从接口描述块的选项中读取 if_tsresol (选项9)，默认微秒。"""
+    while pos + 4 <= end:
+        code, length = struct.unpack_from(endian + 'HH', buf, pos)
+        if code == 0:
+            break
+        if code == 9 and length >= 1:
+            value = int(buf[pos + 4])
+            return 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+        pos += 4 + ((length + 3) & ~3)
+    return 1e-6
+
+
+# --- 向量化字节读取 ---
+def _gather_u32(buf, offsets, endian='>'):
+    b = [buf[offsets + i].astype(np.uint32) for i in range(4)]
+    if endian == '<':
+        b.reverse()
+    return (b[0] << 24) | (b[1] << 16) | (b[2] << 8) | b[3]
+
+
+def _u16(buf, offsets):
+    return (buf[offsets].astype(np.uint32) << 8) | buf[offsets + 1]
+
+
+def _u32(buf, offsets):
+    return _gather_u32(buf, offsets, '>')
+
+
+# --- 协议头解码 ---
+def decode_tcp(packets):
+    """
+    对所有包一次性解码 链路层 / IPv4 / IPv6 / TCP 头部，只保留 TCP 包。
+
+    Returns:
+        dict: 等长数组 timestamp, src, dst (IPv4为地址本身，IPv6为地址的64位折叠)、
+              sport, dport, seq, ack, flags, payload_len。
+    """
+    buf, offset, caplen, linktype = packets.buf, packets.offset, packets.caplen, packets.linktype
+    n = len(packets)
+    ip = np.full(n, -1, dtype=np.int64)
+    safe = np.minimum(offset, len(buf) - 24) if len(buf) >= 24 else offset
+    big_enough = caplen >= 24
+
+    # 1. 链路层：定位IP头
+    raw = np.isin(linktype, (LINKTYPE_RAW,) + _DLT_RAW)
+    ip[raw] = offset[raw]
+    eth = (linktype == LINKTYPE_ETHERNET) & big_enough
+    if eth.any():
+        ethertype = _u16(buf, safe + 12)
+        vlan = eth & (ethertype == 0x8100)
+        ethertype = np.where(vlan, _u16(buf, safe + 16), ethertype)
+        is_ip = eth & ((ethertype == 0x0800) | (ethertype == 0x86DD))
+        ip[is_ip] = (offset + np.where(vlan, 18, 14))[is_ip]
+    sll = (linktype == LINKTYPE_LINUX_SLL) & big_enough
+    if sll.any():
+        proto = _u16(buf, safe + 14)
+        is_ip = sll & ((proto == 0x0800) | (proto == 0x86DD))
+        ip[is_ip] = (offset + 16)[is_ip]
+    sll2 = (linktype == LINKTYPE_LINUX_SLL2) & big_enough
+    if sll2.any():
+        proto = _u16(buf, safe)
+        is_ip = sll2 & ((proto == 0x0800) | (proto == 0x86DD))
+        ip[is_ip] = (offset + 20)[is_ip]
+    null = (linktype == LINKTYPE_NULL) & big_enough
+    ip[null] = offset[null] + 4
+
+    end = offset + caplen
+    has_ip = (ip >= 0) & (ip + 20 <= end)
+    idx = np.flatnonzero(has_ip)
+    ip, end, ts = ip[idx], end[idx], packets.timestamp[idx]
+
+    # 2. IP层：IPv4 / IPv6 (不处理IPv6扩展头与IPv4分片)
+    version = buf[ip] >> 4
+    v4 = (version == 4)
+    v6 = (version == 6) & (ip + 40 <= end)
+    ihl = (buf[ip] & 0x0F).astype(np.int64) * 4
+    frag = _u16(buf, ip + 6) & 0x1FFF
+    proto = np.where(v4, buf[ip + 9], np.where(v6, buf[ip + 6], 0))
+    ip_payload = np.where(v4, _u16(buf, ip + 2).astype(np.int64) - ihl,
+                          _u16(buf, ip + 4).astype(np.int64))
+    tcp = np.where(v4, ip + ihl, ip + 40)
+    keep = ((v4 & (frag == 0)) | v6) & (proto == 6) & (tcp + 20 <= end)
+
+    idx = np.flatnonzero(keep)
+    ip, tcp, ts, v4, ip_payload = ip[idx], tcp[idx], ts[idx], v4[idx], ip_payload[idx]
+
+    src = np.empty(len(idx), dtype=np.uint64)
+    dst = np.empty(len(idx), dtype=np.uint64)
+    src[v4] = _u32(buf, ip[v4] + 12)
+    dst[v4] = _u32(buf, ip[v4] + 16)
+    v6 = ~v4
+    if v6.any():
+        src[v6] = _fold_ipv6(buf, ip[v6] + 8)
+        dst[v6] = _fold_ipv6(buf, ip[v6] + 24)
+
+    # 3. TCP层
+    data_offset = (buf[tcp + 12] >> 4).astype(np.int64) * 4
+    return {
+        'timestamp': ts,
+        'src': src,
+        'dst': dst,
+        'sport': _u16(buf, tcp),
+        'dport': _u16(buf, tcp + 2),
+        'seq': _u32(buf, tcp + 4),
+        'ack': _u32(buf, tcp + 8),
+        'flags': buf[tcp + 13].astype(np.uint8),
+        'payload_len': np.maximum(ip_payload - data_offset, 0),
+    }
+
+
+def _fold_ipv6(buf, offsets):
+    """把128位IPv6地址折叠成64位标识 (仅用于区分流)。"""
+    hi = (_u32(buf, offsets).astype(np.uint64) << np.uint64(32)) | _u32(buf, offsets + 4)
+    lo = (_u32(buf, offsets + 8).astype(np.uint64) << np.uint64(32)) | _u32(buf, offsets + 12)
+    return hi ^ (lo * np.uint64(0x9E3779B97F4A7C15))
+
+
+# --- RTT 匹配 ---
+def _unwrap_u32(values, base):
+    """把32位序号展开成相对 base 的单调坐标 (处理回绕)。"""
+    rel = (values.astype(np.int64) - int(base)) % (1 << 32)
+    step = np.diff(rel, prepend=rel[:1])
+    step = (step + (1 << 31)) % (1 << 32) - (1 << 31)
+    return rel[0] + np.cumsum(step) if len(rel) else rel
+
+
+def tcp_rtt_samples(segments):
+    """
+    按序号匹配数据段与确认，得到RTT样本 (类似 tcptrace 的做法)。
+
+    对每个方向的数据流：数据段的期望确认号为 seq + payload (+SYN/FIN)，
+    反方向上第一个晚于该数据段、且累积确认号达到期望值的ACK给出一个样本。
+    重传过的数据段 (同一个期望确认号出现多次) 按 Karn 算法丢弃。
+
+    Args:
+        segments (dict): decode_tcp 的结果。
+
+    Returns:
+        dict: 按时间排序的 timestamp (ACK到达时间), rtt_ms, flow (方向流编号) 数组。
+    """
+    ts = segments['timestamp']
+    key = np.stack([segments['src'], segments['dst'],
+                    segments['sport'].astype(np.uint64), segments['dport'].astype(np.uint64)], axis=1)
+    # 按32字节的整行做 unique (比 axis=0 的逐列比较快得多)
+    rows = np.ascontiguousarray(key).view(np.dtype((np.void, key.dtype.itemsize * key.shape[1]))).ravel()
+    _, first, flow_id = np.unique(rows, return_index=True, return_inverse=True)
+    flows = key[first]
+    flow_id = flow_id.ravel()
+    lookup = {tuple(f): i for i, f in enumerate(flows.tolist())}
+
+    flags = segments['flags']
+    seq_len = segments['payload_len'] + ((flags & TCP_SYN) > 0) + ((flags & TCP_FIN) > 0)
+    has_ack = (flags & TCP_ACK) > 0
+
+    order = np.argsort(flow_id, kind='stable')
+    bounds = np.searchsorted(flow_id[order], np.arange(len(flows) + 1))
+    out_ts, out_rtt, out_flow = [], [], []
+    for f, (src, dst, sport, dport) in enumerate(flows.tolist()):
+        reverse = lookup.get((dst, src, dport, sport))
+        if reverse is None:
+            continue
+        data = order[bounds[f]:bounds[f + 1]]
+        data = data[seq_len[data] > 0]
+        acks = order[bounds[reverse]:bounds[reverse + 1]]
+        acks = acks[has_ack[acks]]
+        if not len(data) or not len(acks):
+            continue
+        data = data[np.argsort(ts[data], kind='stable')]
+        acks = acks[np.argsort(ts[acks], kind='stable')]
+
+        base = segments['seq'][data[0]]
+        expected = _unwrap_u32(segments['seq'][data], base) + seq_len[data]
+        ack_no = _unwrap_u32(segments['ack'][acks], base)
+        ack_ts = ts[acks]
+
+        # Karn：期望确认号出现多次的数据段是重传，样本有歧义
+        uniq, inverse, counts = np.unique(expected, return_inverse=True, return_counts=True)
+        clean = counts[inverse.ravel()] == 1
+
+        cum_ack = np.maximum.accumulate(ack_no)
+        first_after = np.searchsorted(ack_ts, ts[data], side='right')
+        first_covering = np.searchsorted(cum_ack, expected, side='left')
+        match = np.maximum(first_after, first_covering)
+        valid = clean & (match < len(acks))
+        if not valid.any():
+            continue
+        match = match[valid]
+        out_ts.append(ack_ts[match])
+        out_rtt.append((ack_ts[match] - ts[data][valid]) * 1000.0)
+        out_flow.append(np.full(len(match), f, dtype=np.int64))
+
+    if not out_ts:
+        empty = np.zeros(0)
+        return {'timestamp': empty, 'rtt_ms': empty, 'flow': np.zeros(0, dtype=np.int64)}
+    timestamp = np.concatenate(out_ts)
+    order = np.argsort(timestamp, kind='stable')
+    return {'timestamp': timestamp[order], 'rtt_ms': np.concatenate(out_rtt)[order],
+            'flow': np.concatenate(out_flow)[order]}
+
+
+def pcap_rtt_samples(path):
+    """读取抓包文件并返回 RTT 样本 (见 tcp_rtt_samples)。"""
+    return tcp_rtt_samples(decode_tcp(read_pcap(path)))
+
+
+def rtt_feedback(timestamp, rtt_ms, window_sec, end_time=None):
+    """
+    把RTT样本汇总成 NetworkEnvironment 反馈中的延迟字段。
+
+    Args:
+        timestamp (np.ndarray): 样本时间 (秒，升序)。
+        rtt_ms (np.ndarray): RTT样本 (ms)。
+        window_sec (float): 统计窗口，通常是一个评估/执行时段。
+        end_time (float, optional): 窗口结束时间，默认取最后一个样本的时间。
+
+    Returns:
+        dict: rtt_current (窗口内均值), rtt_min (全部样本的最小值),
+              rtt_gradient (窗口内 dRTT/dt 的线性拟合斜率，无量纲)；没有样本时返回空字典。
+    """
+    if len(timestamp) == 0:
+        return {}
+    if end_time is None:
+        end_time = timestamp[-1]
+    lo = np.searchsorted(timestamp, end_time - window_sec, side='left')
+    hi = np.searchsorted(timestamp, end_time, side='right')
+    t, r = timestamp[lo:hi], rtt_ms[lo:hi]
+    if len(r) == 0:
+        return {}
+    gradient = 0.0
+    if len(r) > 1 and np.ptp(t) > 0:
+        # 斜率单位为 ms/s，除以1000得到无量纲的 dRTT/dt
+        gradient = float(np.polyfit(t - t[0], r, 1)[0]) / 1000.0
+    return {'rtt_current': float(r.mean()), 'rtt_min': float(rtt_ms[:hi].min()), 'rtt_gradient': gradient}
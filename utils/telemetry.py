@@ -0,0 +1,312 @@
+## 每个RTT的二进制遥测记录 (环形缓冲区 + 内存映射文件)
+# genet_project/utils/telemetry.py
+
+import json
+import os
+import time
+
+import numpy as np
+
+# 文件格式：
+#   [0:8)   魔数 MAGIC
+#   [8:16)  已写入的记录条数 (uint64，每次落盘后更新)
+#   [16:20) JSON头部长度 (uint32)
+#   [20:..) JSON头部 (dtype描述、组件名、阶段名)，补齐到 RECORD_ALIGN 字节
+#   之后是连续的定长记录
+MAGIC = b'GNTTLM01'
+RECORD_ALIGN = 64
+_COUNT_OFFSET = 8
+_PREFIX_SIZE = 20
+
+# 记录所属的阶段
+STAGE_EVAL, STAGE_EXEC, STAGE_VERIFY = 0, 1, 2
+STAGE_NAMES = ('eval', 'exec', 'verify')
+
+
+def telemetry_dtype(n_components):
+    """
+    一条遥测记录的结构化dtype。
+
+    Args:
+        n_components (int): 组件个数 (eta 字段的长度)。
+    """
+    return np.dtype([
+        ('wall_time', '<f8'),        # 墙钟时间 (time.time)
+        ('sim_time', '<f8'),         # 链路仿真时间 (秒)；真实链路为 NaN
+        ('cycle', '<u4'),            # 决策周期编号
+        ('rtt_index', '<u4'),        # 全局RTT编号
+        ('stage', 'u1'),             # STAGE_EVAL / STAGE_EXEC / STAGE_VERIFY
+        ('component', 'i1'),         # 本条记录发送数据的组件编号 (-1 表示推断速率)
+        ('primary', 'i1'),           # 当前主组件编号 (评估阶段为 -1)
+        ('triggered', '?'),          # 本周期是否触发了推断
+        ('crisis', '?'),             # 本RTT是否检测到危机
+        ('tenure', '<u4'),           # 本周期授予的任期 (RTT)
+        ('rate', '<f4'),             # 发送速率 (Mbps)
+        ('throughput', '<f4'),       # 反馈中的实际吞吐 (Mbps)
+        ('rtt_ms', '<f4'),
+        ('rtt_min_ms', '<f4'),
+        ('rtt_gradient', '<f4'),
+        ('utility', '<f4'),
+        ('eta', '<f4', (n_components,)),
+    ])
+
+
+class TelemetryRecorder:
+    """
+    定长遥测记录器。
+
+    记录先写进预先分配的结构化环形缓冲区 (逐字段赋值，不分配内存)，
+    缓冲区写满时整体拷贝进内存映射文件；文件按倍增策略预先扩容，因此落盘也只是一次内存拷贝。
+    不指定文件路径时，缓冲区就是一个只保留最近 buffer_records 条的内存环。
+    """
+
+    def __init__(self, path, component_names, buffer_records=4096):
+        """
+        Args:
+            path (str | None): 遥测文件路径；None 表示只保留在内存中。
+            component_names (list[str]): 组件名，顺序即 eta 字段的顺序。
+            buffer_records (int): 环形缓冲区容量 (条)。
+        """
+        self.path = path
+        self.component_names = list(component_names)
+        self.component_index = {name: i for i, name in enumerate(self.component_names)}
+        self.dtype = telemetry_dtype(len(self.component_names))
+        self.buffer = np.zeros(int(buffer_records), dtype=self.dtype)
+        self._fields = {name: self.buffer[name] for name in self.dtype.names}
+        self._pos = 0           # 缓冲区中下一条的位置
+        self.n_records = 0      # 已记录的总条数
+        self.n_flushed = 0      # 已写入文件的条数
+
+        self._file = None
+        self._map = None
+        if path is not None:
+            self._open(path)
+
+    @classmethod
+    def from_config(cls, config, component_names):
+        """根据 telemetry_params 构建记录器；未启用时返回None。"""
+        params = (config or {}).get('telemetry_params', {}) or {}
+        if not params.get('enabled', False):
+            return None
+        return cls(params.get('path'), component_names, buffer_records=params.get('buffer_records', 4096))
+
+    # --- 文件 ---
+    def _open(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        header = json.dumps({
+            'version': 1,
+            'dtype': [list(d) if len(d) == 2 else [d[0], d[1], list(d[2])] for d in self.dtype.descr],
+            'components': self.component_names,
+            'stages': list(STAGE_NAMES),
+        }).encode('utf-8')
+        self.data_offset = -(-(_PREFIX_SIZE + len(header)) // RECORD_ALIGN) * RECORD_ALIGN
+
+        self._file = open(path, 'w+b')
+        self._file.write(MAGIC)
+        self._file.write(np.uint64(0).tobytes())
+        self._file.write(np.uint32(len(header)).tobytes())
+        self._file.write(header)
+        self._file.write(b'\0' * (self.data_offset - _PREFIX_SIZE - len(header)))
+        self._capacity = 0
+        self._grow(len(self.buffer))
+
+    def _grow(self, min_capacity):
+        """把文件的记录区扩容到至少 min_capacity 条，并重新映射。"""
+        capacity = max(min_capacity, 2 * self._capacity)
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        self._file.truncate(self.data_offset + capacity * self.dtype.itemsize)
+        self._map = np.memmap(self._file, dtype=self.dtype, mode='r+', offset=self.data_offset, shape=(capacity,))
+        self._capacity = capacity
+
+    def flush(self):
+        """把缓冲区中尚未落盘的记录拷贝进映射文件，并更新头部的记录条数。"""
+        if self._file is None or self._pos == 0:
+            return
+        end = self.n_flushed + self._pos
+        if end > self._capacity:
+            self._grow(end)
+        self._map[self.n_flushed:end] = self.buffer[:self._pos]
+        self.n_flushed = end
+        self._pos = 0
+        self._map.flush()
+        self._file.seek(_COUNT_OFFSET)
+        self._file.write(np.uint64(self.n_flushed).tobytes())
+        self._file.flush()
+
+    def close(self):
+        """落盘剩余记录，并把文件截断到实际大小。"""
+        if self._file is None:
+            return
+        self.flush()
+        self._map = None
+        self._file.truncate(self.data_offset + self.n_flushed * self.dtype.itemsize)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- 记录 ---
+    def record(self, stage, component, primary, rate, feedback, utility, etas, cycle, rtt_index,
+               tenure=0, triggered=False, crisis=False, sim_time=np.nan):
+        """
+        写入一条记录。
+
+        Args:
+            stage (int): STAGE_EVAL / STAGE_EXEC / STAGE_VERIFY。
+            component (int): 发送数据的组件编号 (-1 表示推断速率)。
+            primary (int): 当前主组件编号 (-1 表示尚未选出)。
+            rate (float): 发送速率。
+            feedback (dict): 网络反馈 (sending_rate、rtt_current、rtt_min、rtt_gradient)。
+            utility (float): 本次的效用值。
+            etas (sequence): 所有组件当前的置信度，顺序与 component_names 一致。
+        """
+        i = self._pos
+        f = self._fields
+        f['wall_time'][i] = time.time()
+        f['sim_time'][i] = sim_time
+        f['cycle'][i] = cycle
+        f['rtt_index'][i] = rtt_index
+        f['stage'][i] = stage
+        f['component'][i] = component
+        f['primary'][i] = primary
+        f['triggered'][i] = triggered
+        f['crisis'][i] = crisis
+        f['tenure'][i] = tenure
+        f['rate'][i] = rate
+        f['throughput'][i] = feedback.get('sending_rate', np.nan)
+        f['rtt_ms'][i] = feedback.get('rtt_current', np.nan)
+        f['rtt_min_ms'][i] = feedback.get('rtt_min', np.nan)
+        f['rtt_gradient'][i] = feedback.get('rtt_gradient', np.nan)
+        f['utility'][i] = utility
+        f['eta'][i] = etas
+
+        self.n_records += 1
+        self._pos = i + 1
+        if self._pos == len(self.buffer):
+            if self._file is not None:
+                self.flush()
+            else:
+                self._pos = 0
+
+    def recent(self):
+        """返回内存中最近的记录 (按时间顺序的拷贝)。"""
+        if self._file is not None or self.n_records <= len(self.buffer):
+            return self.buffer[:self._pos].copy()
+        return np.concatenate([self.buffer[self._pos:], self.buffer[:self._pos]])
+
+
+def read_telemetry_header(path):
+    """读取遥测文件头部，返回 (头部字典, 记录区偏移, 记录条数)。"""
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX_SIZE)
+        if prefix[:8] != MAGIC:
+            raise ValueError(f"{path} is not a Genet telemetry file")
+        count = int(np.frombuffer(prefix, dtype='<u8', count=1, offset=_COUNT_OFFSET)[0])
+        header_len = int(np.frombuffer(prefix, dtype='<u4', count=1, offset=16)[0])
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    data_offset = -(-(_PREFIX_SIZE + header_len) // RECORD_ALIGN) * RECORD_ALIGN
+    return header, data_offset, count
+
+
+def load_telemetry(path):
+    """
+    以只读内存映射的方式加载遥测文件 (不解析、不拷贝)。
+
+    Returns:
+        tuple: (records, header)。records 是结构化 np.memmap，header 含 components 等元数据。
+    """
+    header, data_offset, count = read_telemetry_header(path)
+    dtype = np.dtype([tuple(d[:2]) if len(d) == 2 else (d[0], d[1], tuple(d[2])) for d in header['dtype']])
+    if count == 0:
+        return np.zeros(0, dtype=dtype), header
+    records = np.memmap(path, dtype=dtype, mode='r', offset=data_offset, shape=(count,))
+    return records, header
+
+
+def telemetry_frame(records, header):
+    """把遥测记录转换成 pandas DataFrame (eta 展开成 eta_<组件名> 列，阶段/组件转成名字)。"""
+    import pandas as pd
+
+    columns = {name: records[name] for name in records.dtype.names if name != 'eta'}
+    for i, name in enumerate(header['components']):
+        columns[f'eta_{name}'] = records['eta'][:, i]
+    df = pd.DataFrame(columns)
+    names = np.array(header['components'] + ['inferred'], dtype=object)
+    df['stage'] = np.array(header['stages'], dtype=object)[df['stage'].to_numpy()]
+    df['component'] = names[df['component'].to_numpy()]
+    df['primary'] = np.where(df['primary'] >= 0, names[df['primary'].to_numpy()], None)
+    return df
+
+
+# compare_decisions 逐RTT比较的字段：决策字段精确比较，rate 按相对误差比较
+DECISION_FIELDS = ('stage', 'component', 'primary', 'triggered', 'crisis', 'tenure')
+
+
+def compare_decisions(recorded, replayed, rate_rtol=1e-4):
+    """
+    逐RTT比较两次运行的遥测记录 (通常是录制运行与它的离线回放)，报告决策从哪里开始不同。
+
+    两组记录按位置 (即RTT编号) 对齐，只比较共同的前缀。
+
+    Args:
+        recorded (np.ndarray): 录制运行的遥测记录。
+        replayed (np.ndarray): 回放运行的遥测记录 (组件顺序须与录制运行相同)。
+        rate_rtol (float): 发送速率的相对容差。
+
+    Returns:
+        dict: {
+            'n_recorded', 'n_replayed', 'n_compared': 记录条数,
+            'mismatches': {字段: 不一致的RTT数},
+            'divergent_rtts': 至少一个字段不一致的RTT数,
+            'first_divergence': 第一个不一致的RTT {'rtt_index', 'cycle', 'fields': {字段: (录制值, 回放值)}}，
+                                完全一致时为None,
+            'divergent_cycles': 主组件/任期/是否触发推断不同的执行周期编号列表,
+            'mean_utility': (录制, 回放) 共同前缀上的平均效用值,
+        }
+    """
+    n = min(len(recorded), len(replayed))
+    a, b = recorded[:n], replayed[:n]
+    diff = {field: a[field] != b[field] for field in DECISION_FIELDS}
+    rate_a, rate_b = a['rate'].astype(np.float64), b['rate'].astype(np.float64)
+    diff['rate'] = np.abs(rate_a - rate_b) > rate_rtol * np.maximum(np.abs(rate_a), 1.0)
+    any_diff = np.logical_or.reduce(list(diff.values())) if n else np.zeros(0, dtype=bool)
+
+    first = None
+    if any_diff.any():
+        i = int(np.argmax(any_diff))
+        first = {'rtt_index': int(a['rtt_index'][i]), 'cycle': int(a['cycle'][i]),
+                 'fields': {field: (a[field][i].item(), b[field][i].item())
+                            for field, mask in diff.items() if mask[i]}}
+
+    return {
+        'n_recorded': len(recorded),
+        'n_replayed': len(replayed),
+        'n_compared': n,
+        'mismatches': {field: int(mask.sum()) for field, mask in diff.items()},
+        'divergent_rtts': int(any_diff.sum()),
+        'first_divergence': first,
+        'divergent_cycles': _divergent_cycles(recorded, replayed),
+        'mean_utility': (float(np.mean(a['utility'])) if n else float('nan'),
+                         float(np.mean(b['utility'])) if n else float('nan')),
+    }
+
+
+def _divergent_cycles(recorded, replayed):
+    """按执行周期比较 (主组件, 任期, 是否触发推断)，返回两次运行中不一致的周期编号。"""
+    def decisions(records):
+        execution = records[records['stage'] == STAGE_EXEC]
+        cycles, first = np.unique(execution['cycle'], return_index=True)
+        rows = execution[first]
+        return {int(c): (int(p), int(t), bool(g))
+                for c, p, t, g in zip(cycles, rows['primary'], rows['tenure'], rows['triggered'])}
+
+    a, b = decisions(recorded), decisions(replayed)
+    return sorted(c for c in a.keys() & b.keys() if a[c] != b[c])